@@ -1,13 +1,28 @@
+from django.db import transaction
+
 from apps.awards.models import Award, AwardInstance
 
 
+@transaction.atomic()
 def assign_awards(queryset, instances):
-    for award in queryset.order_by("award_order", "name"):
-        award.assign(instances)
+    """Assign the awards in order, like Award.assign, in a fixed number of queries."""
+    awards = list(
+        queryset.order_by("award_order", "name").prefetch_related(
+            "awardrule_set", "exclude_awards"
+        )
+    )
+    AwardInstance.objects.filter(award__in=awards).delete()
+    AwardInstance.objects.bulk_create(
+        [
+            award_instance
+            for award in awards
+            for award_instance in award.choose_instances(instances)
+        ]
+    )
 
 
 class InstanceMixin:
-    def assign_award(self, award: Award) -> None:
+    def assign_award(self, award: Award, save: bool = True) -> AwardInstance | None:
         raise NotImplementedError(
             "{0} does not implement assign".format(self.__class__.__name__)
         )
@@ -28,11 +43,19 @@ class InstanceBase(InstanceMixin):
     def __init__(self):
         self.awards = []
 
-    def assign_award(self, award: Award):
+    def assign_award(self, award: Award, save: bool = True) -> AwardInstance | None:
+        """Give the instance the award.
+
+        Returns the AwardInstance for the content object, if there is one. It
+        is only saved if save is True, so callers can save many at once.
+        """
         self.awards.append(award)
         content_object = self.get_content_object()
-        if content_object:
-            self.create_award_instance(award, content_object)
+        if not content_object:
+            return None
+        if save:
+            return self.create_award_instance(award, content_object)
+        return AwardInstance(award=award, content_object=content_object)
 
     def get_content_object(self):
         return getattr(self, self.model_attr, None)
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.13 on 2026-10-19 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("awards", "0004_alter_award_exclude_awards_alter_award_id_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="awardinstance",
+            index=models.Index(
+                fields=["content_type", "object_id"],
+                name="awards_awar_content_3dc814_idx",
+            ),
+        ),
+    ]
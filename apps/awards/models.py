@@ -1,4 +1,5 @@
 from abc import ABC, abstractclassmethod
+from collections import defaultdict
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -20,27 +21,37 @@ class Award(models.Model):
 
     def assign(self, instances):
         self.delete_award_instances()
+        AwardInstance.objects.bulk_create(self.choose_instances(instances))
 
+    def choose_instances(self, instances) -> list["AwardInstance"]:
+        """Give the award to the instances it should go to, without saving.
+
+        Returns the unsaved AwardInstance of each instance given the award.
+        """
         matching_instances = [
             instance
             for instance in instances
             if self.instance_passes_all_rules(instance)
         ]
         if not matching_instances:
-            return
+            return []
 
         exclude_awards = set(self.exclude_awards.all())
         num_to_assign = self.get_number_to_assign(len(matching_instances))
 
+        award_instances = []
         for instance in matching_instances:
             if set(instance.get_awards()) & exclude_awards:
                 continue
 
-            instance.assign_award(self)
+            award_instance = instance.assign_award(self, save=False)
+            if award_instance is not None:
+                award_instances.append(award_instance)
             num_to_assign -= 1
 
             if num_to_assign <= 0:
-                return
+                break
+        return award_instances
 
     def is_valid_for_instance(self, instance):
         if self.exclude_from_instance(instance):
@@ -213,6 +224,9 @@ class AwardInstance(models.Model):
     object_id = models.CharField(max_length=50)
     content_object = GenericForeignKey()
 
+    class Meta:
+        indexes = (models.Index(fields=("content_type", "object_id")),)
+
     def __str__(self):
         try:
             return "{0} - {1}".format(self.content_object, self.award)
@@ -243,3 +257,13 @@ class AwardInstance(models.Model):
             instance.award
             for instance in cls.get_award_instance_queryset_for_object(object_)
         ]
+
+    @classmethod
+    def get_awards_for_model(cls, model) -> dict:
+        """The awards of every object of the model, keyed by object id."""
+        awards = defaultdict(list)
+        for instance in cls.objects.filter(
+            content_type=ContentType.objects.get_for_model(model)
+        ).select_related("award"):
+            awards[instance.object_id].append(instance.award)
+        return awards
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.13 on 2026-10-19 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fair_categories", "0006_alter_category_id_alter_division_id_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="subcategory",
+            name="short_description",
+            field=models.CharField(
+                db_index=True, max_length=100, verbose_name="Subcategory name"
+            ),
+        ),
+    ]
@@ -49,7 +49,7 @@ class Subcategory(models.Model):
     )
     abbreviation = models.CharField(max_length=10, verbose_name="Abbreviation")
     short_description = models.CharField(
-        max_length=100, verbose_name="Subcategory name"
+        max_length=100, verbose_name="Subcategory name", db_index=True
     )
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
 
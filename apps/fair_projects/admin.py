@@ -6,17 +6,21 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.db import transaction
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
+from django.utils.translation import gettext_lazy as _
 from import_export import fields, resources
 from import_export.admin import ImportExportMixin
 from import_export.widgets import CharWidget, ForeignKeyWidget, IntegerWidget
 
 from apps.fair_categories.models import Category, Division, Ethnicity, Subcategory
-from apps.fair_projects.logic import mass_email
+from apps.fair_projects.logic import assign_judges_incrementally, mass_email
 from apps.fair_projects.models import JudgingInstance
+from apps.judges.models import Judge
 from apps.rubrics.models.rubric import RubricResponse
+from fair_scoring_site.exports import StreamingExportMixin
 from fair_scoring_site.logic import get_judging_rubric
 
 from .models import Project, School, Student, Teacher
+from .search import search_project_ids
 
 
 class ProjectResource(resources.ModelResource):
@@ -167,21 +171,31 @@ class JudgingInstanceInline(admin.TabularInline):
 
 
 @admin.register(Project)
-class ProjectAdmin(ImportExportMixin, admin.ModelAdmin):
+class ProjectAdmin(StreamingExportMixin, ImportExportMixin, admin.ModelAdmin):
     model = Project
     list_display = ("number", "title", "category", "subcategory", "division")
     list_display_links = ("number", "title")
     list_filter = ("category", "division")
     ordering = ("number", "title")
+    # Searched through the search index by get_search_results
+    search_fields = ("number", "title")
     inlines = (StudentInline, JudgingInstanceInline)
     view_on_site = True
     save_on_top = True
 
     resource_class = ProjectResource
 
+    def get_export_queryset(self, queryset):
+        return queryset.select_related("category", "subcategory", "division")
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_project_ids(search_term)), False
+
 
 @admin.register(Student)
-class StudentAdmin(ImportExportMixin, admin.ModelAdmin):
+class StudentAdmin(StreamingExportMixin, ImportExportMixin, admin.ModelAdmin):
     model = Student
     list_display = ("full_name", "teacher", "grade_level", "project_title")
     list_filter = ("teacher", "grade_level", "project__category", "project__division")
@@ -189,6 +203,9 @@ class StudentAdmin(ImportExportMixin, admin.ModelAdmin):
 
     resource_class = StudentResource
 
+    def get_export_queryset(self, queryset):
+        return queryset.select_related("ethnicity", "teacher__user", "project")
+
     def full_name(self, obj):
         return obj.full_name
 
@@ -208,6 +225,28 @@ class StudentAdmin(ImportExportMixin, admin.ModelAdmin):
         )
 
 
+class CompletionListFilter(admin.SimpleListFilter):
+    title = _("completion")
+    parameter_name = "completion"
+
+    def lookups(self, request, model_admin):
+        return (
+            ("complete", _("Complete")),
+            ("incomplete", _("Started, not complete")),
+            ("not_started", _("Not started")),
+        )
+
+    def queryset(self, request, queryset):
+        # Relies on the annotations added by JudgingInstanceQuerySet.with_progress
+        if self.value() == "complete":
+            return queryset.filter(response_complete=True)
+        if self.value() == "incomplete":
+            return queryset.filter(response_started=True, response_complete=False)
+        if self.value() == "not_started":
+            return queryset.filter(response_started=False)
+        return queryset
+
+
 @admin.register(JudgingInstance)
 class InstanceAdmin(admin.ModelAdmin):
     model = JudgingInstance
@@ -221,10 +260,17 @@ class InstanceAdmin(admin.ModelAdmin):
         "complete",
         "response_score",
     )
+    list_filter = ("locked", CompletionListFilter)
     ordering = ("project__number", "project__title", "judge__user__last_name")
     readonly_fields = ("judge", "response", "project", "locked")
+    # Searched through the project search index by get_search_results
     search_fields = ("project__title", "project__number")
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(project__in=search_project_ids(search_term)), False
+
     def project_number(self, obj):
         return obj.project.number
 
@@ -246,17 +292,31 @@ class InstanceAdmin(admin.ModelAdmin):
     def rubric_name(self, obj):
         return obj.response.rubric.name
 
+    def has_response(self, obj):
+        return obj.response_started
+
+    has_response.admin_order_field = "response_started"
+    has_response.boolean = True
+
+    def complete(self, obj):
+        return obj.response_complete
+
+    complete.admin_order_field = "response_complete"
+    complete.boolean = True
+
     def response_score(self, obj):
-        return obj.response.score()
+        return obj.response_score
+
+    response_score.admin_order_field = "response_score"
 
     def get_queryset(self, request):
         return (
             super()
             .get_queryset(request)
+            .with_progress()
             .select_related(
                 "project", "judge", "judge__user", "response", "response__rubric"
             )
-            .prefetch_related("response__questionresponse_set")
         )
 
     def has_add_permission(self, request, obj=None):
@@ -305,9 +365,19 @@ def send_password_reset(modeladmin, request, queryset):
 
 
 send_password_reset.short_description = "Send password reset links to selected users"
+
+
+def assign_projects_to_judges(modeladmin, request, queryset):
+    judges = Judge.objects.filter(user__in=queryset)
+    created = assign_judges_incrementally(judges=judges)
+    messages.add_message(request, messages.INFO, f"Created {created} judging instances")
+
+
+assign_projects_to_judges.short_description = "Assign projects to selected judges"
 django.contrib.auth.admin.UserAdmin.actions = [
     *django.contrib.auth.admin.UserAdmin.actions,
     send_password_reset,
+    assign_projects_to_judges,
 ]
 
 # Register your models here.
@@ -321,9 +391,18 @@ def do_judge_assignment(modeladmin, request, queryset):
 
 
 do_judge_assignment.short_description = "Assign Judges"
+
+
+def assign_judges_to_projects(modeladmin, request, queryset):
+    created = assign_judges_incrementally(projects=queryset)
+    messages.add_message(request, messages.INFO, f"Created {created} judging instances")
+
+
+assign_judges_to_projects.short_description = "Assign judges to selected projects"
 ProjectAdmin.actions = [
     *ProjectAdmin.actions,
     do_judge_assignment,
+    assign_judges_to_projects,
 ]
 
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FairProjectsConfig(AppConfig):
     name = "apps.fair_projects"
     verbose_name = "Fair Projects"
+
+    def ready(self) -> None:
+        """Initializes signals for the app."""
+        from . import signals
@@ -0,0 +1,152 @@
+"""Time and count the queries of the judging hot paths against a seeded fair.
+
+Each fair is seeded inside a transaction that is rolled back afterwards, so
+benchmarks leave the database as they found it.
+
+"""
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.messages.storage import default_storage
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from apps.awards.logic import assign_awards
+from apps.awards.models import Award
+from apps.judges.models import Judge
+from apps.rubrics.models import FeedbackForm, RubricResponse
+
+from .logic import assign_judges, get_projects_sorted_by_score
+from .models import JudgingInstance, Project
+from .seeding import answer_responses, clear_fair, seed_fair
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+@contextmanager
+def count_queries():
+    """Count the queries run in the block. The count is in the yielded list."""
+    count = [0]
+
+    def counter(execute, sql, params, many, context):
+        count[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        yield count
+
+
+def measure(func: Callable[[], object]) -> dict:
+    with count_queries() as count:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 4), "queries": count[0]}
+
+
+def get_view(path: str, user) -> HttpResponse:
+    """Render the view at path for user, without going through the middleware."""
+    request = RequestFactory().get(path)
+    request.user = user
+    request.session = SessionStore()
+    request._messages = default_storage(request)
+    match = resolve(path)
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    if response.status_code != 200:
+        raise BenchmarkError(f"{path} returned status {response.status_code}")
+    return response
+
+
+def assign_awards_to_projects() -> None:
+    # Imported here because the admin module registers the site's admin classes
+    from fair_scoring_site.admin import get_project_instances
+
+    assign_awards(Award.objects.all(), get_project_instances())
+
+
+def render_project_feedback() -> None:
+    project = Project.objects.order_by("number").first()
+    responses = RubricResponse.objects.filter(judginginstance__project=project)
+    list(FeedbackForm.objects.render_html_for_responses(responses))
+
+
+def get_judge_dashboard() -> None:
+    judge = (
+        Judge.objects.annotate(num_instances=Count("judginginstance"))
+        .order_by("-num_instances")
+        .first()
+    )
+    get_view(
+        reverse("fair_projects:judge_detail", args=(judge.user.username,)), judge.user
+    )
+
+
+def get_judging_instance_edit() -> None:
+    instance = JudgingInstance.objects.select_related("judge__user").first()
+    get_view(
+        reverse("fair_projects:judging_instance_edit", args=(instance.pk,)),
+        instance.judge.user,
+    )
+
+
+BENCHMARKS = {
+    "assign_judges": assign_judges,
+    "get_projects_sorted_by_score": get_projects_sorted_by_score,
+    "assign_awards": assign_awards_to_projects,
+    "feedback_form": render_project_feedback,
+    "judge_dashboard": get_judge_dashboard,
+    "judging_instance_edit": get_judging_instance_edit,
+}
+
+
+def run_benchmarks(
+    size: int,
+    names: Optional[list[str]] = None,
+    seed: int = 0,
+    answered: float = 0.5,
+    complete: float = 0.8,
+) -> dict:
+    """Seed a fair with size projects and run the benchmarks against it.
+
+    Judges are assigned by assign_judges, which always runs, so the other
+    benchmarks have judging instances. It is only reported if it's in names.
+
+    """
+    names = list(BENCHMARKS) if names is None else names
+    results = {}
+    with transaction.atomic():
+        # Rolled back below, so nothing is lost
+        clear_fair(everything=True)
+
+        start = time.perf_counter()
+        fair = seed_fair(size, seed=seed, assign=False)
+        seed_seconds = time.perf_counter() - start
+
+        results["assign_judges"] = measure(assign_judges)
+        answer_responses(fair.rubric, answered, complete, random.Random(seed))
+        for name in names:
+            if name != "assign_judges":
+                results[name] = measure(BENCHMARKS[name])
+
+        transaction.set_rollback(True)
+
+    return {
+        "projects": fair.projects,
+        "judges": fair.judges,
+        "seed_seconds": round(seed_seconds, 4),
+        "benchmarks": {name: results[name] for name in names},
+    }
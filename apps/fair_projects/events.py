@@ -0,0 +1,122 @@
+"""Live results and judging progress, as a stream of small events.
+
+When answers are saved, the receiver in apps.fair_projects.signals calls
+schedule_progress_events(). Once the transaction commits, it adds a
+ProgressEvent for each judging instance answered and one for each project
+whose score may have changed, in a fixed number of queries. The live results
+page follows them through the ProgressEventStream view instead of reloading
+the results. The judging totals count every instance of the fair, so rather
+than on every save, the stream computes them when it sends instance events,
+once for each batch of events.
+
+"""
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+
+from apps.rubrics.expressions import (
+    rubric_response_complete,
+    rubric_response_has_response,
+)
+
+from .logic import get_rubric_name
+from .models import JudgingInstance, ProgressEvent, Project
+from .utils import schedule_on_commit
+
+# Seconds the totals sent with a batch of events are reused by other streams
+PROGRESS_TOTALS_TIMEOUT = 60
+
+
+def get_progress_totals() -> dict:
+    """How many judging instances there are, and how many are started and complete."""
+    return (
+        JudgingInstance.objects.filter(rubric__name=get_rubric_name())
+        .annotate(
+            is_started=rubric_response_has_response("response"),
+            is_complete=rubric_response_complete("response"),
+        )
+        .aggregate(
+            total=Count("pk"),
+            started=Count("pk", filter=Q(is_started=True)),
+            complete=Count("pk", filter=Q(is_complete=True)),
+        )
+    )
+
+
+def get_stream_progress_totals(last_event: ProgressEvent) -> dict:
+    """get_progress_totals(), computed once for every stream up to an event."""
+    # The time tells apart events given the id of one that was rolled back
+    return cache.get_or_set(
+        "progress_totals:{0}:{1}".format(last_event.pk, last_event.created.timestamp()),
+        get_progress_totals,
+        PROGRESS_TOTALS_TIMEOUT,
+    )
+
+
+def get_project_scores(project_ids: Optional[Iterable[int]] = None) -> list[dict]:
+    """The score of each project, or of every project, sorted like the results."""
+    projects = Project.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+    return list(
+        projects.with_average_score()
+        .order_by("-avg_score", "-score_count", "number")
+        .values("number", "title", "avg_score", "score_count")
+    )
+
+
+def create_progress_events(response_ids: Iterable[int]) -> list[ProgressEvent]:
+    """Add the events for answers saved to the rubric responses."""
+    instances = list(
+        JudgingInstance.objects.filter(response__in=response_ids)
+        .with_progress()
+        .order_by("pk")
+        .values(
+            "pk",
+            "project_id",
+            "judge__user__first_name",
+            "judge__user__last_name",
+            project_number=F("project__number"),
+            started=F("response_started"),
+            complete=F("response_complete"),
+            score=F("response_score"),
+        )
+    )
+    if not instances:
+        return []
+
+    events = [
+        ProgressEvent(
+            kind=ProgressEvent.INSTANCE,
+            data={
+                "id": instance["pk"],
+                "project": instance["project_number"],
+                "judge": "{0} {1}".format(
+                    instance["judge__user__first_name"],
+                    instance["judge__user__last_name"],
+                ),
+                "started": instance["started"],
+                "complete": instance["complete"],
+                "score": instance["score"],
+            },
+        )
+        for instance in instances
+    ]
+    events.extend(
+        ProgressEvent(kind=ProgressEvent.PROJECT, data=project)
+        for project in get_project_scores(
+            {instance["project_id"] for instance in instances}
+        )
+    )
+    return ProgressEvent.objects.bulk_create(events)
+
+
+def schedule_progress_events(response_ids: Iterable[int]) -> None:
+    """Add the events for the rubric responses when the transaction commits.
+
+    Saving answers to several judging instances in one transaction adds one
+    event for each instance and project.
+
+    """
+    schedule_on_commit("progress_events", create_progress_events, response_ids)
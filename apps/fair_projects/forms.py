@@ -1,12 +1,46 @@
-from django.forms import FileField, Form, ModelForm, inlineformset_factory
+from django.db.models import QuerySet
+from django.forms import (
+    CharField,
+    FileField,
+    Form,
+    ModelChoiceField,
+    ModelForm,
+    inlineformset_factory,
+)
 
+from apps.fair_categories.models import Category, Division
 from apps.fair_projects.models import Project, Student
+from apps.fair_projects.search import search_project_ids
 
 
 class UploadFileForm(Form):
     file = FileField()
 
 
+class ProjectFilterForm(Form):
+    q = CharField(required=False, label="Number, title or name")
+    category = ModelChoiceField(
+        Category.objects.order_by("short_description"), required=False
+    )
+    division = ModelChoiceField(
+        Division.objects.order_by("short_description"), required=False
+    )
+
+    def filter(self, queryset: QuerySet[Project]) -> QuerySet[Project]:
+        """Filter the projects by the valid fields of the form."""
+        if not self.is_valid():
+            return queryset
+
+        query = self.cleaned_data["q"].strip()
+        if query:
+            queryset = queryset.filter(pk__in=search_project_ids(query))
+        if self.cleaned_data["category"]:
+            queryset = queryset.filter(category=self.cleaned_data["category"])
+        if self.cleaned_data["division"]:
+            queryset = queryset.filter(division=self.cleaned_data["division"])
+        return queryset
+
+
 class StudentForm(ModelForm):
     class Meta:
         model = Student
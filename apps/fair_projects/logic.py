@@ -1,29 +1,56 @@
 import csv
-from collections import defaultdict
+import heapq
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
 from functools import reduce
-from itertools import filterfalse, groupby, product
+from itertools import filterfalse, groupby, islice, product
 from operator import ior
-from typing import Generator
+from typing import Generator, NamedTuple
 
-from constance import config
 from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.mail import EmailMultiAlternatives, get_connection
 from django.db import transaction
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Exists, F, OuterRef, Prefetch, Q
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+from apps.awards.models import AwardInstance
 from apps.fair_categories.models import Category, Division, Ethnicity, Subcategory
 from apps.judges.models import Judge
-from apps.rubrics.models.rubric import QuestionResponse
-from fair_scoring_site.logic import get_judging_rubric
-
-from .models import JudgingInstance, Project, Teacher, create_student
+from apps.rubrics.expressions import (
+    rubric_response_complete,
+    rubric_response_has_response,
+    rubric_response_score,
+)
+from apps.rubrics.forms import RubricForm, default_field
+from apps.rubrics.models.rubric import (
+    Question,
+    QuestionResponse,
+    QuestionType,
+    RubricResponse,
+)
+from fair_scoring_site.judging_config import (
+    JudgingConfig,
+    get_judging_config,
+    judging_config_scope,
+)
+
+from .models import (
+    JudgingInstance,
+    Project,
+    ProjectNumberCounter,
+    Student,
+    Teacher,
+    create_student,
+)
+from .utils import BATCH_SIZE, bulk_create_with_ids
 
 
 def get_rubric_name():
-    return config.RUBRIC_NAME
+    return get_judging_config().rubric_name
 
 
 class StudentData:
@@ -135,17 +162,27 @@ def handle_project_import(file_):
 
 
 @transaction.atomic()
+@judging_config_scope()
 def process_project_import(reader, output_stream=None):
-
+    # The scope shares the judging config between the assignment signals of
+    # every imported project
+    rows = []
     for row in reader:
         project_data = ProjectData(**row)
+        rows.append((project_data, project_data.subcategory, project_data.division))
+    numbers = allocate_project_numbers(
+        (subcategory.category, division) for _, subcategory, division in rows
+    )
+
+    for project_data, subcategory, division in rows:
         project = Project.create(
             project_data.title,
             project_data.abstract,
-            project_data.category,
-            project_data.subcategory,
-            project_data.division,
+            subcategory.category,
+            subcategory,
+            division,
             output_stream=output_stream,
+            number=str(next(numbers[(subcategory.category, division)])),
         )
         if not project:
             continue
@@ -163,7 +200,25 @@ def process_project_import(reader, output_stream=None):
             )
 
 
-def assign_judges():
+def allocate_project_numbers(buckets) -> dict:
+    """Allocate a block of project numbers for each category and division.
+
+    Args:
+        buckets: the (category, division) of each project to be numbered.
+
+    Returns:
+        dict: an iterator of numbers for each (category, division).
+    """
+    counts = Counter(buckets)
+    return {
+        (category, division): iter(
+            ProjectNumberCounter.objects.allocate(category, division, count)
+        )
+        for (category, division), count in counts.items()
+    }
+
+
+def assign_judges(judging_config: JudgingConfig = None):
     # 1. Assign judges to new projects
     #    1. Search for projects with fewer than the minimum number of judges.
     #    2. For each project:
@@ -188,82 +243,348 @@ def assign_judges():
     #             judges that have fewer than the number computed above.
     #          2. Remove the project from the first judge and assign it to the new judge.
 
-    rubric = get_judging_rubric()
-    delete_instances_for_inactive_judges(rubric)
+    if judging_config is None:
+        judging_config = get_judging_config()
+    delete_instances_for_inactive_judges(judging_config.rubric)
     judge_queryset = Judge.objects.filter(user__is_active=True)
-    assign_new_projects(rubric, judge_queryset)
-    balance_judges(rubric, judge_queryset)
+    index = EligibilityIndex(judging_config.rubric)
+    assign_new_projects(judging_config, index)
+    balance_judges(judging_config, judge_queryset, index)
+
+
+@transaction.atomic()
+def assign_judges_incrementally(
+    projects=(), judges=(), judging_config: JudgingConfig = None
+) -> int:
+    """Assign judges to new or changed projects and judges.
+
+    Unlike assign_judges, only the category and division buckets of the given
+    projects and judges are read, so late registrations don't re-balance the
+    whole fair. Unlocked judging instances of the given projects and judges
+    that no longer match are removed; every other existing instance is kept.
+    Then, within the affected buckets:
+
+    1. Projects with fewer than the configured number of judges are given
+       the least loaded matching judges.
+    2. The given judges with fewer than the configured number of projects are
+       given the matching projects with the fewest judges.
+
+    Returns:
+        int: the number of judging instances created.
+    """
+    if judging_config is None:
+        judging_config = get_judging_config()
+    rubric = judging_config.rubric
+    project_ids = {project.pk for project in projects}
+    judge_ids = {judge.pk for judge in judges}
+
+    # The projects that lose a judge need another one, and the judges that
+    # lose a project may need another one
+    for judge_id, project_id in remove_stale_instances(rubric, project_ids, judge_ids):
+        project_ids.add(project_id)
+        judge_ids.add(judge_id)
+
+    buckets = set(
+        Project.objects.filter(pk__in=project_ids).values_list(
+            "category_id", "division_id"
+        )
+    )
+    judge_buckets = get_judge_buckets(judge_ids)
+    for judge_buckets_ in judge_buckets.values():
+        buckets.update(judge_buckets_)
+    if not buckets:
+        return 0
+
+    bucket_projects = defaultdict(list)
+    for project_id, category_id, division_id in Project.objects.filter(
+        reduce(
+            ior,
+            (Q(category=category, division=division) for category, division in buckets),
+        )
+    ).values_list("pk", "category_id", "division_id"):
+        bucket_projects[(category_id, division_id)].append(project_id)
+
+    index = EligibilityIndex(
+        rubric,
+        categories={category for category, _ in buckets},
+        divisions={division for _, division in buckets},
+    )
+    num_judges = Counter(
+        JudgingInstance.objects.filter(
+            rubric=rubric,
+            project__in=[pk for pks in bucket_projects.values() for pk in pks],
+        ).values_list("project_id", flat=True)
+    )
+
+    new_assignments = []
+
+    def assign(judge_id, project_id):
+        index.add(judge_id, project_id)
+        new_assignments.append((judge_id, project_id))
+        num_judges[project_id] += 1
+
+    for bucket, project_list in sorted(bucket_projects.items()):
+        for project_id in sorted(project_list, key=num_judges.__getitem__):
+            candidates = (
+                judge_id
+                for judge_id in index.judges_for(*bucket)
+                if not index.is_assigned(judge_id, project_id)
+            )
+            needed = judging_config.judges_per_project - num_judges[project_id]
+            for judge_id in islice(candidates, max(needed, 0)):
+                assign(judge_id, project_id)
+
+    for judge_id in sorted(judge_buckets, key=index.load.__getitem__):
+        candidates = [
+            project_id
+            for bucket in judge_buckets[judge_id]
+            for project_id in bucket_projects[bucket]
+            if not index.is_assigned(judge_id, project_id)
+        ]
+        needed = judging_config.projects_per_judge - index.load[judge_id]
+        for project_id in heapq.nsmallest(
+            needed, candidates, key=num_judges.__getitem__
+        ):
+            assign(judge_id, project_id)
+
+    create_judging_instances(new_assignments, rubric)
+    return len(new_assignments)
+
+
+def remove_stale_instances(rubric, project_ids, judge_ids) -> list:
+    """Delete the unlocked instances of the projects and judges that don't match.
+
+    Returns:
+        list: the (judge id, project id) of each deleted instance.
+    """
+    stale = (
+        JudgingInstance.objects.filter(
+            Q(project__in=project_ids) | Q(judge__in=judge_ids),
+            rubric=rubric,
+            locked=False,
+        )
+        .annotate(
+            category_matches=Exists(
+                Judge.categories.through.objects.filter(
+                    judge=OuterRef("judge"), category=OuterRef("project__category")
+                )
+            ),
+            division_matches=Exists(
+                Judge.divisions.through.objects.filter(
+                    judge=OuterRef("judge"), division=OuterRef("project__division")
+                )
+            ),
+        )
+        .filter(
+            Q(judge__user__is_active=False)
+            | Q(category_matches=False)
+            | Q(division_matches=False)
+        )
+    )
+    removed = list(stale.values_list("pk", "judge_id", "project_id"))
+    JudgingInstance.objects.filter(pk__in=[pk for pk, _, _ in removed]).delete()
+    return [(judge_id, project_id) for _, judge_id, project_id in removed]
+
+
+def get_judge_buckets(judge_ids=None, categories=None, divisions=None) -> dict:
+    """The (category id, division id) pairs each active judge can judge.
+
+    Args:
+        judge_ids: only these judges, if given.
+        categories: only these category ids, if given.
+        divisions: only these division ids, if given.
+    """
+    judge_filter = {"judge__user__is_active": True}
+    if judge_ids is not None:
+        judge_filter["judge__in"] = judge_ids
+    category_rows = Judge.categories.through.objects.filter(**judge_filter)
+    division_rows = Judge.divisions.through.objects.filter(**judge_filter)
+    if categories is not None:
+        category_rows = category_rows.filter(category__in=categories)
+    if divisions is not None:
+        division_rows = division_rows.filter(division__in=divisions)
+
+    judge_categories = defaultdict(set)
+    for judge_id, category_id in category_rows.values_list("judge_id", "category_id"):
+        judge_categories[judge_id].add(category_id)
+    judge_buckets = {}
+    for judge_id, division_id in division_rows.values_list("judge_id", "division_id"):
+        if judge_id in judge_categories:
+            judge_buckets.setdefault(judge_id, set()).update(
+                (category_id, division_id) for category_id in judge_categories[judge_id]
+            )
+    return judge_buckets
+
+
+class EligibilityIndex:
+    """The buckets each active judge can judge, and the projects they have.
+
+    A bucket is a (category id, division id) pair. Assignment code builds one
+    index per operation and records the instances it creates and deletes with
+    add() and remove(), instead of asking the database whether a judge matches
+    a project.
+
+    Args:
+        rubric: the rubric of the judging instances counted.
+        judge_ids, categories, divisions: limit the index, as for
+            get_judge_buckets.
+        assignments: if False, the judging instances aren't read, which is
+            enough for can_judge().
+    """
+
+    def __init__(
+        self, rubric, judge_ids=None, categories=None, divisions=None, assignments=True
+    ):
+        self.judge_buckets = get_judge_buckets(judge_ids, categories, divisions)
+        self.bucket_judges = defaultdict(list)
+        for judge_id, buckets in self.judge_buckets.items():
+            for bucket in buckets:
+                self.bucket_judges[bucket].append(judge_id)
+
+        self.load = Counter()
+        self.assigned = set()
+        if not assignments:
+            return
+        instances = JudgingInstance.objects.filter(rubric=rubric)
+        if (judge_ids, categories, divisions) != (None, None, None):
+            instances = instances.filter(judge__in=list(self.judge_buckets))
+        for judge_id, project_id in instances.values_list("judge_id", "project_id"):
+            if judge_id in self.judge_buckets:
+                self.add(judge_id, project_id)
+
+    def judges_for(self, category_id, division_id, below=None) -> list:
+        """The judges who can judge the bucket, least loaded first.
+
+        Args:
+            below: only judges with fewer projects than this.
+        """
+        judges = self.bucket_judges.get((category_id, division_id), ())
+        if below is not None:
+            judges = [judge_id for judge_id in judges if self.load[judge_id] < below]
+        return sorted(
+            judges,
+            key=lambda judge_id: (
+                self.load[judge_id],
+                len(self.judge_buckets[judge_id]),
+                judge_id,
+            ),
+        )
+
+    def can_judge(self, judge_id, category_id, division_id) -> bool:
+        return (category_id, division_id) in self.judge_buckets.get(judge_id, ())
+
+    def is_assigned(self, judge_id, project_id) -> bool:
+        return (judge_id, project_id) in self.assigned
+
+    def add(self, judge_id, project_id) -> None:
+        self.assigned.add((judge_id, project_id))
+        self.load[judge_id] += 1
 
+    def remove(self, judge_id, project_id) -> None:
+        self.assigned.discard((judge_id, project_id))
+        self.load[judge_id] -= 1
 
-def create_judging_instance(judge, project, rubric):
-    return JudgingInstance.objects.create(judge=judge, project=project, rubric=rubric)
+
+def create_judging_instances(assignments, rubric) -> list[JudgingInstance]:
+    """Create the judging instances, with their responses, in bulk.
+
+    Args:
+        assignments: a (judge id, project id) pair for each instance.
+    """
+    assignments = list(assignments)
+    if not assignments:
+        return []
+    responses = bulk_create_with_ids(
+        RubricResponse, [RubricResponse(rubric=rubric) for _ in assignments]
+    )
+    questions = list(rubric.question_set.all())
+    # Where the responses had to be saved one at a time, saving them already
+    # created their question responses
+    QuestionResponse.objects.bulk_create(
+        (
+            QuestionResponse(rubric_response=response, question=question)
+            for response in responses
+            for question in questions
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return JudgingInstance.objects.bulk_create(
+        [
+            JudgingInstance(
+                judge_id=judge_id,
+                project_id=project_id,
+                response_id=response.pk,
+                rubric_id=rubric.pk,
+            )
+            for (judge_id, project_id), response in zip(assignments, responses)
+        ],
+        batch_size=BATCH_SIZE,
+    )
 
 
 def delete_instances_for_inactive_judges(rubric):
-    JudgingInstance.objects.filter(
-        judge__user__is_active=False, response__rubric=rubric
-    ).delete()
+    JudgingInstance.objects.filter(judge__user__is_active=False, rubric=rubric).delete()
 
 
-def assign_new_projects(rubric, judge_set):
+def assign_new_projects(judging_config: JudgingConfig, index: EligibilityIndex):
+    rubric = judging_config.rubric
+    judges_per_project = judging_config.judges_per_project
     project_set = Project.objects.annotate(
         num_judges=Count("judginginstance")
     ).order_by("num_judges")
 
-    judge_set = judge_set.annotate(
-        num_projects=Count("judginginstance"),
-        num_categories=Count("categories"),
-        num_divisions=Count("divisions"),
-    ).order_by("num_projects", "num_categories", "num_divisions")
-
-    for project in project_set.filter(num_judges__lt=get_minimum_judges_per_project()):
-        num_judges = get_minimum_judges_per_project() - project.num_judges
-        judges = judge_set.filter(
-            categories=project.category, divisions=project.division
-        )
-
-        for judge in judges.all():
-            judge_projects = [
-                ji.project
-                for ji in judge.judginginstance_set.select_related("project").all()
-            ]
-            if project in judge_projects:
+    assignments = []
+    for project in project_set.filter(num_judges__lt=judges_per_project):
+        num_judges = judges_per_project - project.num_judges
+        for judge_id in index.judges_for(project.category_id, project.division_id):
+            if index.is_assigned(judge_id, project.pk):
                 continue
             else:
-                # print('Assigning {0} to {1}'.format(project, judge))
-                create_judging_instance(judge, project, rubric)
+                assignments.append((judge_id, project.pk))
+                index.add(judge_id, project.pk)
                 num_judges -= 1
 
                 if num_judges <= 0:
                     break
+    create_judging_instances(assignments, rubric)
 
 
 def get_minimum_judges_per_project():
-    return config.JUDGES_PER_PROJECT
+    return get_judging_config().judges_per_project
 
 
 def get_minimum_projects_per_judge():
-    return config.PROJECTS_PER_JUDGE
+    return get_judging_config().projects_per_judge
 
 
-def balance_judges(rubric, judge_queryset):
+def balance_judges(
+    judging_config: JudgingConfig, judge_queryset, index: EligibilityIndex
+):
+    rubric = judging_config.rubric
     quotients = build_quotient_array(judge_queryset)
 
     judge_set = judge_queryset.annotate(
         num_projects=Count("judginginstance", distinct=True)
     )
-    lower_bound = get_project_balancing_lower_bound(judge_set)
+    lower_bound = get_project_balancing_lower_bound(
+        judge_set, judging_config.projects_per_judge
+    )
 
-    for judge in judge_set.filter(num_projects__gt=lower_bound).order_by(
-        "-num_projects"
-    ):
-        balance_judge(
-            judge,
-            rubric,
-            judge_set.filter(num_projects__lt=lower_bound).order_by("num_projects"),
-            lower_bound,
-            quotients,
+    judges = list(
+        judge_set.filter(num_projects__gt=lower_bound).order_by("-num_projects")
+    )
+    reassignable = defaultdict(list)
+    for instance in get_instances_that_can_be_reassigned(judges, rubric):
+        reassignable[instance.judge_id].append(instance)
+
+    # The index tracks the moves, so they're saved together at the end
+    reassignments = []
+    for judge in judges:
+        reassignments.extend(
+            balance_judge(judge, reassignable[judge.pk], index, lower_bound, quotients)
         )
+    reassign_projects(reassignments, rubric)
 
 
 def build_quotient_array(judge_queryset):
@@ -314,10 +635,9 @@ def build_quotient_array(judge_queryset):
     return quotient_array
 
 
-def get_project_balancing_lower_bound(judge_set):
+def get_project_balancing_lower_bound(judge_set, minimum):
     median = get_median_projects_per_judge(judge_set)
     # print('Median: ', median)
-    minimum = get_minimum_projects_per_judge()
     # print('Minimum: ', minimum)
     average = judge_set.aggregate(avg_projects=Avg("num_projects"))["avg_projects"]
     # print('Average: ', average)
@@ -337,63 +657,70 @@ def median_value(queryset, term):
         return sum(values[count / 2 - 1 : count / 2 + 1]) / 2.0
 
 
-def balance_judge(judge, rubric, possible_judges, lower_bound, quotients):
-    # print(judge)
+def balance_judge(judge, instances, index, lower_bound, quotients) -> list:
+    """Choose judges to take some of judge's reassignable instances.
+
+    Returns:
+        list: (judging instance, new judge id) for each instance to move.
+    """
     num_to_reassign = judge.num_projects - lower_bound
-    cat_Q = reduce(ior, (Q(categories=cat) for cat in judge.categories.all()))
-    div_Q = reduce(ior, (Q(divisions=div) for div in judge.divisions.all()))
-    # print(num_to_reassign)
+    judge_buckets = index.judge_buckets.get(judge.pk, ())
 
     def sort_value(judging_instance):
         project = judging_instance.project
         return quotients[project.category][project.division].projects_per_judge
 
-    instances = sorted(
-        get_instances_that_can_be_reassigned(judge, rubric), key=sort_value
-    )
-    for ji in instances:
-        avail_judge = get_available_judge(ji.project, rubric, possible_judges)
+    reassignments = []
+    for ji in sorted(instances, key=sort_value):
+        avail_judge = get_available_judge(ji.project, index, lower_bound)
         if avail_judge:
-            if reassign_project(ji, avail_judge):
-                num_to_reassign -= 1
-
-                # for j in possible_judges.filter(cat_Q, div_Q):
-                # print(j, j.num_projects)
+            index.add(avail_judge, ji.project_id)
+            index.remove(ji.judge_id, ji.project_id)
+            reassignments.append((ji, avail_judge))
+            num_to_reassign -= 1
 
-                if num_to_reassign <= 0:
-                    break
-                elif not possible_judges.filter(cat_Q, div_Q).exists():
-                    break
+            if num_to_reassign <= 0:
+                break
+            elif not any(
+                index.judges_for(*bucket, below=lower_bound) for bucket in judge_buckets
+            ):
+                break
+    return reassignments
 
 
-def get_instances_that_can_be_reassigned(judge, rubric):
-    return judge.judginginstance_set.filter(
-        response__rubric=rubric, locked=False
-    ).select_related("response", "project")
+def get_instances_that_can_be_reassigned(judges, rubric):
+    return JudgingInstance.objects.filter(
+        judge__in=judges, rubric=rubric, locked=False
+    ).select_related("project__category", "project__division")
 
 
-def get_available_judge(project, rubric, possible_judges):
-    for judge in possible_judges.filter(
-        categories=project.category, divisions=project.division
+def get_available_judge(project, index, lower_bound):
+    """The least loaded judge below lower_bound who can take the project."""
+    for judge_id in index.judges_for(
+        project.category_id, project.division_id, below=lower_bound
     ):
-        if judge.judginginstance_set.filter(
-            project=project, response__rubric=rubric
-        ).exists():
+        if index.is_assigned(judge_id, project.pk):
             # The judge has already been assigned this project, so continue
             continue
         else:
-            return judge
+            return judge_id
     return None
 
 
 @transaction.atomic()
-def reassign_project(judging_instance, to_judge):
-    # print("Reassigning {0} from {1} to {2}".format(judging_instance.project.number, judging_instance.judge, to_judge))
-    new_instance = create_judging_instance(
-        to_judge, judging_instance.project, judging_instance.response.rubric
+def reassign_projects(reassignments, rubric) -> None:
+    """Move each judging instance to its new judge, with a new response.
+
+    Args:
+        reassignments: (judging instance, new judge id) pairs.
+    """
+    create_judging_instances(
+        [(to_judge, instance.project_id) for instance, to_judge in reassignments],
+        rubric,
     )
-    judging_instance.delete()
-    return new_instance
+    JudgingInstance.objects.filter(
+        pk__in=[instance.pk for instance, _ in reassignments]
+    ).delete()
 
 
 def email_teachers(site_name, domain, use_https=False):
@@ -442,15 +769,406 @@ def get_teachers():
 
 
 def get_projects_sorted_by_score() -> list:
-    def sort_func(project: Project):
-        return (
-            (project.average_score() * -1, project.num_scores() * -1),
-            project.number,
+    return list(
+        Project.objects.with_average_score().order_by(
+            "-avg_score", "-score_count", "number"
         )
+    )
+
+
+class ResultRow:
+    """A project on the Results page, with everything the page shows."""
 
-    project_list = list(Project.objects.all())
-    project_list.sort(key=sort_func)
-    return project_list
+    __slots__ = (
+        "number",
+        "title",
+        "avg_score",
+        "score_count",
+        "judge_scores",
+        "students",
+        "awards",
+    )
+
+    def __init__(self, number, title, avg_score, score_count):
+        self.number = number
+        self.title = title
+        self.avg_score = avg_score
+        self.score_count = score_count
+        # (judge name, score) for each judging instance
+        self.judge_scores = []
+        self.students = []
+        self.awards = []
+
+
+def get_result_rows() -> list[ResultRow]:
+    """A ResultRow for each project, sorted as by get_projects_sorted_by_score.
+
+    Runs a fixed number of queries, whatever the number of projects.
+    """
+    return _build_result_rows(*_result_row_queries())
+
+
+async def aget_result_rows() -> list[ResultRow]:
+    """get_result_rows() for async views, using the async ORM."""
+    return _build_result_rows(
+        *[[row async for row in query] for query in _result_row_queries()]
+    )
+
+
+def _result_row_queries() -> tuple:
+    projects = (
+        Project.objects.with_average_score()
+        .order_by("-avg_score", "-score_count", "number")
+        .values_list("pk", "number", "title", "avg_score", "score_count")
+    )
+    judge_scores = (
+        JudgingInstance.objects.order_by("pk")
+        .annotate(score=rubric_response_score("response"))
+        .values_list(
+            "project_id", "judge__user__first_name", "judge__user__last_name", "score"
+        )
+    )
+    students = Student.objects.filter(project__isnull=False).values_list(
+        "project_id", "first_name", "last_name"
+    )
+    # Joined rather than looked up, which could run a query outside the ORM
+    award_instances = AwardInstance.objects.filter(
+        content_type__app_label=Project._meta.app_label,
+        content_type__model=Project._meta.model_name,
+    ).select_related("award")
+    return projects, judge_scores, students, award_instances
+
+
+def _build_result_rows(projects, judge_scores, students, award_instances):
+    rows = {
+        pk: ResultRow(number, title, avg_score, score_count)
+        for pk, number, title, avg_score, score_count in projects
+    }
+
+    for project_id, first_name, last_name, score in judge_scores:
+        rows[project_id].judge_scores.append((f"{first_name} {last_name}", score))
+
+    for project_id, first_name, last_name in students:
+        rows[project_id].students.append(f"{first_name} {last_name}")
+
+    for award_instance in award_instances:
+        row = rows.get(int(award_instance.object_id))
+        if row is not None:
+            row.awards.append(award_instance.award)
+
+    return list(rows.values())
+
+
+class SaveResult(NamedTuple):
+    # The progress of each instance, as returned by get_judging_progress
+    progress: dict
+    # The current answer and last_submitted of each answer that wasn't saved
+    # because it was answered again later, keyed like the errors
+    conflicts: dict
+
+
+@transaction.atomic()
+def save_judging_responses(user, answers: dict, submitted: dict = None) -> SaveResult:
+    """Apply partial answers to the responses of judging instances in bulk.
+
+    The instances answered are locked, like opening them for editing does.
+
+    Args:
+        user: the user saving the answers. Only the judge of an instance and
+            staff may answer it.
+        answers: the new answers of each instance, keyed by judging instance
+            id and then by question id. None clears an answer.
+        submitted: when each answer was given, keyed by (judging instance id,
+            question id), for answers that were queued on a device. An answer
+            given before the saved one was submitted is a conflict, and the
+            last one wins. Answers without a time are given now.
+
+    Raises:
+        PermissionDenied: if the user can't answer one of the instances.
+        ValidationError: with the errors of the answers, keyed by
+            "<judging instance id>.<question id>". Nothing is saved.
+
+    """
+    submitted = submitted or {}
+    # The rubric response of each instance, by instance id
+    instances = {}
+    for instance_id, judge_id, response_id in JudgingInstance.objects.filter(
+        pk__in=answers
+    ).values_list("pk", "judge", "response"):
+        if judge_id != user.pk and not (user.is_staff or user.is_superuser):
+            raise PermissionDenied
+        instances[instance_id] = response_id
+
+    # Locked so overlapping saves of the same answers, like a judge's device
+    # syncing during a staff edit, check last_submitted one after the other
+    question_responses = defaultdict(dict)
+    for response in (
+        QuestionResponse.objects.filter(rubric_response__in=instances.values())
+        .select_for_update(of=("self",))
+        .select_related("question")
+        .prefetch_related("question__choice_set")
+    ):
+        question_responses[response.rubric_response_id][response.question_id] = response
+
+    errors = {}
+    conflicts = {}
+    updates = []
+    for instance_id, instance_answers in answers.items():
+        if instance_id not in instances:
+            errors[str(instance_id)] = [
+                "You are no longer assigned to judge that project"
+            ]
+            continue
+        responses = question_responses[instances[instance_id]]
+        for question_id, value in instance_answers.items():
+            key = "{0}.{1}".format(instance_id, question_id)
+            if question_id not in responses:
+                errors[key] = ["Not a question of this rubric"]
+                continue
+            response = responses[question_id]
+            try:
+                value = clean_answer(response.question, value)
+            except ValidationError as error:
+                errors[key] = error.messages
+                continue
+
+            answered = submitted.get((instance_id, question_id))
+            if (
+                answered
+                and response.last_submitted
+                and answered < response.last_submitted
+            ):
+                conflicts[key] = {
+                    "value": response.response,
+                    "last_submitted": response.last_submitted,
+                }
+            else:
+                updates.append((response, value, answered))
+    if errors:
+        raise ValidationError(errors)
+
+    QuestionResponse.objects.update_responses(updates)
+    JudgingInstance.objects.filter(pk__in=instances, locked=False).update(locked=True)
+    return SaveResult(get_judging_progress(instances), conflicts)
+
+
+def clean_answer(question, value):
+    """Validate an answer with the field the rubric form uses for the question."""
+    if value is None:
+        return None
+    field = RubricForm.DEFAULT_FIELD_DICT.get(question.question_type, default_field)(
+        question, override_required=False
+    )
+    # Blank answers are stored as no answer
+    return field.clean(value) or None
+
+
+def get_judging_progress(instance_ids) -> dict:
+    """The completion and score of each judging instance, keyed by id."""
+    return {
+        progress.pop("pk"): progress
+        for progress in _progress_values(
+            JudgingInstance.objects.filter(pk__in=instance_ids)
+        )
+    }
+
+
+async def aget_judge_progress(judge: Judge, rubric_name: str) -> dict:
+    """get_judging_progress() for a judge's instances, using the async ORM."""
+    return {
+        progress.pop("pk"): progress
+        async for progress in _progress_values(
+            JudgingInstance.objects.filter(judge=judge, rubric__name=rubric_name)
+        )
+    }
+
+
+def _progress_values(instances):
+    return instances.with_progress().values(
+        "pk",
+        "locked",
+        started=F("response_started"),
+        complete=F("response_complete"),
+        score=F("response_score"),
+        last_submitted=F("response_last_submitted"),
+    )
+
+
+# The counts in each row of a ProgressSummary
+PROGRESS_COUNTS = ("total", "unstarted", "in_progress", "complete", "stale")
+
+
+class ProgressSummary(NamedTuple):
+    # Counts for all the judging instances of the current rubric
+    totals: dict
+    # Counts for each judge, project, and category and division
+    judges: list[dict]
+    projects: list[dict]
+    buckets: list[dict]
+    # In progress instances with no answer submitted since then are stale
+    stale_before: datetime
+
+
+def get_progress_summary(stale_minutes: int = 30) -> ProgressSummary:
+    """How far along judging is, by judge, by project and by category and division.
+
+    Counts the unstarted, in progress and complete judging instances of the
+    current rubric, and the stale ones: in progress, with no answer submitted
+    in the last stale_minutes. Runs two grouped queries, whatever the number
+    of instances. The category and division counts and the totals are added
+    up from the project rows.
+    """
+    stale_before = timezone.now() - timedelta(minutes=stale_minutes)
+    instances = JudgingInstance.objects.filter(rubric__name=get_rubric_name())
+    counts = _progress_counts(stale_before)
+
+    judges = list(
+        instances.order_by("judge__user__last_name", "judge__user__first_name")
+        .values(
+            "judge_id",
+            first_name=F("judge__user__first_name"),
+            last_name=F("judge__user__last_name"),
+            username=F("judge__user__username"),
+        )
+        .annotate(**counts)
+    )
+    projects = list(
+        instances.order_by("project__number", "project__title")
+        .values(
+            "project_id",
+            number=F("project__number"),
+            title=F("project__title"),
+            category=F("project__category__short_description"),
+            division=F("project__division__short_description"),
+        )
+        .annotate(**counts)
+    )
+
+    buckets = {}
+    for project in projects:
+        key = (project["category"], project["division"])
+        if key not in buckets:
+            buckets[key] = dict.fromkeys(PROGRESS_COUNTS, 0)
+            buckets[key].update(category=key[0], division=key[1])
+        _add_counts(buckets[key], project)
+    totals = dict.fromkeys(PROGRESS_COUNTS, 0)
+    for bucket in buckets.values():
+        _add_counts(totals, bucket)
+
+    return ProgressSummary(
+        totals=totals,
+        judges=judges,
+        projects=projects,
+        buckets=[buckets[key] for key in sorted(buckets)],
+        stale_before=stale_before,
+    )
+
+
+def _progress_counts(stale_before: datetime) -> dict:
+    # Used directly in the filters, since annotating them first would add
+    # them to the GROUP BY
+    started = rubric_response_has_response("response")
+    complete = rubric_response_complete("response")
+    submitted_recently = Exists(
+        QuestionResponse.objects.filter(
+            rubric_response=OuterRef("response"), last_submitted__gte=stale_before
+        )
+    )
+    return {
+        "total": Count("pk"),
+        "unstarted": Count("pk", filter=~started),
+        "in_progress": Count("pk", filter=started & ~complete),
+        "complete": Count("pk", filter=started & complete),
+        "stale": Count("pk", filter=started & ~complete & ~submitted_recently),
+    }
+
+
+def _add_counts(to: dict, counts: dict) -> None:
+    for field in PROGRESS_COUNTS:
+        to[field] += counts[field]
+
+
+def get_offline_data(judge: Judge, rubric_name: str) -> dict:
+    """Everything a judge's device needs to score their projects offline.
+
+    Has the judge's assigned projects with their students, the rubrics with
+    their questions and choices, and the saved answers with when they were
+    submitted, loaded in a fixed number of queries.
+
+    """
+    instances = list(
+        JudgingInstance.objects.filter(judge=judge, rubric__name=rubric_name)
+        .order_by("project__number")
+        .select_related(
+            "project__category", "project__subcategory", "project__division"
+        )
+        .prefetch_related(
+            Prefetch(
+                "project__student_set",
+                queryset=Student.objects.select_related("teacher__school"),
+            )
+        )
+    )
+
+    answers = defaultdict(dict)
+    for response in QuestionResponse.objects.filter(
+        rubric_response__in=[instance.response_id for instance in instances]
+    ).select_related("question"):
+        answers[response.rubric_response_id][response.question_id] = {
+            "value": response.response,
+            "last_submitted": response.last_submitted,
+        }
+
+    rubrics = {}
+    for question in (
+        Question.objects.filter(
+            rubric__in={instance.rubric_id for instance in instances}
+        )
+        .order_by("order", "pk")
+        .prefetch_related("choice_set")
+    ):
+        rubrics.setdefault(question.rubric_id, []).append(
+            {
+                "id": question.pk,
+                "type": question.question_type,
+                "description": question.description(),
+                "help_text": question.help_text,
+                "required": question.required,
+                "choices": list(question.choices()),
+            }
+        )
+
+    return {
+        "rubrics": {
+            rubric_id: {"questions": questions}
+            for rubric_id, questions in rubrics.items()
+        },
+        "instances": [
+            {
+                "id": instance.pk,
+                "rubric": instance.rubric_id,
+                "locked": instance.locked,
+                "project": {
+                    "number": instance.project.number,
+                    "title": instance.project.title,
+                    "abstract": instance.project.abstract,
+                    "judge_notes": instance.project.judge_notes,
+                    "category": instance.project.category.short_description,
+                    "subcategory": instance.project.subcategory.short_description,
+                    "division": instance.project.division.short_description,
+                    "students": [
+                        {
+                            "name": student.full_name,
+                            "school": student.teacher.school.name,
+                        }
+                        for student in instance.project.student_set.all()
+                    ],
+                },
+                "answers": answers[instance.response_id],
+            }
+            for instance in instances
+        ],
+    }
 
 
 def mass_email(
@@ -533,8 +1251,12 @@ class FeedbackQuestion:
                 combined_set.add(resp)
         return combined_set
 
+    @property
+    def question_type(self) -> QuestionType:
+        return QuestionType.get_instance(self.question)
+
     def response_list_external(self):
-        return [resp.response_external() for resp in self.responses]
+        return self.question_type.responses_external(self.question, self.responses)
 
     def response_list_external_remove_empty(self):
         return list(filter(None, self.response_list_external()))
@@ -543,13 +1265,13 @@ class FeedbackQuestion:
         return self._combine_responses(self.response_list_external())
 
     def score_list(self):
-        return [resp.score() for resp in self.responses]
+        return self.question_type.scores(self.question, self.responses)
 
     def score_list_remove_empty(self):
         return list(filter(None, self.score_list()))
 
     def unweighted_score_list(self):
-        return [resp.unweighted_score() for resp in self.responses]
+        return self.question_type.unweighted_scores(self.question, self.responses)
 
     def average_score(self):
         return self._compute_average(self.score_list())
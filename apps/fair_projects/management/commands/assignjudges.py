@@ -1,13 +1,64 @@
 from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
 
-from apps.fair_projects.logic import assign_judges
+from apps.fair_projects.logic import assign_judges, assign_judges_incrementally
+from apps.fair_projects.models import Project
+from apps.judges.models import Judge
+from fair_scoring_site.judging_config import get_judging_config
 
 
 class Command(BaseCommand):
     help = "Assigns projects to judges"
 
-    # def add_arguments(self, parser):
-    #     parser.add_argument('csv_path', type=str)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            action="append",
+            default=[],
+            dest="projects",
+            metavar="NUMBER",
+            help="Only assign judges within the category and division of this "
+            "project. May be given more than once",
+        )
+        parser.add_argument(
+            "--judge",
+            action="append",
+            default=[],
+            dest="judges",
+            metavar="USERNAME",
+            help="Only assign projects within the categories and divisions of "
+            "this judge. May be given more than once",
+        )
+        parser.add_argument(
+            "--new",
+            action="store_true",
+            help="Only assign judges for projects that need more judges and "
+            "judges without projects, such as late registrations",
+        )
 
     def handle(self, *args, **options):
-        assign_judges()
+        if not (options["projects"] or options["judges"] or options["new"]):
+            assign_judges()
+            return
+
+        projects = list(Project.objects.filter(number__in=options["projects"]))
+        missing = set(options["projects"]) - {project.number for project in projects}
+        if missing:
+            raise CommandError(f"No projects numbered {', '.join(sorted(missing))}")
+
+        judges = list(Judge.objects.filter(user__username__in=options["judges"]))
+        missing = set(options["judges"]) - {judge.user.username for judge in judges}
+        if missing:
+            raise CommandError(f"No judges named {', '.join(sorted(missing))}")
+
+        judging_config = get_judging_config()
+        if options["new"]:
+            projects += Project.objects.annotate(
+                num_judges=Count("judginginstance")
+            ).filter(num_judges__lt=judging_config.judges_per_project)
+            judges += Judge.objects.filter(
+                user__is_active=True, judginginstance__isnull=True
+            )
+
+        created = assign_judges_incrementally(projects, judges, judging_config)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} judging instances"))
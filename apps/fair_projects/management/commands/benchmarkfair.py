@@ -0,0 +1,80 @@
+import json
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.fair_projects.benchmarks import BENCHMARKS, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds fairs of different sizes and reports the time and number of "
+        "queries for the judging hot paths. Nothing is saved to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[100, 1000, 10000],
+            help="Numbers of projects to benchmark",
+        )
+        parser.add_argument(
+            "--benchmarks",
+            nargs="+",
+            choices=list(BENCHMARKS),
+            help="Benchmarks to run. Defaults to all of them",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed for the seeded fairs"
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+        parser.add_argument(
+            "--baseline",
+            help="JSON results from an earlier run to compare against",
+        )
+
+    def handle(self, *args, **options):
+        results = {
+            "database": connection.vendor,
+            "django": django.get_version(),
+            "seed": options["seed"],
+            "sizes": {},
+        }
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline_file:
+                baseline = json.load(baseline_file)["sizes"]
+
+        for size in options["sizes"]:
+            result = run_benchmarks(
+                size, names=options["benchmarks"], seed=options["seed"]
+            )
+            results["sizes"][str(size)] = result
+            self.write_report(size, result, baseline.get(str(size), {}))
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    def write_report(self, size: int, result: dict, baseline: dict) -> None:
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"{size} projects, {result['judges']} judges "
+                f"(seeded in {result['seed_seconds']:.2f}s)"
+            )
+        )
+        for name, measurement in result["benchmarks"].items():
+            line = (
+                f"  {name:<30} {measurement['seconds']:>9.3f}s "
+                f"{measurement['queries']:>8} queries"
+            )
+            previous = baseline.get("benchmarks", {}).get(name)
+            if previous:
+                line += (
+                    f"  (was {previous['seconds']:.3f}s, "
+                    f"{previous['queries']} queries)"
+                )
+            self.stdout.write(line)
@@ -0,0 +1,102 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.fair_projects.server_benchmarks import (
+    DEFAULT_PAGES,
+    PAGES,
+    busiest_judge,
+    run_server_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the throughput of the WSGI and ASGI handlers for many slow "
+        "clients requesting the read-heavy pages at once. Run it against a "
+        "seeded fair."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages",
+            nargs="+",
+            choices=list(PAGES),
+            default=DEFAULT_PAGES,
+            help="Pages to request. Default: %(default)s",
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            nargs="+",
+            default=[1, 10, 50],
+            help="Numbers of clients connected at once",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=5,
+            help="Requests each client makes, one after another. Default: 5",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="WSGI worker threads. Default: 4",
+        )
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0.5,
+            help="Seconds a client takes to receive a response. Default: 0.5",
+        )
+        parser.add_argument(
+            "--username",
+            help="User to log in as. Defaults to the judge with the most projects",
+        )
+        parser.add_argument(
+            "--host", default="localhost", help="Host header. Default: localhost"
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        judge = busiest_judge()
+        if judge is None:
+            raise CommandError("There are no judges. Seed a fair with seedfair first.")
+        user = judge.user
+        if options["username"]:
+            try:
+                user = User.objects.get(username=options["username"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['username']}")
+
+        results = run_server_benchmarks(
+            user,
+            judge,
+            options["pages"],
+            options["clients"],
+            rounds=options["requests"],
+            workers=options["workers"],
+            client_delay=options["client_delay"],
+            host=options["host"],
+            report=self.write_report,
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    def write_report(self, page: str, path: str, clients: int, result: dict) -> None:
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f"{page} ({path}), {clients} clients")
+        )
+        for server, measurement in result.items():
+            line = (
+                f"  {server:<5} {measurement['requests_per_second']:>8.1f} req/s "
+                f"p50 {measurement['p50_ms']:>8.1f}ms "
+                f"p95 {measurement['p95_ms']:>8.1f}ms"
+            )
+            if measurement["errors"]:
+                line += f"  {measurement['errors']} errors"
+            self.stdout.write(line)
@@ -0,0 +1,164 @@
+import json
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.awards.models import AwardInstance
+from apps.fair_categories.models import Subcategory
+from apps.fair_projects.models import JudgingInstance, Project
+from apps.rubrics.models import QuestionResponse
+
+# Indexes added for the judging hot paths, as (model, index name). Indexes
+# from db_index=True fields are named by the database and are looked up as
+# (model, field name) instead. The unique constraints on JudgingInstance and
+# QuestionResponse, and the unique project number, are part of the table on
+# SQLite, so they can't be dropped for comparison.
+HOT_PATH_INDEXES = (
+    (JudgingInstance, "fair_projec_judge_i_feccd8_idx"),
+    (JudgingInstance, "fair_projec_project_e475d2_idx"),
+    (Project, "fair_projec_categor_82c5cf_idx"),
+    (AwardInstance, "awards_awar_content_3dc814_idx"),
+)
+HOT_PATH_INDEXED_FIELDS = ((Subcategory, "short_description"),)
+
+
+def hot_path_queries() -> dict:
+    """Return the hot path querysets, filtered on values from the database."""
+    instance = JudgingInstance.objects.select_related("project").first()
+    response = QuestionResponse.objects.first()
+    if instance is None or response is None:
+        raise CommandError(
+            "The database needs judging instances and responses to explain; "
+            "seed some data first"
+        )
+
+    project = instance.project
+    return {
+        "judge_instances": JudgingInstance.objects.filter(
+            judge=instance.judge_id, rubric=instance.rubric_id, locked=False
+        ),
+        "project_instances": JudgingInstance.objects.filter(
+            project=project, rubric=instance.rubric_id
+        ),
+        "question_responses": QuestionResponse.objects.filter(
+            question=response.question_id
+        ),
+        "rubric_question_response": QuestionResponse.objects.filter(
+            rubric_response=response.rubric_response_id,
+            question=response.question_id,
+        ),
+        "project_awards": AwardInstance.objects.filter(
+            content_type=ContentType.objects.get_for_model(Project),
+            object_id=str(project.pk),
+        ),
+        "projects_in_bucket": Project.objects.filter(
+            category=project.category_id, division=project.division_id
+        ),
+        "project_by_number": Project.objects.filter(number=project.number),
+        "subcategory_by_name": Subcategory.objects.filter(
+            short_description=project.subcategory.short_description
+        ),
+    }
+
+
+def explain_queries(queries: dict, repeat: int, label: str) -> dict:
+    """Time and explain each query.
+
+    The label is added to the SQL as a comment. SQLite caches prepared
+    statements by their text and doesn't replan a cached EXPLAIN after an
+    index is dropped, so each run needs distinct SQL.
+
+    """
+    results = {}
+    with connection.cursor() as cursor:
+        for name, queryset in queries.items():
+            sql, params = queryset.query.sql_with_params()
+            sql = f"{sql} /* {label} */"
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                cursor.execute(sql, params)
+                cursor.fetchall()
+            elapsed = (time.perf_counter() - start) / repeat
+
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            plan = "\n".join(" ".join(str(col) for col in row) for row in cursor)
+            results[name] = {
+                "sql": str(queryset.query),
+                "plan": plan,
+                "ms": round(elapsed * 1000, 3),
+            }
+    return results
+
+
+def drop_hot_path_indexes() -> None:
+    """Drop the hot path indexes. Only call this inside a rolled back transaction."""
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        names = [name for _, name in HOT_PATH_INDEXES]
+        for model, field_name in HOT_PATH_INDEXED_FIELDS:
+            column = model._meta.get_field(field_name).column
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+            names.extend(
+                name
+                for name, info in constraints.items()
+                if info["index"] and not info["unique"] and info["columns"] == [column]
+            )
+        for name in names:
+            cursor.execute("DROP INDEX %s" % quote_name(name))
+
+
+class Command(BaseCommand):
+    help = "Prints query plans and timings for the judging hot path queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Also explain the queries with the hot path indexes dropped "
+            "(SQLite only; the indexes are restored afterwards)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of times to run each query when timing it",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Write the results as JSON"
+        )
+
+    def handle(self, *args, **options):
+        queries = hot_path_queries()
+        results = {"indexed": explain_queries(queries, options["repeat"], "indexed")}
+
+        if options["compare"]:
+            if connection.vendor != "sqlite":
+                raise CommandError("--compare is only supported on SQLite")
+            with transaction.atomic():
+                drop_hot_path_indexes()
+                results["baseline"] = explain_queries(
+                    queries, options["repeat"], "baseline"
+                )
+                transaction.set_rollback(True)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.write_report(results)
+
+    def write_report(self, results: dict) -> None:
+        for name, indexed in results["indexed"].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(indexed["sql"])
+            self.stdout.write(f"Plan ({indexed['ms']} ms):\n{indexed['plan']}")
+            if "baseline" in results:
+                baseline = results["baseline"][name]
+                self.stdout.write(
+                    f"Plan without indexes ({baseline['ms']} ms):\n{baseline['plan']}"
+                )
+            self.stdout.write("")
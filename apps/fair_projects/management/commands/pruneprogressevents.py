@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.fair_projects.models import ProgressEvent
+
+
+class Command(BaseCommand):
+    help = "Deletes old events of the live results stream"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=1,
+            help="Keep the events of this many days. Default: 1",
+        )
+
+    def handle(self, *args, **options):
+        deleted, _ = ProgressEvent.objects.filter(
+            created__lt=timezone.now() - timedelta(days=options["days"])
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} progress events"))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.fair_projects.models import SavedRequest
+
+
+class Command(BaseCommand):
+    help = "Deletes the saved responses of old requests made with an Idempotency-Key"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Keep the requests of this many days. Default: 7",
+        )
+
+    def handle(self, *args, **options):
+        deleted, _ = SavedRequest.objects.filter(
+            created__lt=timezone.now() - timedelta(days=options["days"])
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} saved requests"))
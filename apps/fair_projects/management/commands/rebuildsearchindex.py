@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.fair_projects.models import ProjectSearchEntry
+from apps.fair_projects.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the project search index"
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {ProjectSearchEntry.objects.count()} projects")
+        )
@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.fair_projects.models import Project
+from apps.fair_projects.seeding import clear_fair, seed_fair
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic fair of projects, judges and responses for load testing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--projects", type=int, default=100, help="Number of projects to create"
+        )
+        parser.add_argument(
+            "--judges",
+            type=int,
+            help="Number of judges to create. Defaults to enough judges for "
+            "the configured projects per judge",
+        )
+        parser.add_argument(
+            "--answered",
+            type=float,
+            default=0.5,
+            help="Fraction of judging instances with answers",
+        )
+        parser.add_argument(
+            "--complete",
+            type=float,
+            default=0.8,
+            help="Fraction of answered judging instances that are complete",
+        )
+        parser.add_argument(
+            "--seed", type=int, help="Random seed, for generating the same fair again"
+        )
+        parser.add_argument(
+            "--no-assign",
+            action="store_false",
+            dest="assign",
+            help="Don't create judging instances or answers",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete a fair seeded before first. Projects that weren't "
+            "seeded are kept",
+        )
+
+    def handle(self, *args, **options):
+        for option in ("answered", "complete"):
+            if not 0 <= options[option] <= 1:
+                raise CommandError(f"--{option} must be between 0 and 1")
+
+        with transaction.atomic():
+            if options["clear"]:
+                clear_fair()
+                if Project.objects.exists():
+                    raise CommandError(
+                        "The database has projects that weren't seeded, which "
+                        "--clear doesn't delete"
+                    )
+            elif Project.objects.exists():
+                raise CommandError(
+                    "The database already has projects; use --clear to replace "
+                    "a seeded fair"
+                )
+
+            try:
+                result = seed_fair(
+                    options["projects"],
+                    judges=options["judges"],
+                    answered=options["answered"],
+                    complete=options["complete"],
+                    seed=options["seed"],
+                    assign=options["assign"],
+                )
+            except ValueError as err:
+                raise CommandError(err)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result.projects} projects with {result.students} students, "
+                f"{result.judges} judges and {result.judging_instances} judging "
+                f"instances ({result.answered_responses} answered) for "
+                f'rubric "{result.rubric}"'
+            )
+        )
@@ -0,0 +1,118 @@
+# Generated by Django 4.1.13 on 2026-10-19 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_rubric_from_response(apps, schema_editor):
+    JudgingInstance = apps.get_model("fair_projects", "JudgingInstance")
+    RubricResponse = apps.get_model("rubrics", "RubricResponse")
+    JudgingInstance.objects.update(
+        rubric=models.Subquery(
+            RubricResponse.objects.filter(pk=models.OuterRef("response")).values(
+                "rubric"
+            )[:1]
+        )
+    )
+    # An instance without a response has no rubric and can't be judged
+    JudgingInstance.objects.filter(rubric=None).delete()
+
+
+def delete_duplicate_instances(apps, schema_editor):
+    """Keep one instance of each judge, project and rubric.
+
+    The one with the most answers is kept, or the first one of those. The
+    responses of the others are deleted with them.
+
+    """
+    JudgingInstance = apps.get_model("fair_projects", "JudgingInstance")
+    RubricResponse = apps.get_model("rubrics", "RubricResponse")
+    duplicated = (
+        JudgingInstance.objects.values("judge", "project", "rubric")
+        .annotate(count=models.Count("pk"))
+        .filter(count__gt=1)
+    )
+    for row in duplicated:
+        instances = JudgingInstance.objects.filter(
+            judge=row["judge"], project=row["project"], rubric=row["rubric"]
+        )
+        keep = (
+            instances.annotate(
+                answers=models.Count(
+                    "response__questionresponse",
+                    filter=models.Q(
+                        response__questionresponse__last_submitted__isnull=False
+                    ),
+                )
+            )
+            .order_by("-answers", "pk")
+            .values_list("pk", flat=True)[0]
+        )
+        duplicates = instances.exclude(pk=keep)
+        response_ids = list(duplicates.values_list("response", flat=True))
+        duplicates.delete()
+        RubricResponse.objects.filter(pk__in=response_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rubrics", "0016_questionresponse_unique_question_response"),
+        ("fair_projects", "0010_alter_student_options_alter_teacher_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="judginginstance",
+            name="rubric",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="rubrics.rubric",
+            ),
+        ),
+        migrations.RunPython(copy_rubric_from_response, migrations.RunPython.noop),
+        migrations.RunPython(delete_duplicate_instances, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="judginginstance",
+            name="rubric",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="rubrics.rubric",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="project",
+            name="number",
+            field=models.CharField(blank=True, db_index=True, max_length=5),
+        ),
+        migrations.AddIndex(
+            model_name="judginginstance",
+            index=models.Index(
+                fields=["judge", "rubric", "locked"],
+                name="fair_projec_judge_i_feccd8_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="judginginstance",
+            index=models.Index(
+                fields=["project", "rubric"], name="fair_projec_project_e475d2_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["category", "division"], name="fair_projec_categor_82c5cf_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="judginginstance",
+            constraint=models.UniqueConstraint(
+                fields=("judge", "project", "rubric"),
+                name="unique_judging_instance_per_rubric",
+            ),
+        ),
+    ]
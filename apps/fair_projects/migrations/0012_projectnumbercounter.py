@@ -0,0 +1,104 @@
+# Generated by Django 4.1.13 on 2026-10-19 07:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_counters(apps, schema_editor):
+    """Start a counter for each category and division from its project numbers."""
+    Project = apps.get_model("fair_projects", "Project")
+    ProjectNumberCounter = apps.get_model("fair_projects", "ProjectNumberCounter")
+
+    ProjectNumberCounter.objects.bulk_create(
+        ProjectNumberCounter(
+            category_id=category_id,
+            division_id=division_id,
+            first_number=first,
+            last_number=last,
+        )
+        for category_id, division_id, first, last in counter_ranges(
+            Project.objects.values_list("category", "division", "number")
+        )
+    )
+
+
+def counter_ranges(projects):
+    """Return the (category, division, first, last) of each counter to create.
+
+    projects are (category, division, number) rows.
+
+    """
+    ranges = {}
+    for category_id, division_id, number in projects:
+        if not number or not number.isdigit():
+            continue
+        number = int(number)
+        first, last = ranges.get((category_id, division_id), (number, number))
+        ranges[(category_id, division_id)] = (min(first, number), max(last, number))
+
+    # Buckets with the same first number have duplicated project numbers, and
+    # first_number is unique. Each clashing bucket after the first starts a
+    # new block after every existing project number instead, so none of the
+    # numbers it allocates are taken.
+    block_size = 1000  # ProjectNumberCounter.BLOCK_SIZE
+    highest = max((last for _, last in ranges.values()), default=0)
+    next_block = highest // block_size * block_size + block_size + 1
+    first_numbers = set()
+    counters = []
+    for (category_id, division_id), (first, last) in sorted(
+        ranges.items(), key=lambda item: item[1]
+    ):
+        if first in first_numbers:
+            first, last = next_block, next_block - 1
+            next_block += block_size
+        first_numbers.add(first)
+        counters.append((category_id, division_id, first, last))
+    return counters
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fair_categories", "0007_alter_subcategory_short_description"),
+        ("fair_projects", "0011_judginginstance_rubric_and_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectNumberCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_number", models.PositiveIntegerField(unique=True)),
+                ("last_number", models.PositiveIntegerField()),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="fair_categories.category",
+                    ),
+                ),
+                (
+                    "division",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="fair_categories.division",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="projectnumbercounter",
+            constraint=models.UniqueConstraint(
+                fields=("category", "division"), name="unique_project_number_counter"
+            ),
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.1.13 on 2026-10-19 08:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ENTRY_TABLE = "fair_projects_projectsearchentry"
+FTS_TABLE = "fair_projects_projectsearchentry_fts"
+
+# FTS5 reads the text from the entry table, and the triggers keep its index in
+# sync with it
+SQLITE_CREATE = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        text, content='{ENTRY_TABLE}', content_rowid='project_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.project_id, new.text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.project_id, old.text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.project_id, old.text);
+        INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.project_id, new.text);
+    END""",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER {FTS_TABLE}_insert",
+    f"DROP TRIGGER {FTS_TABLE}_delete",
+    f"DROP TRIGGER {FTS_TABLE}_update",
+    f"DROP TABLE {FTS_TABLE}",
+]
+MYSQL_CREATE = [f"CREATE FULLTEXT INDEX {ENTRY_TABLE}_text_ft ON {ENTRY_TABLE} (text)"]
+MYSQL_DROP = [f"DROP INDEX {ENTRY_TABLE}_text_ft ON {ENTRY_TABLE}"]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+
+    return run
+
+
+def populate_entries(apps, schema_editor):
+    Project = apps.get_model("fair_projects", "Project")
+    Student = apps.get_model("fair_projects", "Student")
+    ProjectSearchEntry = apps.get_model("fair_projects", "ProjectSearchEntry")
+
+    names = {}
+    for project_id, *student_names in Student.objects.filter(
+        project__isnull=False
+    ).values_list(
+        "project",
+        "first_name",
+        "last_name",
+        "teacher__user__first_name",
+        "teacher__user__last_name",
+    ):
+        names.setdefault(project_id, []).extend(student_names)
+
+    ProjectSearchEntry.objects.bulk_create(
+        ProjectSearchEntry(
+            project_id=pk,
+            text=" ".join([number, title, abstract, *names.get(pk, [])]),
+        )
+        for pk, number, title, abstract in Project.objects.values_list(
+            "pk", "number", "title", "abstract"
+        ).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fair_projects", "0012_projectnumbercounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectSearchEntry",
+            fields=[
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_entry",
+                        serialize=False,
+                        to="fair_projects.project",
+                    ),
+                ),
+                ("text", models.TextField()),
+            ],
+            options={
+                "verbose_name_plural": "project search entries",
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor({"sqlite": SQLITE_CREATE, "mysql": MYSQL_CREATE}),
+            run_for_vendor({"sqlite": SQLITE_DROP, "mysql": MYSQL_DROP}),
+        ),
+        migrations.RunPython(populate_entries, migrations.RunPython.noop),
+    ]
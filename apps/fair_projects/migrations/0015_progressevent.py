@@ -0,0 +1,46 @@
+# Generated by Django 4.1.13 on 2026-10-19 08:33
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fair_projects", "0014_savedrequest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProgressEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("project", "Project score"),
+                            ("instance", "Judging instance"),
+                            ("progress", "Judging progress"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
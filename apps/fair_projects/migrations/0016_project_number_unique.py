@@ -0,0 +1,72 @@
+# Generated by Django 4.1.13 on 2026-10-19 09:47
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def renumber_duplicates(apps, schema_editor):
+    """Give a new number to projects sharing a number, and to unnumbered ones.
+
+    The project with the lowest id keeps a duplicated number. The others are
+    numbered by their category and division's counter, like new projects.
+
+    """
+    Project = apps.get_model("fair_projects", "Project")
+    ProjectNumberCounter = apps.get_model("fair_projects", "ProjectNumberCounter")
+    block_size = 1000  # ProjectNumberCounter.BLOCK_SIZE
+
+    taken = set(Project.objects.values_list("number", flat=True))
+    seen = set()
+    for project in Project.objects.order_by("pk"):
+        if project.number and project.number not in seen:
+            seen.add(project.number)
+            continue
+
+        counter = ProjectNumberCounter.objects.filter(
+            category_id=project.category_id, division_id=project.division_id
+        ).first() or ProjectNumberCounter(
+            category_id=project.category_id, division_id=project.division_id
+        )
+        number = (counter.last_number or 0) + 1
+        while str(number) in taken:
+            number += 1
+        if counter.pk is None or number // block_size != (
+            counter.last_number // block_size
+        ):
+            # Start a new block after every counter and every project number
+            highest = max(
+                ProjectNumberCounter.objects.aggregate(Max("last_number"))[
+                    "last_number__max"
+                ]
+                or 0,
+                *(
+                    int(taken_number)
+                    for taken_number in taken
+                    if taken_number.isdigit()
+                ),
+            )
+            number = highest // block_size * block_size + block_size + 1
+            counter.first_number = number
+        counter.last_number = number
+        counter.save()
+
+        project.number = str(number)
+        project.save(update_fields=["number"])
+        taken.add(project.number)
+        seen.add(project.number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fair_projects", "0015_progressevent"),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="project",
+            name="number",
+            field=models.CharField(blank=True, max_length=5, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+def delete_progress_events(apps, schema_editor):
+    """The stream computes the judging totals instead of storing them."""
+    ProgressEvent = apps.get_model("fair_projects", "ProgressEvent")
+    ProgressEvent.objects.filter(kind="progress").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fair_projects", "0016_project_number_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_progress_events, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="progressevent",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("project", "Project score"),
+                    ("instance", "Judging instance"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
@@ -1,13 +1,30 @@
 from django.contrib.auth.models import Group, Permission, User
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.management.color import Style
-from django.db import models, transaction
-from django.db.models import Manager, QuerySet
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Avg,
+    Count,
+    FloatField,
+    Manager,
+    OuterRef,
+    QuerySet,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
 from django.urls.base import reverse
 
 from apps.fair_categories.models import Category, Division, Ethnicity, Subcategory
 from apps.fair_projects.utils import make_random_password
 from apps.judges.models import Judge
+from apps.rubrics.expressions import (
+    rubric_response_complete,
+    rubric_response_has_response,
+    rubric_response_last_submitted,
+    rubric_response_score,
+)
 from apps.rubrics.models.rubric import RubricResponse
 
 
@@ -226,40 +243,195 @@ def create_student_from_text(
     return student
 
 
+class ProjectNumberCounter(models.Model):
+    """The numbers given to the projects of a category and division.
+
+    Each category and division gets its own block of a thousand numbers, so
+    the first project in a new category and division gets the first number of
+    the block after the highest number given so far. last_number is the last
+    number handed out in the current block.
+
+    """
+
+    BLOCK_SIZE = 1000
+    MAX_NUMBER = 99999
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    division = models.ForeignKey(Division, on_delete=models.CASCADE)
+    first_number = models.PositiveIntegerField(unique=True)
+    last_number = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("category", "division"),
+                name="unique_project_number_counter",
+            ),
+        )
+
+    class ProjectNumberCounterManager(models.Manager):
+        def allocate(
+            self, category: Category, division: Division, count: int = 1
+        ) -> range:
+            """Return count consecutive numbers for projects in category and division.
+
+            The counter row is locked until the surrounding transaction ends,
+            so concurrent allocations get different numbers. Two allocations
+            starting a new block at the same time are caught by the unique
+            constraint on first_number, and the losing one starts again.
+
+            """
+            return self._retry_conflicts(self._allocate, category, division, count)
+
+        def reserve(self, category: Category, division: Division, number: int) -> None:
+            """Make sure a number given to a project isn't allocated later.
+
+            For projects numbered by hand or by an import rather than by
+            allocate(). Whichever counter's block holds the number is raised
+            to it, which needn't be the counter of category and division. A
+            number in a block no counter has reached yet starts that block for
+            category and division, and a number in a block that was passed
+            over is never allocated, so it needs nothing.
+
+            """
+            self._retry_conflicts(self._reserve, category, division, number)
+
+        def _retry_conflicts(self, func, *args):
+            attempts = 3
+            for attempt in range(attempts):
+                try:
+                    with transaction.atomic():
+                        return func(*args)
+                except IntegrityError:
+                    if attempt == attempts - 1:
+                        raise
+
+        def _reserve(self, category, division, number) -> None:
+            block_size = self.model.BLOCK_SIZE
+            block_start = number // block_size * block_size
+            counter = (
+                self.select_for_update()
+                .filter(
+                    last_number__gte=block_start,
+                    last_number__lt=block_start + block_size,
+                )
+                .first()
+            )
+            if counter is not None:
+                if number > counter.last_number:
+                    counter.last_number = number
+                    counter.save(update_fields=["last_number"])
+                return
+            if block_start + 1 < self.next_block_start():
+                return
+
+            counter = (
+                self.select_for_update()
+                .filter(category=category, division=division)
+                .first()
+            ) or self.model(category=category, division=division)
+            # A block's first number is unique, so a concurrent allocation of
+            # the same block makes one of them start again
+            counter.first_number = block_start + 1
+            counter.last_number = number
+            counter.save()
+
+        def _allocate(self, category, division, count) -> range:
+            counter = (
+                self.select_for_update()
+                .filter(category=category, division=division)
+                .first()
+            )
+            if counter is None:
+                counter = self.model(category=category, division=division)
+            if counter.pk is None or counter.last_number + count > counter.block_end:
+                counter.first_number = self.next_block_start()
+                counter.last_number = counter.first_number - 1
+
+            start = counter.last_number + 1
+            counter.last_number += count
+            if counter.last_number > self.model.MAX_NUMBER:
+                raise ValueError("Project numbers are limited to five digits")
+            counter.save()
+            return range(start, counter.last_number + 1)
+
+        def next_block_start(self) -> int:
+            last_number = self.aggregate(models.Max("last_number"))["last_number__max"]
+            block_size = self.model.BLOCK_SIZE
+            return (last_number or 0) // block_size * block_size + block_size + 1
+
+    objects = ProjectNumberCounterManager()
+
+    def __str__(self):
+        return f"{self.category}, {self.division}: {self.last_number}"
+
+    @property
+    def block_end(self) -> int:
+        return (
+            self.last_number // self.BLOCK_SIZE * self.BLOCK_SIZE + self.BLOCK_SIZE - 1
+        )
+
+
 class Project(models.Model):
     title = models.CharField(max_length=65)
     abstract = models.TextField(blank=True)
-    number = models.CharField(max_length=5, blank=True)
+    number = models.CharField(max_length=5, blank=True, unique=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
     subcategory = models.ForeignKey(Subcategory, on_delete=models.PROTECT)
     division = models.ForeignKey(Division, on_delete=models.PROTECT)
     requires_attention = models.BooleanField(default=False)
     judge_notes = models.TextField(verbose_name="Notes for Judge", blank=True)
 
+    class ProjectQuerySet(QuerySet):
+        def with_average_score(self) -> QuerySet["Project"]:
+            """Annotate avg_score and score_count, computed in the database.
+
+            avg_score matches Project.average_score and score_count matches
+            Project.num_scores.
+
+            """
+            scored = (
+                JudgingInstance.objects.filter(project=OuterRef("pk"))
+                .filter(rubric_response_has_response("response"))
+                .order_by()
+                .values("project")
+            )
+            return self.annotate(
+                avg_score=Coalesce(
+                    Subquery(
+                        scored.annotate(
+                            avg=Avg(rubric_response_score("response"))
+                        ).values("avg"),
+                        output_field=FloatField(),
+                    ),
+                    Value(0.0),
+                ),
+                score_count=Coalesce(
+                    Subquery(scored.annotate(count=Count("pk")).values("count")),
+                    Value(0),
+                ),
+            )
+
+    objects = ProjectQuerySet.as_manager()
+
     class Meta:
         permissions = (("can_view_results", "Can view project results"),)
+        indexes = (models.Index(fields=("category", "division")),)
 
     def get_next_number(self):
-        def get_max(qs: QuerySet) -> int:
-            return qs.aggregate(models.Max("number"))["number__max"]
-
-        max_proj_num = get_max(
-            Project.objects.filter(division=self.division, category=self.category)
+        return str(
+            ProjectNumberCounter.objects.allocate(self.category, self.division)[0]
         )
-        if max_proj_num:
-            return str(int(max_proj_num) + 1)
-
-        max_proj_num = get_max(Project.objects.all())
-        if max_proj_num:
-            return str(int(max_proj_num) + 1001 - (int(max_proj_num) % 1000))
-        else:
-            return str(1001)
 
     def save(
         self, force_insert=False, force_update=False, using=None, update_fields=None
     ):
         if not self.number:
             self.number = self.get_next_number()
+        elif str(self.number).isdigit():
+            ProjectNumberCounter.objects.reserve(
+                self.category, self.division, int(self.number)
+            )
         return super(Project, self).save(
             force_insert, force_update, using, update_fields
         )
@@ -291,9 +463,16 @@ class Project(models.Model):
 
     @classmethod
     def create(
-        cls, title, abstract, category, subcategory, division, output_stream=None
+        cls,
+        title,
+        abstract,
+        category,
+        subcategory,
+        division,
+        output_stream=None,
+        number=None,
     ) -> "Project":
-        """Create a project."""
+        """Create a project. A number is allocated if one isn't given."""
 
         def write_output(message):
             if output_stream:
@@ -302,6 +481,7 @@ class Project(models.Model):
         project = cls.objects.create(
             title=title,
             abstract=abstract,
+            number=number or "",
             category=category,
             subcategory=subcategory,
             division=division,
@@ -312,19 +492,63 @@ class Project(models.Model):
         return project
 
 
+class ProjectSearchEntry(models.Model):
+    """The searchable text of a project: its number, title, abstract and the
+    names of its students and their teachers.
+
+    Kept up to date by apps.fair_projects.search. MySQL searches it with a
+    FULLTEXT index and SQLite with an FTS5 table, both created by migrations.
+
+    """
+
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_entry",
+    )
+    text = models.TextField()
+
+    class Meta:
+        verbose_name_plural = "project search entries"
+
+    def __str__(self):
+        return str(self.project_id)
+
+
 class JudgingInstance(models.Model):
     judge = models.ForeignKey(Judge, models.CASCADE)
     project = models.ForeignKey(Project, models.CASCADE)
     response = models.ForeignKey(
         "rubrics.RubricResponse", models.CASCADE, null=True, blank=True
     )
+    # Copy of response.rubric, so assignment queries can filter and enforce
+    # uniqueness without joining through the response
+    rubric = models.ForeignKey("rubrics.Rubric", models.CASCADE, editable=False)
     locked = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("judge", "project", "rubric"),
+                name="unique_judging_instance_per_rubric",
+            ),
+        )
+        indexes = (
+            models.Index(fields=("judge", "rubric", "locked")),
+            models.Index(fields=("project", "rubric")),
+        )
+
     def __init__(self, *args, **kwargs):
-        rubric = kwargs.pop("rubric", None)
         super(JudgingInstance, self).__init__(*args, **kwargs)
-        if not self.response and rubric:
-            self.response = RubricResponse.objects.create(rubric=rubric)
+        # Checking response_id avoids a query for every instance loaded from the db
+        if kwargs.get("rubric") and self.response_id is None:
+            self.response = RubricResponse.objects.create(rubric=kwargs["rubric"])
+
+    def save(self, *args, **kwargs):
+        if self.response_id is not None and self.rubric_id is None:
+            self.rubric_id = self.response.rubric_id
+        super(JudgingInstance, self).save(*args, **kwargs)
 
     def __str__(self):
         return "{0} - {1}: {2}".format(
@@ -345,7 +569,23 @@ class JudgingInstance(models.Model):
             self.locked = True
             self.save()
 
-    class JudgingInstanceManager(models.Manager):
+    class JudgingInstanceQuerySet(QuerySet):
+        def with_progress(self) -> QuerySet["JudgingInstance"]:
+            """Annotate the state of each instance's response.
+
+            Adds response_started, response_complete, response_score and
+            response_last_submitted, matching has_response, complete, score
+            and RubricResponse.last_submitted, without a query per instance.
+
+            """
+            return self.annotate(
+                response_started=rubric_response_has_response("response"),
+                response_complete=rubric_response_complete("response"),
+                response_score=rubric_response_score("response"),
+                response_last_submitted=rubric_response_last_submitted("response"),
+            )
+
+    class JudgingInstanceManager(models.Manager.from_queryset(JudgingInstanceQuerySet)):
         def get_queryset(self) -> QuerySet["JudgingInstance"]:
             return super().get_queryset().select_related("judge", "project", "response")
 
@@ -385,3 +625,54 @@ class JudgingInstance(models.Model):
             return super().get_queryset().filter(locked=False)
 
     unlocked_objects = UnlockedInstanceManager()
+
+
+class SavedRequest(models.Model):
+    """The response to a request made with an Idempotency-Key header.
+
+    A client retrying the request with the same key gets the saved response
+    instead of applying it again.
+
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "key"), name="unique_saved_request_key_per_user"
+            ),
+        )
+
+    def __str__(self):
+        return "{0}: {1}".format(self.user_id, self.key)
+
+
+class ProgressEvent(models.Model):
+    """A change to the results or the judging progress, for live pages.
+
+    The id orders the events, and is the event id of the live results stream.
+
+    """
+
+    PROJECT = "project"
+    INSTANCE = "instance"
+    # The judging totals, which the stream adds after instance events rather
+    # than storing them
+    PROGRESS = "progress"
+    KIND_CHOICES = (
+        (PROJECT, "Project score"),
+        (INSTANCE, "Judging instance"),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return "{0} {1}".format(self.pk, self.kind)
@@ -0,0 +1,137 @@
+"""Full-text search over projects, their students and the students' teachers.
+
+Each project has a ProjectSearchEntry holding its number, title, abstract and
+the names of its students and their teachers. The signals in
+apps.fair_projects.signals call schedule_search_update() when any of those
+change, which rebuilds the entries in bulk once the transaction commits.
+bulk_create and QuerySet.update() send no signals, so code creating or
+changing projects, students or teachers with them must call
+update_search_entries() or rebuild_search_index() itself, as seed_fair() does.
+
+search_project_ids() matches every word of the query as a prefix. MySQL uses
+the FULLTEXT index and SQLite the FTS5 table created by migration 0013. Other
+databases fall back to LIKE scans of the entries, which is still one table
+instead of four.
+
+"""
+import re
+from collections import defaultdict
+from typing import Iterable, List, Optional
+
+from django.db import connection, transaction
+
+from .models import Project, ProjectSearchEntry, Student
+from .utils import schedule_on_commit
+
+FTS_TABLE = "fair_projects_projectsearchentry_fts"
+DEFAULT_LIMIT = 10
+
+_words = re.compile(r"\w+")
+
+
+def build_search_text(project: dict, names: Iterable[str]) -> str:
+    return " ".join([project["number"], project["title"], project["abstract"], *names])
+
+
+def update_search_entries(project_ids: Iterable[int]) -> None:
+    """Rebuild the search entries of the projects, in a fixed number of queries."""
+    project_ids = set(project_ids)
+    projects = Project.objects.filter(pk__in=project_ids).values(
+        "pk", "number", "title", "abstract"
+    )
+    names = defaultdict(list)
+    for project_id, *student_names in Student.objects.filter(
+        project__in=project_ids
+    ).values_list(
+        "project",
+        "first_name",
+        "last_name",
+        "teacher__user__first_name",
+        "teacher__user__last_name",
+    ):
+        names[project_id].extend(student_names)
+
+    with transaction.atomic():
+        ProjectSearchEntry.objects.filter(project__in=project_ids).delete()
+        ProjectSearchEntry.objects.bulk_create(
+            ProjectSearchEntry(
+                project_id=project["pk"],
+                text=build_search_text(project, names[project["pk"]]),
+            )
+            for project in projects
+        )
+
+
+def rebuild_search_index() -> None:
+    update_search_entries(Project.objects.values_list("pk", flat=True))
+
+
+def schedule_search_update(project_ids: Iterable[int]) -> None:
+    """Update the search entries of the projects when the transaction commits.
+
+    Every call in the same transaction adds to one pending set, so importing
+    a few hundred projects and their students rebuilds the entries once.
+
+    """
+    schedule_on_commit("search_updates", update_search_entries, project_ids)
+
+
+def search_project_ids(query: str, limit: Optional[int] = None) -> List[int]:
+    """The ids of the projects matching every word of query, best match first.
+
+    A project whose number is the whole query always comes first.
+
+    """
+    words = _words.findall(query)
+    if not words:
+        return []
+
+    search = _BACKENDS.get(connection.vendor, _search_like)
+    project_ids = search(words, limit)
+
+    if len(words) == 1 and words[0].isdigit():
+        exact = list(
+            Project.objects.filter(number=words[0]).values_list("pk", flat=True)
+        )
+        project_ids = exact + [pk for pk in project_ids if pk not in exact]
+    return project_ids[:limit] if limit else project_ids
+
+
+def _search_sqlite(words: List[str], limit: Optional[int]) -> List[int]:
+    # Quoting each word keeps FTS5 operators in the query from being parsed
+    match = " ".join('"{0}"*'.format(word) for word in words)
+    sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank"
+    params = [match]
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_mysql(words: List[str], limit: Optional[int]) -> List[int]:
+    match = " ".join("+{0}*".format(word) for word in words)
+    sql = (
+        "SELECT project_id FROM fair_projects_projectsearchentry "
+        "WHERE MATCH (text) AGAINST (%s IN BOOLEAN MODE) "
+        "ORDER BY MATCH (text) AGAINST (%s IN BOOLEAN MODE) DESC"
+    )
+    params = [match, match]
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_like(words: List[str], limit: Optional[int]) -> List[int]:
+    entries = ProjectSearchEntry.objects.all()
+    for word in words:
+        entries = entries.filter(text__icontains=word)
+    project_ids = entries.order_by("project__number").values_list("project", flat=True)
+    return list(project_ids[:limit] if limit else project_ids)
+
+
+_BACKENDS = {"sqlite": _search_sqlite, "mysql": _search_mysql}
@@ -0,0 +1,529 @@
+"""Generate a synthetic fair for load testing.
+
+Everything is inserted with bulk_create. Saving objects one at a time would
+run the post_save signals that assign judges and create question responses,
+which is far too slow for thousands of projects and would make the data depend
+on the assignment code being measured. The search index is rebuilt at the
+end instead of by the signals.
+
+"""
+import heapq
+import math
+import random
+from itertools import cycle, product
+from typing import NamedTuple, Optional
+
+from django.contrib.auth.models import User
+from django.db import connection, models
+from django.utils import timezone
+
+from apps.awards.models import Award, AwardRule, Is
+from apps.fair_categories.models import Category, Division, Ethnicity, Subcategory
+from apps.judges.models import Judge, JudgeEducation, JudgeFairExperience
+from apps.rubrics.constants import FeedbackFormModuleType
+from apps.rubrics.models import (
+    Choice,
+    FeedbackForm,
+    MarkdownFeedbackModule,
+    Question,
+    QuestionResponse,
+    Rubric,
+    RubricResponse,
+    ScoreTableFeedbackModule,
+)
+from fair_scoring_site.logic import (
+    get_judging_rubric_name,
+    get_num_judges_per_project,
+    get_num_projects_per_judge,
+)
+
+from .logic import create_judging_instances
+from .models import (
+    JudgingInstance,
+    Project,
+    ProjectNumberCounter,
+    School,
+    Student,
+    Teacher,
+)
+from .search import rebuild_search_index
+from .utils import BATCH_SIZE, bulk_create_with_ids
+
+SEED_USERNAME_PREFIX = "seed-"
+SEED_SCHOOL_PREFIX = "Seed School"
+
+CATEGORIES = {
+    "Biology": ("Botany", "Microbiology", "Zoology"),
+    "Chemistry": ("Analytical", "Organic"),
+    "Earth Science": ("Geology", "Meteorology"),
+    "Engineering": ("Electrical", "Mechanical", "Software"),
+    "Mathematics": ("Applied", "Pure"),
+    "Physics": ("Astronomy", "Optics"),
+}
+DIVISIONS = ("Elementary", "Middle School", "High School")
+ETHNICITIES = ("Asian", "Black", "Hispanic", "White", "Other")
+EDUCATION = ("Bachelor's degree", "Master's degree", "Doctorate")
+FAIR_EXPERIENCE = ("None", "1-5 years", "More than 5 years")
+GRADE_LEVELS = {"Elementary": (4, 5), "Middle School": (6, 7, 8)}
+FIRST_NAMES = (
+    "Alex Avery Blake Casey Drew Emerson Finley Harper Jamie Jordan Kai Logan "
+    "Morgan Parker Quinn Reese Riley Rowan Sage Taylor"
+).split()
+LAST_NAMES = (
+    "Adams Baker Chen Davis Evans Garcia Hughes Ito Johnson Kim Lopez Miller "
+    "Nguyen Olsen Patel Rivera Smith Turner Walker Young"
+).split()
+
+# (question type, short description, weight, choice keys)
+RUBRIC_QUESTIONS = (
+    (Question.SCALE_TYPE, "Research question", "0.250", "12345"),
+    (Question.SCALE_TYPE, "Design and methodology", "0.250", "12345"),
+    (Question.SCALE_TYPE, "Data analysis", "0.200", "12345"),
+    (Question.SINGLE_SELECT_TYPE, "Presentation", "0.200", "123"),
+    (Question.MULTI_SELECT_TYPE, "Strengths", "0.100", "1234"),
+    (Question.LONG_TEXT, "Comments for the student", "0.000", ""),
+)
+
+
+class SeedResult(NamedTuple):
+    rubric: Rubric
+    projects: int
+    students: int
+    judges: int
+    judging_instances: int
+    answered_responses: int
+
+
+def seed_fair(
+    projects: int,
+    judges: Optional[int] = None,
+    answered: float = 0.5,
+    complete: float = 0.8,
+    seed: Optional[int] = None,
+    assign: bool = True,
+) -> SeedResult:
+    """Create a fair with the given number of projects.
+
+    Args:
+        projects: the number of projects to create.
+        judges: the number of judges to create. Defaults to enough judges to
+            give every judge the configured number of projects.
+        answered: the fraction of judging instances with answers.
+        complete: the fraction of answered instances with every required
+            question answered. The rest are partially answered.
+        seed: seed for the random number generator, for repeatable data.
+        assign: if False, no judging instances are created, so the
+            assignment code can be run against the fair.
+
+    """
+    rng = random.Random(seed)
+    if judges is None:
+        judges = math.ceil(
+            projects * get_num_judges_per_project() / get_num_projects_per_judge()
+        )
+
+    rubric = seed_rubric()
+    seed_awards()
+    buckets = list(product(seed_categories(), seed_divisions()))
+    project_list = seed_projects(projects, buckets, rng)
+    num_students = seed_students(project_list, rng)
+    judge_list = seed_judges(judges, buckets, rng)
+
+    num_instances = num_answered = 0
+    if assign:
+        num_instances = seed_judging_instances(rubric, project_list, judge_list)
+        num_answered = answer_responses(rubric, answered, complete, rng)
+    rebuild_search_index()
+
+    return SeedResult(
+        rubric=rubric,
+        projects=len(project_list),
+        students=num_students,
+        judges=len(judge_list),
+        judging_instances=num_instances,
+        answered_responses=num_answered,
+    )
+
+
+def clear_fair(everything: bool = False) -> None:
+    """Delete what seed_fair created.
+
+    Seeded users and schools are found by their name prefixes, and seeded
+    projects by their students' seeded teachers. Judging instances of seeded
+    projects or judges go with them. Other projects, and the number counters
+    while any remain, are kept.
+
+    Args:
+        everything: delete every project, student and judging instance too.
+            Only for transactions that are rolled back, like the benchmarks.
+
+    """
+    seed_users = User.objects.filter(username__startswith=SEED_USERNAME_PREFIX)
+    students = Student.objects.filter(teacher__user__in=seed_users)
+    projects = Project.objects.filter(pk__in=students.values("project"))
+    instances = JudgingInstance.objects.filter(
+        models.Q(project__in=projects) | models.Q(judge__user__in=seed_users)
+    )
+    if everything:
+        students = Student.objects.all()
+        projects = Project.objects.all()
+        instances = JudgingInstance.objects.all()
+    RubricResponse.objects.filter(pk__in=instances.values("response")).delete()
+    instances.delete()
+    # The projects are found through their students, so they go first
+    projects.delete()
+    students.delete()
+    if not Project.objects.exists():
+        ProjectNumberCounter.objects.all().delete()
+    seed_users.delete()
+    School.objects.filter(name__startswith=SEED_SCHOOL_PREFIX).delete()
+
+
+def seed_categories() -> list[Category]:
+    categories = []
+    for name, subcategories in CATEGORIES.items():
+        category, _ = Category.objects.get_or_create(short_description=name)
+        for subcategory in subcategories:
+            Subcategory.objects.get_or_create(
+                short_description=subcategory,
+                category=category,
+                defaults={"abbreviation": subcategory[:3].upper()},
+            )
+        categories.append(category)
+    return categories
+
+
+def seed_divisions() -> list[Division]:
+    return [
+        Division.objects.get_or_create(short_description=name)[0] for name in DIVISIONS
+    ]
+
+
+def seed_rubric() -> Rubric:
+    """Return the judging rubric, creating it with weighted questions if needed."""
+    rubric, _ = Rubric.objects.get_or_create(name=get_judging_rubric_name())
+    if rubric.question_set.exists():
+        return rubric
+
+    Question.objects.bulk_create(
+        Question(
+            rubric=rubric,
+            order=order,
+            short_description=description,
+            long_description=f"How well does the project show {description.lower()}?",
+            weight=weight,
+            question_type=question_type,
+            required=question_type != Question.LONG_TEXT,
+        )
+        for order, (question_type, description, weight, _) in enumerate(
+            RUBRIC_QUESTIONS, start=1
+        )
+    )
+    questions = list(rubric.question_set.order_by("order"))
+    Choice.objects.bulk_create(
+        Choice(question=question, order=order, key=key, description=f"Choice {key}")
+        for question, (_, _, _, keys) in zip(questions, RUBRIC_QUESTIONS)
+        for order, key in enumerate(keys, start=1)
+    )
+    seed_feedback_form(rubric, questions)
+    return rubric
+
+
+def seed_feedback_form(rubric: Rubric, questions: list[Question]) -> FeedbackForm:
+    feedback_form = FeedbackForm.objects.create(rubric=rubric)
+    MarkdownFeedbackModule.objects.create(
+        feedback_form=feedback_form,
+        order=1,
+        module_type=FeedbackFormModuleType.MARKDOWN,
+        content="# Judging results\n\nYour average score was {{ average_score }}.",
+    )
+    score_table = ScoreTableFeedbackModule.objects.create(
+        feedback_form=feedback_form,
+        order=2,
+        module_type=FeedbackFormModuleType.SCORE_TABLE,
+        table_title="Scores",
+    )
+    score_table.questions.set(
+        question
+        for question in questions
+        if question.question_type in Question.CHOICE_TYPES
+    )
+    return feedback_form
+
+
+def seed_awards() -> None:
+    """Create a first place award for each category and division."""
+    if Award.objects.exists():
+        return
+
+    rules = []
+    for order, (category, division) in enumerate(
+        product(CATEGORIES, DIVISIONS), start=1
+    ):
+        award = Award.objects.create(
+            name=f"First Place: {division} {category}", award_order=order
+        )
+        rules.append(
+            AwardRule(
+                award=award,
+                trait="category",
+                operator_name=Is.internal,
+                value=category,
+            )
+        )
+        rules.append(
+            AwardRule(
+                award=award,
+                trait="division",
+                operator_name=Is.internal,
+                value=division,
+            )
+        )
+    AwardRule.objects.bulk_create(rules)
+
+
+def create_users(kind: str, count: int, rng: random.Random) -> list[User]:
+    start = User.objects.filter(
+        username__startswith=f"{SEED_USERNAME_PREFIX}{kind}-"
+    ).count()
+    users = [
+        User(
+            username=f"{SEED_USERNAME_PREFIX}{kind}-{number}",
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=f"{rng.choice(LAST_NAMES)}-{number}",
+            email=f"{kind}{number}@example.com",
+        )
+        for number in range(start + 1, start + count + 1)
+    ]
+    return bulk_create_with_ids(User, users, key="username")
+
+
+def seed_projects(
+    count: int, buckets: list[tuple[Category, Division]], rng: random.Random
+) -> list[Project]:
+    """Create projects spread over the buckets, with a block of numbers for each."""
+    subcategories = {}
+    for subcategory in Subcategory.objects.all():
+        subcategories.setdefault(subcategory.category_id, []).append(subcategory)
+
+    bucket_sizes = [count // len(buckets)] * len(buckets)
+    for index in range(count % len(buckets)):
+        bucket_sizes[index] += 1
+
+    projects = []
+    for (category, division), size in zip(buckets, bucket_sizes):
+        if not size:
+            continue
+        projects.extend(
+            Project(
+                title=f"{category} project {number}"[:65],
+                abstract="A synthetic project created for load testing.",
+                number=str(number),
+                category=category,
+                subcategory=rng.choice(subcategories[category.pk]),
+                division=division,
+            )
+            for number in ProjectNumberCounter.objects.allocate(
+                category, division, size
+            )
+        )
+    return bulk_create_with_ids(Project, projects, key="number")
+
+
+def seed_students(projects: list[Project], rng: random.Random) -> int:
+    ethnicities = [
+        Ethnicity.objects.get_or_create(short_description=name)[0]
+        for name in ETHNICITIES
+    ]
+    school_count = max(1, len(projects) // 100)
+    schools = bulk_create_with_ids(
+        School,
+        [School(name=f"{SEED_SCHOOL_PREFIX} {n}") for n in range(1, school_count + 1)],
+        key="name",
+    )
+    users = create_users("teacher", max(1, len(projects) // 25), rng)
+    teachers = Teacher.objects.bulk_create(
+        Teacher(user=user, school=rng.choice(schools)) for user in users
+    )
+
+    students = []
+    for project in projects:
+        grade_levels = GRADE_LEVELS.get(project.division.short_description, (9, 10))
+        teacher = rng.choice(teachers)
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            students.append(
+                Student(
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    ethnicity=rng.choice(ethnicities),
+                    gender=rng.choice("FM"),
+                    teacher=teacher,
+                    grade_level=rng.choice(grade_levels),
+                    project=project,
+                )
+            )
+    Student.objects.bulk_create(students, batch_size=BATCH_SIZE)
+    return len(students)
+
+
+def seed_judges(
+    count: int, buckets: list[tuple[Category, Division]], rng: random.Random
+) -> list[Judge]:
+    """Create judges with one or two categories and divisions each.
+
+    Judges are first given buckets in turn, so every bucket has judges as long
+    as there are more judges than buckets.
+
+    """
+    education = [
+        JudgeEducation.objects.get_or_create(short_description=name)[0]
+        for name in EDUCATION
+    ]
+    experience = [
+        JudgeFairExperience.objects.get_or_create(short_description=name)[0]
+        for name in FAIR_EXPERIENCE
+    ]
+    categories = list({category.pk: category for category, _ in buckets}.values())
+    divisions = list({division.pk: division for _, division in buckets}.values())
+
+    users = create_users("judge", count, rng)
+    judges = Judge.objects.bulk_create(
+        Judge(
+            user=user,
+            phone=f"555{rng.randrange(10**7):07d}",
+            has_device=rng.random() < 0.9,
+            education=rng.choice(education),
+            fair_experience=rng.choice(experience),
+        )
+        for user in users
+    )
+
+    judge_categories = []
+    judge_divisions = []
+    for judge, (category, division) in zip(judges, cycle(buckets)):
+        judge_categories.extend(
+            Judge.categories.through(judge_id=judge.pk, category_id=category.pk)
+            for category in {category, rng.choice(categories)}
+        )
+        judge_divisions.extend(
+            Judge.divisions.through(judge_id=judge.pk, division_id=division.pk)
+            for division in {division, rng.choice(divisions)}
+        )
+    Judge.categories.through.objects.bulk_create(
+        judge_categories, batch_size=BATCH_SIZE
+    )
+    Judge.divisions.through.objects.bulk_create(judge_divisions, batch_size=BATCH_SIZE)
+    return judges
+
+
+def seed_judging_instances(
+    rubric: Rubric, projects: list[Project], judges: list[Judge]
+) -> int:
+    """Give each project the configured number of matching judges.
+
+    Each project goes to the least loaded judges who can judge its category
+    and division, with a rubric response for every instance.
+
+    """
+    judge_ids = [judge.pk for judge in judges]
+    categories, divisions = {}, {}
+    for judge_id, category_id in Judge.categories.through.objects.filter(
+        judge__in=judge_ids
+    ).values_list("judge_id", "category_id"):
+        categories.setdefault(judge_id, []).append(category_id)
+    for judge_id, division_id in Judge.divisions.through.objects.filter(
+        judge__in=judge_ids
+    ).values_list("judge_id", "division_id"):
+        divisions.setdefault(judge_id, []).append(division_id)
+
+    eligible = {}
+    for judge_id in judge_ids:
+        for bucket in product(
+            categories.get(judge_id, ()), divisions.get(judge_id, ())
+        ):
+            eligible.setdefault(bucket, []).append(judge_id)
+
+    load = dict.fromkeys(judge_ids, 0)
+    assignments = []
+    for project in projects:
+        candidates = eligible.get((project.category_id, project.division_id), [])
+        for judge_id in heapq.nsmallest(
+            get_num_judges_per_project(), candidates, key=load.__getitem__
+        ):
+            load[judge_id] += 1
+            assignments.append((judge_id, project.pk))
+
+    create_judging_instances(assignments, rubric)
+    return len(assignments)
+
+
+def answer_responses(
+    rubric: Rubric, answered: float, complete: float, rng: random.Random
+) -> int:
+    """Answer a fraction of the rubric's unanswered responses.
+
+    Complete responses answer every question. Partial responses answer some of
+    the required questions, so they score but aren't complete.
+
+    """
+    questions = list(rubric.question_set.prefetch_related("choice_set"))
+    required = [question for question in questions if question.required]
+    choices = {
+        question.pk: [choice.key for choice in question.choice_set.all()]
+        for question in questions
+    }
+    response_ids = list(
+        RubricResponse.objects.filter(rubric=rubric)
+        .exclude(
+            models.Exists(
+                QuestionResponse.objects.filter(
+                    rubric_response=models.OuterRef("pk")
+                ).exclude(QuestionResponse.EMPTY_Q)
+            )
+        )
+        .values_list("pk", flat=True)
+    )
+    response_ids = rng.sample(response_ids, k=round(len(response_ids) * answered))
+
+    to_answer = set()
+    for response_id in response_ids:
+        if rng.random() < complete or len(required) < 2:
+            answer = questions
+        else:
+            answer = rng.sample(required, k=rng.randrange(1, len(required)))
+        to_answer.update((response_id, question.pk) for question in answer)
+
+    submitted = timezone.now()
+    question_types = {question.pk: question.question_type for question in questions}
+    question_responses = []
+    for start in range(0, len(response_ids), BATCH_SIZE):
+        question_responses.extend(
+            QuestionResponse.objects.filter(
+                rubric_response__in=response_ids[start : start + BATCH_SIZE]
+            )
+        )
+    question_responses = [
+        question_response
+        for question_response in question_responses
+        if (question_response.rubric_response_id, question_response.question_id)
+        in to_answer
+    ]
+    for question_response in question_responses:
+        question_type = question_types[question_response.question_id]
+        keys = choices[question_response.question_id]
+        if question_type == Question.MULTI_SELECT_TYPE:
+            question_response.choice_responses = rng.sample(
+                keys, k=rng.randrange(1, len(keys) + 1)
+            )
+        elif question_type in Question.CHOICE_TYPES:
+            question_response.choice_response = rng.choice(keys)
+        else:
+            question_response.text_response = "Great work on your project!"
+        question_response.last_submitted = submitted
+
+    QuestionResponse.objects.bulk_update(
+        question_responses,
+        ("choice_response", "choice_responses", "text_response", "last_submitted"),
+        batch_size=BATCH_SIZE,
+    )
+    return len(response_ids)
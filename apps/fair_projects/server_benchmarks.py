@@ -0,0 +1,252 @@
+"""Compare how many slow clients the WSGI and ASGI handlers serve at once.
+
+Each client requests a page several times in a row, and takes client_delay
+seconds to receive each response, like a phone on a poor connection. Under
+WSGI a worker is busy until its client has the whole response, so at most
+`workers` clients are served at a time. Under ASGI the event loop serves other
+requests while a client receives its response.
+
+The applications are called in process, without a server or sockets, so the
+results compare the two handlers rather than any particular server. Nothing is
+seeded: run it against a fair, such as one made by the seedfair command.
+
+"""
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from apps.judges.models import Judge
+from fair_scoring_site.instrumentation import PERCENTILES, percentile
+
+
+def judge_dashboard(judge: Judge) -> str:
+    return reverse("fair_projects:judge_detail", args=(judge.user.username,))
+
+
+def judge_progress(judge: Judge) -> str:
+    return reverse("fair_projects:judge_progress", args=(judge.user.username,))
+
+
+def project_index(judge: Judge) -> str:
+    return reverse("fair_projects:index")
+
+
+def results(judge: Judge) -> str:
+    return reverse("fair_projects:project_results")
+
+
+PAGES = {
+    "judge_dashboard": judge_dashboard,
+    "judge_progress": judge_progress,
+    "project_index": project_index,
+    "results": results,
+}
+DEFAULT_PAGES = ["judge_dashboard", "judge_progress", "project_index"]
+
+
+def busiest_judge() -> Optional[Judge]:
+    return (
+        Judge.objects.select_related("user")
+        .annotate(num_instances=Count("judginginstance"))
+        .order_by("-num_instances")
+        .first()
+    )
+
+
+class Load:
+    """The requests the clients make, and the results they got."""
+
+    def __init__(self, path: str, host: str, cookie: str, clients: int, rounds: int):
+        url = urlsplit(path)
+        self.path = url.path
+        self.query_string = url.query
+        self.host = host
+        self.cookie = cookie
+        self.clients = clients
+        self.rounds = rounds
+        self.latencies = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, latency: float, status: int) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.errors += status != 200
+
+    def summary(self, seconds: float) -> dict:
+        latencies = sorted(round(latency * 1000, 1) for latency in self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "requests_per_second": round(len(latencies) / seconds, 1),
+            **{f"p{p}_ms": percentile(latencies, p) for p in PERCENTILES},
+        }
+
+
+def run_wsgi(load: Load, workers: int, client_delay: float) -> dict:
+    """Serve the clients from a pool of workers, like a threaded WSGI server."""
+    application = get_wsgi_application()
+
+    def serve() -> int:
+        statuses = []
+        body = application(
+            wsgi_environ(load),
+            lambda status, headers, exc_info=None: statuses.append(status),
+        )
+        try:
+            for _ in body:
+                pass
+            # Writing to a slow client holds the worker until it's done
+            time.sleep(client_delay)
+        finally:
+            body.close()
+        return int(statuses[0].split()[0])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def client() -> None:
+            for _ in range(load.rounds):
+                start = time.perf_counter()
+                status = pool.submit(serve).result()
+                load.add(time.perf_counter() - start, status)
+
+        start = time.perf_counter()
+        clients = [threading.Thread(target=client) for _ in range(load.clients)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        return load.summary(time.perf_counter() - start)
+
+
+def wsgi_environ(load: Load) -> dict:
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": load.path,
+        "QUERY_STRING": load.query_string,
+        "SCRIPT_NAME": "",
+        "SERVER_NAME": load.host,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": load.host,
+        "HTTP_COOKIE": load.cookie,
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+
+def run_asgi(load: Load, client_delay: float) -> dict:
+    """Serve the clients from one event loop, like an ASGI server."""
+    application = get_asgi_application()
+
+    async def serve() -> int:
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        statuses = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The client stays connected until the response is sent
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif not message.get("more_body"):
+                # Sending to a slow client only holds this request
+                await asyncio.sleep(client_delay)
+
+        await application(asgi_scope(load), receive, send)
+        return statuses[0]
+
+    async def client() -> None:
+        for _ in range(load.rounds):
+            start = time.perf_counter()
+            status = await serve()
+            load.add(time.perf_counter() - start, status)
+
+    async def run_clients() -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(load.clients)))
+        return time.perf_counter() - start
+
+    return load.summary(asyncio.run(run_clients()))
+
+
+def asgi_scope(load: Load) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": load.path,
+        "raw_path": load.path.encode(),
+        "query_string": load.query_string.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", load.host.encode()),
+            (b"cookie", load.cookie.encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": (load.host, 80),
+    }
+
+
+def run_server_benchmarks(
+    user,
+    judge: Judge,
+    pages: list[str],
+    clients: list[int],
+    rounds: int = 5,
+    workers: int = 4,
+    client_delay: float = 0.5,
+    host: str = "localhost",
+    report: Optional[Callable[[str, str, int, dict], None]] = None,
+) -> dict:
+    """Request each page with each number of clients, under WSGI and ASGI.
+
+    The clients are logged in as user, and the judge pages are judge's.
+    Returns the results by page, then number of clients, then server.
+
+    """
+    client = Client()
+    client.force_login(user)
+    cookie = f"{settings.SESSION_COOKIE_NAME}={client.session.session_key}"
+    results = {}
+    try:
+        for page in pages:
+            path = PAGES[page](judge)
+            results[page] = {}
+            for count in clients:
+                results[page][str(count)] = {
+                    "wsgi": run_wsgi(
+                        Load(path, host, cookie, count, rounds), workers, client_delay
+                    ),
+                    "asgi": run_asgi(
+                        Load(path, host, cookie, count, rounds), client_delay
+                    ),
+                }
+                if report:
+                    report(page, path, count, results[page][str(count)])
+    finally:
+        client.logout()
+    return results
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.rubrics.models.rubric import QuestionResponse, responses_updated
+
+from .events import schedule_progress_events
+from .models import Project, Student
+from .search import schedule_search_update
+
+
+@receiver(post_save, sender=Project, dispatch_uid="update_project_search_entry")
+def update_project_search_entry(sender: type, instance: Project, **kwargs) -> None:
+    schedule_search_update([instance.pk])
+
+
+@receiver(pre_save, sender=Student, dispatch_uid="remember_student_search_project")
+def remember_student_search_project(sender: type, instance: Student, **kwargs) -> None:
+    """Remember the project a student is moved from, to remove their name."""
+    if not instance._state.adding:
+        instance._search_project_ids = list(
+            Student.objects.filter(pk=instance.pk).values_list("project", flat=True)
+        )
+
+
+@receiver(post_save, sender=Student, dispatch_uid="update_student_search_entries")
+@receiver(
+    post_delete, sender=Student, dispatch_uid="update_deleted_student_search_entries"
+)
+def update_student_search_entries(sender: type, instance: Student, **kwargs) -> None:
+    schedule_search_update(
+        [instance.project_id, *getattr(instance, "_search_project_ids", ())]
+    )
+
+
+@receiver(post_save, sender=User, dispatch_uid="update_teacher_search_entries")
+def update_teacher_search_entries(
+    sender: type, instance: User, created: bool, update_fields=None, **kwargs
+) -> None:
+    """The entries include the names of the students' teachers."""
+    if created or (
+        update_fields is not None
+        and not {"first_name", "last_name"}.intersection(update_fields)
+    ):
+        return
+    schedule_search_update(
+        Student.objects.filter(teacher=instance.pk).values_list("project", flat=True)
+    )
+
+
+@receiver(
+    responses_updated, sender=QuestionResponse, dispatch_uid="add_progress_events"
+)
+def add_progress_events(sender: type, responses, **kwargs) -> None:
+    schedule_progress_events(response.rubric_response_id for response in responses)
@@ -0,0 +1,115 @@
+{% load static %}// Service worker for scoring projects offline. judging_offline.js asks it to
+// cache the judge's pages ahead of time. Pages are served from the network
+// when it answers quickly, and from the cache otherwise. Answers given
+// offline are queued by judging_offline.js, not here.
+"use strict";
+
+var CACHE_NAME = "fair-judging-v1";
+var NETWORK_TIMEOUT = 4000;
+var PAGES_PREFIX = "{% url 'fair_projects:index' %}";
+var STATIC_PREFIX = "{% get_static_prefix %}";
+
+self.addEventListener("install", function () {
+    self.skipWaiting();
+});
+
+self.addEventListener("activate", function (event) {
+    event.waitUntil(
+        caches.keys().then(function (names) {
+            return Promise.all(names.filter(function (name) {
+                return name !== CACHE_NAME;
+            }).map(function (name) {
+                return caches.delete(name);
+            }));
+        }).then(function () {
+            return self.clients.claim();
+        })
+    );
+});
+
+self.addEventListener("message", function (event) {
+    if (event.data && event.data.type === "cache-offline-data") {
+        event.waitUntil(cacheOfflineData(event.data.url));
+    }
+});
+
+function cacheOfflineData(url) {
+    return fetch(url, {credentials: "same-origin"}).then(function (response) {
+        if (!response.ok || response.redirected) {
+            // Logged out or no longer a judge: don't keep their pages around
+            return caches.delete(CACHE_NAME);
+        }
+        return response.clone().json().then(function (data) {
+            return caches.open(CACHE_NAME).then(function (cache) {
+                var pages = data.pages.map(function (page) {
+                    return fetch(page, {
+                        credentials: "same-origin",
+                        headers: {"{{ precache_header }}": "1"}
+                    }).then(function (pageResponse) {
+                        if (pageResponse.ok && !pageResponse.redirected) {
+                            return cache.put(page, pageResponse);
+                        }
+                    });
+                });
+                return Promise.all([cache.put(url, response)].concat(pages));
+            });
+        });
+    }).catch(function () {});
+}
+
+// The network's response if it comes within NETWORK_TIMEOUT, else the cached
+// one. Successful responses replace the cached one when save is true.
+function networkFirst(request, save) {
+    return caches.open(CACHE_NAME).then(function (cache) {
+        var network = fetch(request).then(function (response) {
+            if (save && response.ok && !response.redirected) {
+                cache.put(request, response.clone());
+            }
+            return response;
+        });
+        var timeout = new Promise(function (resolve, reject) {
+            setTimeout(function () {
+                cache.match(request).then(function (cached) {
+                    return cached ? resolve(cached) : network.then(resolve, reject);
+                });
+            }, NETWORK_TIMEOUT);
+        });
+        return Promise.race([network, timeout]).catch(function () {
+            return cache.match(request).then(function (cached) {
+                return cached || Response.error();
+            });
+        });
+    });
+}
+
+function cacheFirst(request) {
+    return caches.open(CACHE_NAME).then(function (cache) {
+        return cache.match(request).then(function (cached) {
+            return cached || fetch(request).then(function (response) {
+                if (response.ok || response.type === "opaque") {
+                    cache.put(request, response.clone());
+                }
+                return response;
+            });
+        });
+    });
+}
+
+self.addEventListener("fetch", function (event) {
+    var request = event.request;
+    if (request.method !== "GET") {
+        return;
+    }
+    var url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        // The versioned Bootstrap and jQuery files from their CDN never change
+        if (request.destination === "style" || request.destination === "script") {
+            event.respondWith(cacheFirst(request));
+        }
+    } else if (url.pathname.indexOf(STATIC_PREFIX) === 0) {
+        event.respondWith(networkFirst(request, true));
+    } else if (url.pathname.indexOf(PAGES_PREFIX) === 0) {
+        // Only pages are kept, not every JSON response
+        event.respondWith(networkFirst(request, request.mode === "navigate"));
+    }
+});
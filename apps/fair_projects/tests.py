@@ -1,31 +1,67 @@
+import importlib
+import json
+import tempfile
+import time
 from collections import OrderedDict
+from datetime import timedelta
 from io import StringIO
+from unittest.mock import patch
 
 import tablib
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
 from django.contrib.auth.models import Group, Permission, User
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.management import call_command
-from django.test import Client, TestCase
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from model_bakery import baker
 
+from apps.awards.models import Award
 from apps.fair_categories.models import Category, Division, Subcategory
 from apps.fair_projects.admin import ProjectResource
+from apps.fair_projects.benchmarks import BENCHMARKS
 from apps.fair_projects.logic import (
+    PROGRESS_COUNTS,
+    EligibilityIndex,
     assign_judges,
+    assign_judges_incrementally,
+    get_progress_summary,
     get_projects_sorted_by_score,
     get_question_feedback_dict,
+    get_result_rows,
+    get_rubric_name,
+    process_project_import,
 )
 from apps.fair_projects.models import (
     JudgingInstance,
+    ProgressEvent,
     Project,
+    ProjectNumberCounter,
+    ProjectSearchEntry,
     School,
     Student,
     Teacher,
     create_teacher,
     create_teachers_group,
 )
+from apps.fair_projects.search import (
+    rebuild_search_index,
+    search_project_ids,
+    update_search_entries,
+)
+from apps.fair_projects.seeding import clear_fair, seed_fair
+from apps.fair_projects.server_benchmarks import DEFAULT_PAGES
+from apps.fair_projects.views import (
+    JudgeProgress,
+    ProgressEventStream,
+    StudentFeedbackForm,
+)
 from apps.judges.models import Judge
 from apps.rubrics.constants import FeedbackFormModuleType
 from apps.rubrics.models import (
@@ -33,6 +69,7 @@ from apps.rubrics.models import (
     FeedbackForm,
     MarkdownFeedbackModule,
     Question,
+    QuestionResponse,
     Rubric,
     RubricResponse,
 )
@@ -252,6 +289,129 @@ class ProjectTests(TestCase):
             project = get_new_project(code)
             self.assertEqual(project.number, number)
 
+    def test_get_next_number_does_not_read_projects(self):
+        project = make_project(category_name="Physical Sciences")
+        project.number = ""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(project.get_next_number(), "1002")
+        self.assertFalse(
+            any(f'"{Project._meta.db_table}"' in query["sql"] for query in queries)
+        )
+
+    def test_allocate_numbers(self):
+        category = baker.make(Category)
+        other_category = baker.make(Category)
+        division = baker.make(Division)
+        allocate = ProjectNumberCounter.objects.allocate
+
+        self.assertEqual(allocate(category, division, 5), range(1001, 1006))
+        self.assertEqual(allocate(category, division), range(1006, 1007))
+        self.assertEqual(allocate(other_category, division, 2), range(2001, 2003))
+
+    def test_full_block_moves_to_a_new_block(self):
+        category = baker.make(Category)
+        other_category = baker.make(Category)
+        division = baker.make(Division)
+        allocate = ProjectNumberCounter.objects.allocate
+
+        self.assertEqual(allocate(category, division, 998), range(1001, 1999))
+        self.assertEqual(allocate(category, division, 2), range(2001, 2003))
+        self.assertEqual(allocate(other_category, division), range(3001, 3002))
+
+    def test_given_number_is_not_allocated_again(self):
+        category, other_category = baker.make(Category, _quantity=2)
+        subcategory = baker.make(Subcategory, category=category)
+        other_subcategory = baker.make(Subcategory, category=other_category)
+        division = baker.make(Division)
+
+        def create(number, subcategory=subcategory):
+            return Project.objects.create(
+                title="Project",
+                number=number,
+                category=subcategory.category,
+                subcategory=subcategory,
+                division=division,
+            )
+
+        create("1001")
+        self.assertEqual(create("").number, "1002")
+        create("1005")
+        self.assertEqual(create("").number, "1006")
+        self.assertEqual(create("", other_subcategory).number, "2001")
+
+    def test_changed_number_is_not_allocated_again(self):
+        project = make_project(category_name="Physical Sciences")
+        project.number = "1010"
+        project.save()
+
+        self.assertEqual(project.get_next_number(), "1011")
+
+    def test_migration_counters_for_clashing_first_numbers(self):
+        migration = importlib.import_module(
+            "apps.fair_projects.migrations.0012_projectnumbercounter"
+        )
+        projects = [
+            ("A", "H", "1001"),
+            ("A", "H", "1003"),
+            ("B", "H", "1001"),
+            ("B", "H", "2004"),
+            ("C", "H", "3001"),
+        ]
+
+        self.assertEqual(
+            migration.counter_ranges(projects),
+            [("A", "H", 1001, 1003), ("B", "H", 4001, 4000), ("C", "H", 3001, 3001)],
+        )
+
+    def test_given_number_in_another_block_is_not_allocated_again(self):
+        division = baker.make(Division)
+        first, second = (
+            make_project(category_name=name, division_name=division.short_description)
+            for name in ("Physical Sciences", "Life Sciences")
+        )
+        self.assertEqual((first.number, second.number), ("1001", "2001"))
+
+        first.number = "2003"
+        first.save()
+
+        self.assertEqual(second.get_next_number(), "2004")
+        self.assertEqual(first.get_next_number(), "1002")
+
+    def test_given_number_in_a_new_block_starts_it(self):
+        project = make_project(category_name="Physical Sciences")
+        project.number = "3005"
+        project.save()
+
+        self.assertEqual(project.get_next_number(), "3006")
+        self.assertEqual(make_project(category_name="Life Sciences").number, "4001")
+
+    def test_numbers_are_unique(self):
+        project = make_project()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            baker.make(Project, number=project.number)
+
+    def test_process_project_import_allocates_blocks(self):
+        physics = baker.make(Category, short_description="Physical Sciences")
+        biology = baker.make(Category, short_description="Life Sciences")
+        baker.make(Subcategory, short_description="Physics", category=physics)
+        baker.make(Subcategory, short_description="Botany", category=biology)
+        baker.make(Division, short_description="High School")
+        rows = [
+            {"Title": title, "Subcategory": subcategory, "Division": "High School"}
+            for title, subcategory in (
+                ("Pendulums", "Physics"),
+                ("Ferns", "Botany"),
+                ("Magnets", "Physics"),
+            )
+        ]
+
+        process_project_import(rows)
+
+        self.assertEqual(
+            list(Project.objects.order_by("number").values_list("title", "number")),
+            [("Pendulums", "1001"), ("Magnets", "1002"), ("Ferns", "2001")],
+        )
+
     def test_project_create(self) -> None:
         category = baker.make(Category, short_description="Test category")
         subcategory = baker.make(
@@ -319,6 +479,20 @@ class ProjectTests(TestCase):
             answer_rubric_response(ji.response)
             self.assertEqual(project.num_scores(), count)
 
+    def test_with_average_score_matches_python_scores(self):
+        unjudged = make_project()
+        project = make_project()
+        judging_instances = [make_judging_instance(project) for _ in range(3)]
+        for ji in judging_instances[:2]:
+            answer_rubric_response(ji.response)
+
+        for annotated in Project.objects.with_average_score().filter(
+            pk__in=(unjudged.pk, project.pk)
+        ):
+            with self.subTest(annotated.pk):
+                self.assertAlmostEqual(annotated.avg_score, annotated.average_score())
+                self.assertEqual(annotated.score_count, annotated.num_scores())
+
 
 def make_rubric():
     rubric = baker.make(Rubric, name="Test Rubric")
@@ -384,6 +558,40 @@ def make_judging_instance(project: Project, judge: Judge = None, rubric: Rubric
     return JudgingInstance.objects.create(project=project, judge=judge, rubric=rubric)
 
 
+class JudgingRubricMixin:
+    """A rubric used as the judging rubric, for django.test.TestCase.
+
+    Subclasses call super().setUpTestData() and then add their own judges and
+    instances, usually with make_instances().
+
+    """
+
+    # The modules whose get_rubric_name returns the rubric's name
+    rubric_name_modules = ("apps.fair_projects.views",)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.rubric = make_rubric()
+        cls.question = cls.rubric.question_set.get(question_type=Question.SCALE_TYPE)
+
+    @classmethod
+    def make_instances(cls, judge: Judge, projects) -> list[JudgingInstance]:
+        """Make judge the only judge of each project."""
+        instances = []
+        for project in projects:
+            project.judginginstance_set.all().delete()
+            instances.append(make_judging_instance(project, judge, cls.rubric))
+        return instances
+
+    def setUp(self):
+        super().setUp()
+        for module in self.rubric_name_modules:
+            patcher = patch(f"{module}.get_rubric_name", return_value=self.rubric.name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
 class JudgingInstanceTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -403,6 +611,19 @@ class JudgingInstanceTests(TestCase):
         self.assertIsNotNone(self.ji.response)
         self.assertIsInstance(self.ji.response, RubricResponse)
 
+    def test_rubric_copied_from_response(self):
+        self.assertEqual(self.ji.rubric, self.rubric)
+
+        response = make_rubric_response(self.rubric)
+        ji = JudgingInstance.objects.create(
+            judge=make_judge(), project=self.project, response=response
+        )
+        self.assertEqual(ji.rubric, self.rubric)
+
+    def test_judge_assigned_project_once_per_rubric(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            make_judging_instance(self.project, judge=self.judge, rubric=self.rubric)
+
     def test_judging_instance_string_method(self):
         self.assertIn(str(self.judge), str(self.ji))
         self.assertIn(str(self.project), str(self.ji))
@@ -431,6 +652,79 @@ class JudgingInstanceTests(TestCase):
         )
 
 
+class EligibilityIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rubric = make_rubric()
+        cls.category, cls.other_category = baker.make(Category, _quantity=2)
+        cls.division = baker.make(Division)
+        # Before the judges, so the save signal doesn't assign them
+        cls.project = make_project(category=cls.category, division=cls.division)
+        cls.judge = make_judge(categories=[cls.category], divisions=[cls.division])
+        cls.busy_judge = make_judge(categories=[cls.category], divisions=[cls.division])
+        cls.broad_judge = make_judge(
+            categories=[cls.category, cls.other_category], divisions=[cls.division]
+        )
+        make_judging_instance(cls.project, judge=cls.busy_judge, rubric=cls.rubric)
+
+    def test_judges_for_bucket_least_loaded_first(self):
+        index = EligibilityIndex(self.rubric)
+        self.assertEqual(
+            index.judges_for(self.category.pk, self.division.pk),
+            [self.judge.pk, self.broad_judge.pk, self.busy_judge.pk],
+        )
+        self.assertEqual(
+            index.judges_for(self.other_category.pk, self.division.pk),
+            [self.broad_judge.pk],
+        )
+
+    def test_judges_for_below_load(self):
+        index = EligibilityIndex(self.rubric)
+        self.assertEqual(
+            index.judges_for(self.category.pk, self.division.pk, below=1),
+            [self.judge.pk, self.broad_judge.pk],
+        )
+
+    def test_can_judge(self):
+        index = EligibilityIndex(self.rubric, assignments=False)
+        self.assertTrue(
+            index.can_judge(self.judge.pk, self.category.pk, self.division.pk)
+        )
+        self.assertFalse(
+            index.can_judge(self.judge.pk, self.other_category.pk, self.division.pk)
+        )
+
+    def test_inactive_judges_are_not_indexed(self):
+        self.judge.user.is_active = False
+        self.judge.user.save()
+
+        index = EligibilityIndex(self.rubric)
+
+        self.assertFalse(
+            index.can_judge(self.judge.pk, self.category.pk, self.division.pk)
+        )
+        self.assertNotIn(
+            self.judge.pk, index.judges_for(self.category.pk, self.division.pk)
+        )
+
+    def test_add_and_remove_update_loads(self):
+        index = EligibilityIndex(self.rubric)
+        self.assertTrue(index.is_assigned(self.busy_judge.pk, self.project.pk))
+
+        index.remove(self.busy_judge.pk, self.project.pk)
+        index.add(self.judge.pk, self.project.pk)
+
+        self.assertFalse(index.is_assigned(self.busy_judge.pk, self.project.pk))
+        self.assertTrue(index.is_assigned(self.judge.pk, self.project.pk))
+        self.assertEqual(
+            index.judges_for(self.category.pk, self.division.pk)[0], self.busy_judge.pk
+        )
+
+    def test_built_with_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(3):
+            EligibilityIndex(self.rubric)
+
+
 class TestJudgeAssignmentAndProjectScoring(TestCase):
     fixtures = [
         "divisions_categories.json",
@@ -529,6 +823,154 @@ class TestJudgeAssignmentAndProjectScoring(TestCase):
         )
 
 
+class IncrementalAssignmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rubric = seed_fair(12, seed=3).rubric
+        cls.category = baker.make(Category, short_description="Late Category")
+        cls.division = baker.make(Division, short_description="Late Division")
+        cls.judges = [
+            make_judge(categories=[cls.category], divisions=[cls.division])
+            for _ in range(4)
+        ]
+
+    def make_late_project(self) -> Project:
+        project = make_project(category=self.category, division=self.division)
+        # Undo the assignment signal, as if the project missed it
+        project.judginginstance_set.all().delete()
+        return project
+
+    def test_project_gets_judges_within_its_bucket(self):
+        project = self.make_late_project()
+        other_instances = set(JudgingInstance.objects.values_list("pk", flat=True))
+
+        created = assign_judges_incrementally(projects=[project])
+
+        self.assertEqual(created, 3)
+        self.assertLessEqual(
+            {ji.judge for ji in project.judginginstance_set.all()}, set(self.judges)
+        )
+        self.assertEqual(
+            set(
+                JudgingInstance.objects.exclude(project=project).values_list(
+                    "pk", flat=True
+                )
+            ),
+            other_instances,
+        )
+
+    def test_least_loaded_judges_are_assigned(self):
+        busy_judge = self.judges[0]
+        make_judging_instance(
+            Project.objects.exclude(category=self.category).first(),
+            judge=busy_judge,
+            rubric=self.rubric,
+        )
+        project = self.make_late_project()
+
+        assign_judges_incrementally(projects=[project])
+
+        self.assertEqual(
+            set(ji.judge for ji in project.judginginstance_set.all()),
+            set(self.judges[1:]),
+        )
+
+    def test_locked_instances_are_kept_and_stale_ones_removed(self):
+        project = self.make_late_project()
+        stale_judge, locked_judge = (
+            make_judge(categories=[self.category], divisions=[self.division])
+            for _ in range(2)
+        )
+        stale = make_judging_instance(project, judge=stale_judge, rubric=self.rubric)
+        locked = make_judging_instance(project, judge=locked_judge, rubric=self.rubric)
+        locked.set_locked()
+        for judge in (stale_judge, locked_judge):
+            judge.divisions.set([baker.make(Division)])
+
+        assign_judges_incrementally(projects=[project])
+
+        self.assertFalse(JudgingInstance.objects.filter(pk=stale.pk).exists())
+        self.assertTrue(JudgingInstance.objects.filter(pk=locked.pk).exists())
+        self.assertEqual(project.judginginstance_set.count(), 3)
+
+    def test_judge_gets_projects_within_their_buckets(self):
+        projects = [self.make_late_project() for _ in range(6)]
+        assign_judges_incrementally(projects=projects)
+        judge = make_judge(categories=[self.category], divisions=[self.division])
+
+        created = assign_judges_incrementally(judges=[judge])
+
+        self.assertEqual(created, 5)
+        self.assertLessEqual(
+            {ji.project for ji in judge.judginginstance_set.all()}, set(projects)
+        )
+
+    def test_command_assigns_new_projects_and_judges(self):
+        project = self.make_late_project()
+        out = StringIO()
+
+        call_command("assignjudges", "--new", stdout=out)
+
+        # The project gets 3 judges, then the 4th judge, who has no projects
+        # yet, gets it as well
+        self.assertEqual(project.judginginstance_set.count(), 4)
+        self.assertIn("Created 4 judging instances", out.getvalue())
+
+    def test_command_rejects_unknown_projects(self):
+        with self.assertRaisesMessage(CommandError, "No projects numbered 99999"):
+            call_command("assignjudges", "--project", "99999")
+
+
+class ProjectIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_fair(60, seed=1, assign=False)
+        rebuild_search_index()
+        cls.url = reverse("fair_projects:index")
+
+    def test_projects_are_paginated(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context["project_list"]), 50)
+
+        response = self.client.get(self.url, {"page": 2})
+        self.assertEqual(len(response.context["project_list"]), 10)
+
+    def test_filter_by_category_and_division(self):
+        project = Project.objects.order_by("number").first()
+        response = self.client.get(
+            self.url, {"category": project.category_id, "division": project.division_id}
+        )
+        projects = response.context["project_list"]
+        self.assertIn(project, projects)
+        self.assertEqual(
+            {(p.category_id, p.division_id) for p in projects},
+            {(project.category_id, project.division_id)},
+        )
+
+    def test_filter_by_number_or_title(self):
+        project = Project.objects.order_by("number").last()
+        with self.captureOnCommitCallbacks(execute=True):
+            project.title = "A Study of Unusual Pendulums"
+            project.save()
+
+        for query in (project.number, "unusual pendulum"):
+            with self.subTest(query=query):
+                response = self.client.get(self.url, {"q": query})
+                self.assertEqual(list(response.context["project_list"]), [project])
+
+    async def test_projects_are_paginated_under_asgi(self):
+        response = await self.async_client.get(self.url, {"page": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["project_list"]), 10)
+        self.assertEqual(response.context["paginator"].count, 60)
+
+    def test_pagination_links_keep_filters(self):
+        # A blank search matches every project, so there's a second page
+        response = self.client.get(self.url, {"q": " ", "page": 1})
+        self.assertEqual(response.context["filter_query"], "q=+")
+        self.assertContains(response, "q=+&amp;page=2")
+
+
 class TestResultsPage(TestCase):
     fixtures = [
         "divisions_categories.json",
@@ -590,6 +1032,45 @@ class TestResultsPage(TestCase):
             msg_prefix="Results page did not use the appropriate template",
         )
 
+    async def test_results_view_under_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.user_with_permission)
+        response = await self.async_client.get(self.results_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row.number for row in response.context["project_list"]],
+            [row.number for row in await sync_to_async(get_result_rows)()],
+        )
+
+        await sync_to_async(self.async_client.force_login)(self.user_without_permission)
+        response = await self.async_client.get(self.results_url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_result_rows_match_projects(self):
+        project = Project.objects.order_by("number").first()
+        answer_rubric_response(project.judginginstance_set.first().response)
+        student = baker.make(Student, project=project)
+        award = baker.make(Award)
+        award.awardinstance_set.create(content_object=project)
+
+        rows = get_result_rows()
+
+        projects = get_projects_sorted_by_score()
+        self.assertEqual([row.number for row in rows], [p.number for p in projects])
+        for row, project in zip(rows, projects):
+            self.assertEqual(row.avg_score, project.avg_score)
+            self.assertEqual(row.score_count, project.score_count)
+            self.assertEqual(
+                row.judge_scores,
+                [
+                    (str(ji.judge), ji.response.score())
+                    for ji in project.judginginstance_set.order_by("pk")
+                ],
+            )
+            self.assertEqual(row.students, [str(s) for s in project.student_set.all()])
+            self.assertEqual(row.awards, Award.get_awards_for_object(project))
+        self.assertIn(str(student), rows[0].students)
+        self.assertEqual(rows[0].awards, [award])
+
     def test_no_link_to_results_for_anonymous(self):
         response = self.client.get(reverse("fair_projects:index"), follow=True)
         self.assertNotContains(
@@ -624,6 +1105,1181 @@ class TestResultsPage(TestCase):
         )
 
 
+class JudgingResponsesSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        project = make_project(category_name="Physical Sciences")
+        other_project = make_project(category_name="Physical Sciences")
+        project.judginginstance_set.all().delete()
+        other_project.judginginstance_set.all().delete()
+        cls.rubric = make_rubric()
+        cls.questions = {
+            question.question_type: question.pk
+            for question in cls.rubric.question_set.all()
+        }
+        cls.judge = make_judge()
+        cls.instance = make_judging_instance(project, cls.judge, cls.rubric)
+        cls.other_instance = make_judging_instance(other_project, cls.judge, cls.rubric)
+        cls.url = reverse("fair_projects:judging_responses_save")
+
+    def setUp(self):
+        self.client.force_login(self.judge.user)
+
+    def save(self, responses: dict, **headers):
+        return self.client.post(
+            self.url,
+            json.dumps({"responses": responses}),
+            content_type="application/json",
+            **headers,
+        )
+
+    def answers(self, scale="3", multi_select=("1", "2"), long_text="Well done"):
+        return {
+            self.questions[Question.SCALE_TYPE]: scale,
+            self.questions[Question.SINGLE_SELECT_TYPE]: "2",
+            self.questions[Question.MULTI_SELECT_TYPE]: list(multi_select),
+            self.questions[Question.LONG_TEXT]: long_text,
+        }
+
+    def test_saves_answers_and_returns_progress(self):
+        response = self.save(
+            {
+                self.instance.pk: self.answers(),
+                self.other_instance.pk: {self.questions[Question.SCALE_TYPE]: "1"},
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        progress = response.json()["instances"]
+
+        self.instance.refresh_from_db()
+        self.assertTrue(self.instance.locked)
+        self.assertTrue(progress[str(self.instance.pk)]["complete"])
+        self.assertAlmostEqual(
+            progress[str(self.instance.pk)]["score"], self.instance.score()
+        )
+        self.assertEqual(
+            self.instance.response.question_response_dict[
+                self.questions[Question.MULTI_SELECT_TYPE]
+            ].response,
+            ["1", "2"],
+        )
+
+        other = progress[str(self.other_instance.pk)]
+        self.assertTrue(other["started"])
+        self.assertFalse(other["complete"])
+
+    def test_partial_answers_keep_the_others(self):
+        self.save({self.instance.pk: self.answers()})
+        response = self.save(
+            {self.instance.pk: {self.questions[Question.LONG_TEXT]: None}}
+        )
+
+        self.assertFalse(
+            response.json()["instances"][str(self.instance.pk)]["complete"]
+        )
+        answers = self.instance.response.question_response_dict
+        self.assertIsNone(answers[self.questions[Question.LONG_TEXT]].response)
+        self.assertEqual(answers[self.questions[Question.SCALE_TYPE]].response, "3")
+
+    def test_query_count_does_not_depend_on_number_of_answers(self):
+        self.save({self.instance.pk: self.answers()})
+        with CaptureQueriesContext(connection) as one:
+            self.save({self.instance.pk: {self.questions[Question.SCALE_TYPE]: "1"}})
+        with CaptureQueriesContext(connection) as many:
+            self.save(
+                {
+                    self.instance.pk: self.answers(scale="2"),
+                    self.other_instance.pk: self.answers(scale="2"),
+                }
+            )
+        self.assertEqual(len(many), len(one))
+
+    def test_invalid_answers_save_nothing(self):
+        response = self.save(
+            {
+                self.instance.pk: {
+                    self.questions[Question.SCALE_TYPE]: "1",
+                    self.questions[Question.SINGLE_SELECT_TYPE]: "9",
+                    9999: "1",
+                },
+                9999: {},
+            }
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(response.json()["errors"]),
+            {
+                f"{self.instance.pk}.{self.questions[Question.SINGLE_SELECT_TYPE]}",
+                f"{self.instance.pk}.9999",
+                "9999",
+            },
+        )
+        self.assertFalse(self.instance.response.has_response)
+
+    def test_malformed_body(self):
+        for body in ("not json", "{}", '{"responses": {"a": {}}}', "[]"):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    self.url, body, content_type="application/json"
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_only_the_judge_or_staff_may_save(self):
+        self.client.force_login(make_judge().user)
+        response = self.save({self.instance.pk: self.answers()})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.logout()
+        response = self.save({self.instance.pk: self.answers()})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        response = self.save({self.instance.pk: self.answers()})
+        self.assertEqual(response.status_code, 200)
+
+    def test_retries_with_the_same_key_are_replayed(self):
+        first = self.save(
+            {self.instance.pk: self.answers()}, HTTP_IDEMPOTENCY_KEY="save-1"
+        )
+        # A later save must not be undone by replaying the first one
+        self.save({self.instance.pk: {self.questions[Question.SCALE_TYPE]: "1"}})
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.save(
+                {self.instance.pk: self.answers()}, HTTP_IDEMPOTENCY_KEY="save-1"
+            )
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertFalse(
+            any("UPDATE" in query["sql"] for query in queries.captured_queries)
+        )
+        scale = self.instance.response.question_response_dict[
+            self.questions[Question.SCALE_TYPE]
+        ]
+        self.assertEqual(scale.response, "1")
+
+        other = self.save(
+            {self.instance.pk: self.answers(scale="2")}, HTTP_IDEMPOTENCY_KEY="save-1"
+        )
+        self.assertEqual(other.status_code, 422)
+
+
+class OfflineJudgingTests(JudgingRubricMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.questions = {
+            question.question_type: question.pk
+            for question in cls.rubric.question_set.all()
+        }
+        cls.judge = make_judge(user=baker.make(User, username="dgreen"))
+        cls.instances = cls.make_instances(cls.judge, [make_project(), make_project()])
+        cls.save_url = reverse("fair_projects:judging_responses_save")
+        cls.data_url = reverse("fair_projects:judge_offline_data", args=("dgreen",))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.judge.user)
+
+    def save_queued(self, value: str, submitted, sent=None, **headers):
+        body = {
+            "responses": {
+                self.instances[0].pk: {
+                    self.questions[Question.SCALE_TYPE]: {
+                        "value": value,
+                        "submitted": submitted.isoformat(),
+                    }
+                }
+            }
+        }
+        if sent:
+            body["sent"] = sent.isoformat()
+        return self.client.post(
+            self.save_url, json.dumps(body), content_type="application/json", **headers
+        )
+
+    def scale_response(self):
+        return self.instances[0].response.question_response_dict[
+            self.questions[Question.SCALE_TYPE]
+        ]
+
+    def test_queued_answers_keep_when_they_were_given(self):
+        answered = timezone.now() - timedelta(minutes=5)
+        response = self.save_queued("2", answered)
+
+        self.assertEqual(response.json()["conflicts"], {})
+        self.assertEqual(self.scale_response().response, "2")
+        self.assertEqual(self.scale_response().last_submitted, answered)
+
+    def test_last_answer_wins(self):
+        now = timezone.now()
+        self.save_queued("2", now - timedelta(minutes=5))
+        response = self.save_queued("3", now - timedelta(minutes=10))
+
+        key = f"{self.instances[0].pk}.{self.questions[Question.SCALE_TYPE]}"
+        self.assertEqual(response.json()["conflicts"][key]["value"], "2")
+        self.assertEqual(self.scale_response().response, "2")
+
+        self.save_queued("1", now - timedelta(minutes=1))
+        self.assertEqual(self.scale_response().response, "1")
+
+    def test_times_are_corrected_for_the_device_clock(self):
+        # The device's clock is an hour fast
+        device_now = timezone.now() + timedelta(hours=1)
+        self.save_queued("2", device_now - timedelta(minutes=5), sent=device_now)
+
+        offset = timezone.now() - self.scale_response().last_submitted
+        self.assertAlmostEqual(offset.total_seconds(), 300, delta=30)
+
+    def test_retries_sent_later_are_replayed(self):
+        answered = timezone.now() - timedelta(minutes=5)
+        first = self.save_queued(
+            "2", answered, sent=timezone.now(), HTTP_IDEMPOTENCY_KEY="batch-1"
+        )
+        retry = self.save_queued(
+            "2",
+            answered,
+            sent=timezone.now() + timedelta(minutes=1),
+            HTTP_IDEMPOTENCY_KEY="batch-1",
+        )
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+
+    def test_offline_data(self):
+        answer_rubric_response(self.instances[0].response)
+        response = self.client.get(self.data_url)
+        data = response.json()
+
+        self.assertEqual(
+            [instance["id"] for instance in data["instances"]],
+            [instance.pk for instance in self.instances],
+        )
+        self.assertIn(
+            reverse(
+                "fair_projects:judging_instance_edit", args=(self.instances[0].pk,)
+            ),
+            data["pages"],
+        )
+        questions = data["rubrics"][str(self.rubric.pk)]["questions"]
+        scale = next(q for q in questions if q["type"] == Question.SCALE_TYPE)
+        self.assertEqual(
+            scale["choices"], [["1", "Choice 1"], ["2", "Choice 2"], ["3", "Choice 3"]]
+        )
+        answers = data["instances"][0]["answers"]
+        self.assertEqual(answers[str(scale["id"])]["value"], "1")
+        self.assertIsNotNone(answers[str(scale["id"])]["last_submitted"])
+
+    def test_offline_data_query_count_does_not_grow_with_instances(self):
+        self.client.get(self.data_url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.data_url)
+        for _ in range(3):
+            make_judging_instance(make_project(), self.judge, self.rubric)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.data_url)
+        self.assertEqual(len(response.json()["instances"]), 5)
+        self.assertEqual(len(many), len(few))
+
+    def test_offline_data_is_only_for_the_judge_or_staff(self):
+        self.client.force_login(make_judge().user)
+        self.assertEqual(self.client.get(self.data_url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get(self.data_url).status_code, 200)
+
+    def test_precaching_the_rubric_form_does_not_lock(self):
+        url = reverse(
+            "fair_projects:judging_instance_edit", args=(self.instances[0].pk,)
+        )
+        response = self.client.get(url, HTTP_X_OFFLINE_PRECACHE="1")
+        self.assertContains(response, 'id="offline-judging"')
+        self.instances[0].refresh_from_db()
+        self.assertFalse(self.instances[0].locked)
+
+        self.client.get(url)
+        self.instances[0].refresh_from_db()
+        self.assertTrue(self.instances[0].locked)
+
+    def test_service_worker(self):
+        response = self.client.get(reverse("fair_projects:service_worker"))
+        self.assertEqual(response["Content-Type"], "application/javascript")
+        self.assertContains(response, "X-Offline-Precache")
+        self.assertContains(response, 'PAGES_PREFIX = "/projects/"')
+
+
+class ProjectSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_teachers_group()
+        with cls.captureOnCommitCallbacks(execute=True):
+            teacher = create_teacher(
+                "teacher", "teacher@example.com", "Teddy", "Testerson", "Test School"
+            )
+            cls.project = make_project(
+                category_name="Physical Sciences",
+                title="A Study of Unusual Pendulums",
+                abstract="Measuring the period of a double pendulum",
+            )
+            cls.other_project = make_project(
+                category_name="Physical Sciences", title="Growing Crystals"
+            )
+            cls.student = make_student(
+                project=cls.project,
+                teacher=teacher,
+                first_name="Ada",
+                last_name="Lovelace",
+            )
+        cls.url = reverse("fair_projects:project_search")
+
+    def test_matches_every_searched_field(self):
+        for query in (
+            self.project.number,
+            "unusual pendulums",
+            "double period",
+            "Lovelace",
+            "testerson",
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(search_project_ids(query), [self.project.pk])
+
+    def test_matches_word_prefixes(self):
+        self.assertEqual(search_project_ids("pend unus"), [self.project.pk])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(search_project_ids("pendulums crystals"), [])
+
+    def test_query_syntax_is_not_parsed(self):
+        for query in ('pendulums" OR "crystals', "NOT crystals", "*", "title:ada"):
+            with self.subTest(query=query):
+                search_project_ids(query)
+        self.assertEqual(search_project_ids('"" -- ;'), [])
+
+    def test_exact_number_comes_first(self):
+        self.assertEqual(
+            search_project_ids(self.other_project.number)[0], self.other_project.pk
+        )
+
+    def test_entries_follow_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.project = self.other_project
+            self.student.save()
+        self.assertEqual(search_project_ids("lovelace"), [self.other_project.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.get(username="teacher")
+            user.last_name = "Renamed"
+            user.save()
+        self.assertEqual(search_project_ids("testerson"), [])
+        self.assertEqual(search_project_ids("renamed"), [self.other_project.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_project.delete()
+        self.assertEqual(search_project_ids("lovelace"), [])
+
+    def test_updates_are_batched_per_transaction(self):
+        with patch(
+            "apps.fair_projects.search.update_search_entries",
+            wraps=update_search_entries,
+        ) as update:
+            with self.captureOnCommitCallbacks(execute=True):
+                for project in (self.project, self.other_project):
+                    project.title = "Renamed"
+                    project.save()
+                self.student.save()
+
+        update.assert_called_once_with({self.project.pk, self.other_project.pk})
+        self.assertEqual(
+            set(search_project_ids("renamed")), {self.project.pk, self.other_project.pk}
+        )
+
+    def test_updates_after_a_rolled_back_savepoint_are_kept(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.project.title = "Renamed"
+                self.project.save()
+            with transaction.atomic():
+                self.other_project.title = "Discarded"
+                self.other_project.save()
+                transaction.set_rollback(True)
+            self.student.project = self.other_project
+            self.student.save()
+
+        self.assertEqual(search_project_ids("renamed"), [self.project.pk])
+        self.assertEqual(search_project_ids("lovelace"), [self.other_project.pk])
+
+    def test_suggestions(self):
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        response = self.client.get(self.url, {"q": "pendulum"})
+        self.assertEqual(
+            response.json(),
+            {
+                "results": [
+                    {
+                        "number": self.project.number,
+                        "title": self.project.title,
+                        "url": self.project.get_absolute_url(),
+                    }
+                ]
+            },
+        )
+
+    def test_suggestions_require_staff_or_judge(self):
+        response = self.client.get(self.url, {"q": "pendulum"})
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(User.objects.create_user("someone"))
+        response = self.client.get(self.url, {"q": "pendulum"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_suggestions_check_access_without_cached_roles(self):
+        user = User.objects.create_user("staff", is_staff=True)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url, {"q": "pendulum"}).status_code, 200)
+
+        # Like a change made in another process, which this one's cached
+        # roles don't hear about
+        User.objects.filter(pk=user.pk).update(is_staff=False)
+        self.assertEqual(self.client.get(self.url, {"q": "pendulum"}).status_code, 403)
+
+
+class ProjectDetailViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_teachers_group()
+        cls.teacher = create_teacher(
+            "teacher", "teacher@example.com", "Teddy", "Testerson", "Test School"
+        )
+        cls.other_teacher = create_teacher(
+            "other_teacher", "other@example.com", "Olive", "Other", "Test School"
+        )
+        cls.small_project = make_project(category_name="Physical Sciences")
+        cls.large_project = make_project(category_name="Physical Sciences")
+        make_student(project=cls.small_project, teacher=cls.teacher)
+        make_student(project=cls.large_project, teacher=cls.other_teacher)
+        for _ in range(3):
+            make_student(project=cls.large_project, teacher=cls.teacher)
+        rubric = make_rubric()
+        make_judging_instance(cls.small_project, rubric=rubric)
+        for _ in range(3):
+            make_judging_instance(cls.large_project, rubric=rubric)
+
+    def get(self, project: Project):
+        return self.client.get(reverse("fair_projects:detail", args=(project.number,)))
+
+    def test_query_count_does_not_depend_on_students_or_judges(self):
+        self.client.force_login(self.teacher.user)
+        self.get(self.small_project)
+
+        with CaptureQueriesContext(connection) as small:
+            self.get(self.small_project)
+        with CaptureQueriesContext(connection) as large:
+            response = self.get(self.large_project)
+
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(len(response.context["student_list"]), 4)
+        self.assertEqual(len(response.context["judge_list"]), 3)
+
+    def test_submitting_teacher(self):
+        self.client.force_login(self.teacher.user)
+        self.assertTrue(self.get(self.small_project).context["is_submitting_teacher"])
+
+        self.client.force_login(self.other_teacher.user)
+        self.assertFalse(self.get(self.small_project).context["is_submitting_teacher"])
+        self.assertTrue(self.get(self.large_project).context["is_submitting_teacher"])
+
+    def test_anonymous_user_is_not_submitting_teacher(self):
+        self.assertFalse(self.get(self.small_project).context["is_submitting_teacher"])
+
+
+class JudgeDetailViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rubric = make_rubric()
+        user = baker.make(
+            User, username="dgreen", first_name="Dallas", last_name="Green"
+        )
+        cls.judge = make_judge(user=user)
+        cls.url = reverse(
+            "fair_projects:judge_detail", kwargs={"judge_username": "dgreen"}
+        )
+
+    def setUp(self):
+        patcher = patch(
+            "apps.fair_projects.views.get_rubric_name", return_value=self.rubric.name
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.judge.user)
+
+    def add_instances(self, count: int) -> list[JudgingInstance]:
+        return [
+            make_judging_instance(make_project(), judge=self.judge, rubric=self.rubric)
+            for _ in range(count)
+        ]
+
+    def count_queries(self) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_instances(self):
+        instances = self.add_instances(1)
+        answer_rubric_response(instances[0].response)
+        self.client.get(self.url)  # Populate config defaults
+        expected = self.count_queries()
+
+        instances = self.add_instances(5)
+        answer_rubric_response(instances[0].response)
+        self.assertEqual(self.count_queries(), expected)
+
+    def test_progress_annotations_match_instances(self):
+        instances = self.add_instances(2)
+        answer_rubric_response(instances[0].response)
+
+        response = self.client.get(self.url)
+        for ji in response.context["judginginstance_list"]:
+            with self.subTest(ji.pk):
+                self.assertEqual(ji.response_started, ji.has_response())
+                self.assertEqual(ji.response_complete, ji.complete())
+                self.assertAlmostEqual(ji.response_score, ji.score())
+                self.assertEqual(ji.response_last_submitted, ji.response.last_submitted)
+
+    def test_unchanged_dashboard_returns_not_modified(self):
+        instances = self.add_instances(2)
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        answer_rubric_response(instances[0].response)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("Last-Modified", response)
+
+    async def test_dashboard_under_asgi(self):
+        instances = await sync_to_async(self.add_instances)(2)
+        await sync_to_async(self.async_client.force_login)(self.judge.user)
+
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [ji.pk for ji in response.context["judginginstance_list"]],
+            [ji.pk for ji in sorted(instances, key=lambda ji: ji.project.number)],
+        )
+
+        # The async client takes headers by their names
+        response = await self.async_client.get(
+            self.url, **{"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_judge_is_not_found(self):
+        self.client.force_login(baker.make(User, is_staff=True))
+        response = self.client.get(
+            reverse("fair_projects:judge_detail", args=("nobody",))
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class JudgeProgressTests(JudgingRubricMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.judge = make_judge(user=baker.make(User, username="dgreen"))
+        cls.instances = cls.make_instances(cls.judge, [make_project(), make_project()])
+        answer_rubric_response(cls.instances[0].response)
+        cls.last_submitted = cls.instances[0].response.last_submitted
+        cls.url = reverse("fair_projects:judge_progress", args=("dgreen",))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.judge.user)
+
+    def test_returns_progress_of_each_instance(self):
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(
+            data["instances"].keys(), {str(ji.pk) for ji in self.instances}
+        )
+        answered = data["instances"][str(self.instances[0].pk)]
+        self.assertTrue(answered["started"])
+        self.assertTrue(answered["complete"])
+        self.assertFalse(data["instances"][str(self.instances[1].pk)]["started"])
+        self.assertEqual(data["last_submitted"], self.last_submitted.isoformat())
+
+    def test_other_judges_are_forbidden(self):
+        self.client.force_login(make_judge().user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_does_not_wait_under_wsgi(self):
+        with patch.object(JudgeProgress, "wait_timeout", 60):
+            response = self.client.get(
+                self.url, {"since": self.last_submitted.isoformat()}
+            )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_waits_for_a_newer_answer_under_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.judge.user)
+        since = {"since": self.last_submitted.isoformat()}
+        with patch.object(JudgeProgress, "wait_timeout", 0.1), patch.object(
+            JudgeProgress, "poll_interval", 0.01
+        ):
+            start = time.monotonic()
+            response = await self.async_client.get(self.url, since)
+            self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(response.json()["last_submitted"], since["since"])
+
+        # An answer saved since the last response is returned right away
+        earlier = self.last_submitted - timedelta(minutes=1)
+        with patch.object(JudgeProgress, "wait_timeout", 60):
+            response = await self.async_client.get(
+                self.url, {"since": earlier.isoformat()}
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class ProgressEventTests(JudgingRubricMixin, TestCase):
+    rubric_name_modules = ("apps.fair_projects.events", "apps.fair_projects.views")
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.judge = make_judge(
+            user=baker.make(User, first_name="Dallas", last_name="Green")
+        )
+        cls.instances = cls.make_instances(cls.judge, [make_project(), make_project()])
+        cls.viewer = baker.make(User)
+        cls.viewer.user_permissions.add(
+            Permission.objects.get(codename="can_view_results")
+        )
+        cls.stream_url = reverse("fair_projects:progress_events")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.viewer)
+
+    def save_answer(self, instance, value="3"):
+        instance.response.update_responses({self.question.pk: value})
+
+    def answer(self, instance, value="3"):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.save_answer(instance, value)
+
+    def test_saving_answers_adds_events_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                self.save_answer(self.instances[0])
+                self.save_answer(self.instances[0], "2")
+                self.save_answer(self.instances[1])
+            self.assertFalse(ProgressEvent.objects.exists())
+        # The totals count the whole fair, so they're left to the stream
+        with patch("apps.fair_projects.events.get_progress_totals") as totals:
+            for callback in callbacks:
+                callback()
+        totals.assert_not_called()
+
+        events = list(ProgressEvent.objects.order_by("pk"))
+        self.assertEqual(
+            [event.kind for event in events],
+            ["instance", "instance", "project", "project"],
+        )
+        self.assertEqual(
+            events[0].data,
+            {
+                "id": self.instances[0].pk,
+                "project": self.instances[0].project.number,
+                "judge": "Dallas Green",
+                "started": True,
+                "complete": False,
+                "score": self.instances[0].score(),
+            },
+        )
+        scores = {event.data["number"]: event.data for event in events[2:4]}
+        self.assertEqual(
+            scores[self.instances[0].project.number]["avg_score"],
+            self.instances[0].score(),
+        )
+
+    def test_rolled_back_answers_add_no_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.save_answer(self.instances[0])
+                transaction.set_rollback(True)
+        self.assertFalse(ProgressEvent.objects.exists())
+
+    def test_stream_sends_the_events_after_the_last_one(self):
+        self.answer(self.instances[0])
+        first = ProgressEvent.objects.order_by("pk").first()
+
+        response = self.client.get(self.stream_url, HTTP_LAST_EVENT_ID=str(first.pk))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = response.content.decode()
+        self.assertTrue(body.startswith("retry: 5000\n\n"))
+        self.assertNotIn(f"id: {first.pk}\n", body)
+        self.assertIn(f"id: {first.pk + 1}\nevent: project\ndata: {{", body)
+
+    def test_stream_sends_totals_after_instance_events(self):
+        self.answer(self.instances[0])
+        instance_event = ProgressEvent.objects.filter(kind="instance").get()
+
+        body = self.client.get(
+            self.stream_url, HTTP_LAST_EVENT_ID=str(instance_event.pk - 1)
+        ).content.decode()
+        self.assertTrue(
+            body.endswith(
+                'event: progress\ndata: {"total":2,"started":1,"complete":0}\n\n'
+            )
+        )
+
+        # Only project events follow the instance event
+        body = self.client.get(
+            self.stream_url, HTTP_LAST_EVENT_ID=str(instance_event.pk)
+        ).content.decode()
+        self.assertIn("event: project\n", body)
+        self.assertNotIn("event: progress\n", body)
+
+    def test_stream_without_an_id_starts_from_now(self):
+        self.answer(self.instances[0])
+        response = self.client.get(self.stream_url)
+        self.assertNotIn("id:", response.content.decode())
+
+    def test_stream_requires_permission(self):
+        self.client.force_login(self.judge.user)
+        self.assertEqual(self.client.get(self.stream_url).status_code, 403)
+
+    async def test_stream_waits_for_events_under_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.viewer)
+        with patch.object(ProgressEventStream, "wait_timeout", 0.1), patch.object(
+            ProgressEventStream, "poll_interval", 0.01
+        ):
+            start = time.monotonic()
+            response = await self.async_client.get(self.stream_url)
+            self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(response.content.decode(), "retry: 1000\n\n")
+
+    def test_live_results_page(self):
+        self.answer(self.instances[0])
+        response = self.client.get(reverse("fair_projects:live_results"))
+
+        self.assertEqual(
+            response.context["last_event_id"],
+            ProgressEvent.objects.order_by("pk").last().pk,
+        )
+        self.assertEqual(
+            response.context["project_list"][0]["number"],
+            self.instances[0].project.number,
+        )
+        self.assertEqual(response.context["progress"]["started"], 1)
+
+    def test_prune_old_events(self):
+        self.answer(self.instances[0])
+        ProgressEvent.objects.update(created=timezone.now() - timedelta(days=2))
+        self.answer(self.instances[1])
+
+        call_command("pruneprogressevents", stdout=StringIO())
+        self.assertEqual(ProgressEvent.objects.count(), 2)
+
+
+class JudgingInstanceViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rubric = make_rubric()
+        create_teachers_group()
+        cls.teacher = create_teacher(
+            username="test_teacher",
+            email="test@test.com",
+            first_name="Teddy",
+            last_name="Testerson",
+            school_name=make_school().name,
+        )
+        user = baker.make(
+            User, username="dgreen", first_name="Dallas", last_name="Green"
+        )
+        cls.judge = make_judge(user=user)
+
+    def setUp(self):
+        self.project = make_project(title="Test Project")
+        self.ji = make_judging_instance(
+            self.project, judge=self.judge, rubric=self.rubric
+        )
+        answer_rubric_response(self.ji.response)
+        self.detail_url = reverse(
+            "fair_projects:judging_instance_detail", args=(self.ji.pk,)
+        )
+        self.edit_url = reverse(
+            "fair_projects:judging_instance_edit", args=(self.ji.pk,)
+        )
+        self.client.force_login(self.judge.user)
+        self.client.get(self.detail_url)  # Populate config defaults
+
+    def add_students(self, count: int) -> None:
+        for _ in range(count):
+            self.project.student_set.add(make_student(teacher=self.teacher))
+
+    def count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_detail_query_count_does_not_grow_with_students(self):
+        self.add_students(1)
+        expected = self.count_queries(self.detail_url)
+        self.add_students(4)
+        self.assertEqual(self.count_queries(self.detail_url), expected)
+
+    def test_edit_query_count_does_not_grow_with_students(self):
+        self.add_students(1)
+        self.client.get(self.edit_url)  # Lock the instance
+        expected = self.count_queries(self.edit_url)
+        self.add_students(4)
+        self.assertEqual(self.count_queries(self.edit_url), expected)
+
+    def test_detail_lists_answers_in_question_order(self):
+        response = self.client.get(self.detail_url)
+        questions = [question for _, question, _ in response.context["question_list"]]
+        self.assertEqual(
+            questions,
+            [question.description() for question in self.rubric.ordered_question_set],
+        )
+
+    def test_edit_saves_responses(self):
+        self.ji.response.questionresponse_set.get(
+            question__question_type=Question.SCALE_TYPE
+        ).clear_response()
+        data = self.ji.response.get_form_data()
+        scale = self.rubric.question_set.get(question_type=Question.SCALE_TYPE)
+        data[scale.field_name()] = "3"
+        data["submit"] = "Submit"
+        data = {key: value for key, value in data.items() if value is not None}
+
+        response = self.client.post(self.edit_url, data)
+        self.assertRedirects(response, self.detail_url)
+        self.assertEqual(
+            self.ji.response.questionresponse_set.get(question=scale).response, "3"
+        )
+
+
+class InstanceAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rubric = make_rubric()
+        cls.admin_user = User.objects.create_superuser("admin", "a@example.com", "pw")
+        cls.url = reverse("admin:fair_projects_judginginstance_changelist")
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def add_instances(self, count: int) -> list[JudgingInstance]:
+        return [
+            make_judging_instance(make_project(), rubric=self.rubric)
+            for _ in range(count)
+        ]
+
+    def count_queries(self, **params) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_instances(self):
+        answer_rubric_response(self.add_instances(1)[0].response)
+        expected = self.count_queries()
+        answer_rubric_response(self.add_instances(5)[0].response)
+        self.assertEqual(self.count_queries(), expected)
+        self.assertEqual(self.count_queries(o="8"), expected)
+
+    def test_completion_filter(self):
+        complete, not_started = self.add_instances(2)
+        answer_rubric_response(complete.response)
+
+        for value, expected in (
+            ("complete", [complete]),
+            ("not_started", [not_started]),
+            ("incomplete", []),
+        ):
+            with self.subTest(value):
+                response = self.client.get(self.url, {"completion": value})
+                self.assertEqual(list(response.context["cl"].result_list), expected)
+
+
+class JudgingProgressTests(JudgingRubricMixin, TestCase):
+    rubric_name_modules = ("apps.fair_projects.logic",)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ann, cls.bob = (
+            make_judge(user=baker.make(User, first_name=name, last_name="Judge"))
+            for name in ("Ann", "Bob")
+        )
+        cls.projects = [
+            make_project("Physics", "Elementary"),
+            make_project("Physics", "Elementary"),
+            make_project("Biology", "High School"),
+        ]
+        complete, recent, stale = cls.make_instances(cls.ann, cls.projects)
+        answer_rubric_response(complete.response)
+        recent.response.update_responses({cls.question.pk: "3"})
+        stale.response.update_responses({cls.question.pk: "3"})
+        stale.response.questionresponse_set.update(
+            last_submitted=timezone.now() - timedelta(hours=2)
+        )
+        make_judging_instance(cls.projects[0], cls.bob, cls.rubric)
+        make_judging_instance(cls.projects[2], cls.bob, cls.rubric)
+        # Instances for other rubrics aren't counted
+        make_judging_instance(cls.projects[1], cls.bob, baker.make(Rubric))
+
+        cls.admin_user = User.objects.create_superuser("admin", "a@example.com", "pw")
+        cls.url = reverse("judging_progress")
+
+    def counts(self, row: dict) -> tuple:
+        return tuple(row[field] for field in PROGRESS_COUNTS)
+
+    def test_counts_by_judge_project_and_bucket(self):
+        summary = get_progress_summary(stale_minutes=30)
+
+        # total, unstarted, in progress, complete, stale
+        self.assertEqual(self.counts(summary.totals), (5, 2, 2, 1, 1))
+        self.assertEqual(
+            [(row["first_name"], self.counts(row)) for row in summary.judges],
+            [("Ann", (3, 0, 2, 1, 1)), ("Bob", (2, 2, 0, 0, 0))],
+        )
+        self.assertEqual(
+            {row["project_id"]: self.counts(row) for row in summary.projects},
+            {
+                self.projects[0].pk: (2, 1, 0, 1, 0),
+                self.projects[1].pk: (1, 0, 1, 0, 0),
+                self.projects[2].pk: (2, 1, 1, 0, 1),
+            },
+        )
+        self.assertEqual(
+            [
+                (row["category"], row["division"], self.counts(row))
+                for row in summary.buckets
+            ],
+            [
+                ("Biology", "High School", (2, 1, 1, 0, 1)),
+                ("Physics", "Elementary", (3, 1, 1, 1, 0)),
+            ],
+        )
+
+    def test_stale_minutes(self):
+        summary = get_progress_summary(stale_minutes=180)
+        self.assertEqual(summary.totals["stale"], 0)
+
+    def test_query_count_does_not_grow_with_instances(self):
+        with self.assertNumQueries(2):
+            get_progress_summary()
+
+        for project in self.projects:
+            for _ in range(3):
+                make_judging_instance(project, make_judge(), self.rubric)
+        with self.assertNumQueries(2):
+            summary = get_progress_summary()
+        self.assertEqual(summary.totals["total"], 14)
+
+    def test_page(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(self.url, {"minutes": "30"})
+        self.assertContains(response, "Ann Judge")
+        self.assertContains(response, "Biology")
+
+        response = self.client.get(self.url, {"minutes": "180", "format": "json"})
+        self.assertEqual(response.json()["totals"]["stale"], 0)
+        self.assertEqual(len(response.json()["projects"]), 3)
+
+        response = self.client.get(self.url, {"minutes": "10000000000"})
+        self.assertEqual(response.context["stale_minutes"], 7 * 24 * 60)
+
+    def test_page_lists_stale_and_unfinished_rows_first(self):
+        self.client.force_login(self.admin_user)
+        with patch("apps.fair_projects.views.PROGRESS_ROWS", 1):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            [row["first_name"] for row in response.context["judges"]], ["Ann"]
+        )
+        self.assertEqual(
+            [row["project_id"] for row in response.context["projects"]],
+            [self.projects[2].pk],
+        )
+
+    def test_page_is_staff_only(self):
+        self.client.force_login(baker.make(User))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_linked_from_instance_admin(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(
+            reverse("admin:fair_projects_judginginstance_changelist")
+        )
+        self.assertContains(response, self.url)
+
+
+class ExplainQueriesCommandTests(TestCase):
+    def test_compare_reports_plans_with_and_without_indexes(self):
+        project = make_project()
+        make_judging_instance(project)
+
+        output = StringIO()
+        call_command(
+            "explainqueries", "--compare", "--json", "--repeat", "1", stdout=output
+        )
+        results = json.loads(output.getvalue())
+
+        self.assertEqual(results["indexed"].keys(), results["baseline"].keys())
+        indexed_plan = results["indexed"]["subcategory_by_name"]["plan"]
+        baseline_plan = results["baseline"]["subcategory_by_name"]["plan"]
+        self.assertIn("INDEX", indexed_plan)
+        self.assertNotIn("INDEX", baseline_plan)
+
+        # The dropped indexes are restored
+        output = StringIO()
+        call_command("explainqueries", "--json", "--repeat", "1", stdout=output)
+        self.assertEqual(
+            json.loads(output.getvalue())["indexed"]["subcategory_by_name"]["plan"],
+            indexed_plan,
+        )
+
+
+class SeedFairCommandTests(TestCase):
+    def test_seeds_an_assigned_and_partly_answered_fair(self):
+        call_command("seedfair", "--projects", "40", "--seed", "1", stdout=StringIO())
+
+        self.assertEqual(Project.objects.count(), 40)
+        self.assertFalse(Project.objects.filter(student=None).exists())
+        self.assertEqual(Project.objects.values("number").distinct().count(), 40)
+        rubric = Rubric.objects.get(name=get_rubric_name())
+        instances = JudgingInstance.objects.filter(rubric=rubric)
+        self.assertTrue(instances.exists())
+        for instance in instances.select_related("project", "judge"):
+            self.assertIn(instance.project.category, instance.judge.categories.all())
+            self.assertIn(instance.project.division, instance.judge.divisions.all())
+            self.assertEqual(
+                instance.response.questionresponse_set.count(),
+                rubric.question_set.count(),
+            )
+
+        progress = list(instances.with_progress())
+        self.assertTrue(any(ji.response_complete for ji in progress))
+        self.assertTrue(any(not ji.response_started for ji in progress))
+        for project in get_projects_sorted_by_score():
+            self.assertAlmostEqual(project.avg_score or 0, project.average_score())
+
+    def test_seeds_without_returning_rows_from_bulk_inserts(self):
+        # Like MySQL, where the objects are looked up or saved one at a time to
+        # get their ids
+        with patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", False
+        ):
+            seed_fair(5, seed=1)
+
+        instances = JudgingInstance.objects.all()
+        self.assertTrue(instances.exists())
+        self.assertEqual(
+            instances.values("response").distinct().count(), instances.count()
+        )
+        self.assertEqual(
+            Student.objects.values("project").distinct().count(),
+            Project.objects.count(),
+        )
+        self.assertFalse(
+            QuestionResponse.objects.exclude(
+                rubric_response__judginginstance__isnull=False
+            ).exists()
+        )
+
+    def test_seeded_projects_can_be_searched(self):
+        seed_fair(5, seed=1, assign=False)
+
+        project = Project.objects.first()
+        self.assertEqual(ProjectSearchEntry.objects.count(), 5)
+        self.assertIn(project.pk, search_project_ids(project.title))
+
+    def test_refuses_to_seed_over_existing_projects(self):
+        make_project()
+        with self.assertRaises(CommandError):
+            call_command("seedfair", "--projects", "5", stdout=StringIO())
+
+    def test_clear_replaces_a_seeded_fair(self):
+        seed_fair(5, seed=1)
+        call_command(
+            "seedfair", "--projects", "3", "--no-assign", "--clear", stdout=StringIO()
+        )
+        self.assertEqual(Project.objects.count(), 3)
+        self.assertFalse(JudgingInstance.objects.exists())
+
+    def test_clear_keeps_projects_that_werent_seeded(self):
+        project = make_project()
+        seed_fair(5, seed=1)
+        instance = make_judging_instance(project, rubric=make_rubric())
+
+        with self.assertRaises(CommandError):
+            call_command("seedfair", "--projects", "5", "--clear", stdout=StringIO())
+        clear_fair()
+
+        self.assertEqual(list(Project.objects.all()), [project])
+        self.assertEqual(list(JudgingInstance.objects.all()), [instance])
+        self.assertFalse(User.objects.filter(username__startswith="seed-").exists())
+
+
+class BenchmarkFairCommandTests(TestCase):
+    def test_writes_results_and_leaves_the_database_unchanged(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "benchmarkfair",
+                "--sizes",
+                "10",
+                "--output",
+                output.name,
+                stdout=StringIO(),
+            )
+            results = json.load(output)
+
+        benchmarks = results["sizes"]["10"]["benchmarks"]
+        self.assertEqual(benchmarks.keys(), BENCHMARKS.keys())
+        for measurement in benchmarks.values():
+            self.assertGreater(measurement["queries"], 0)
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Judge.objects.exists())
+
+
+class BenchmarkServersCommandTests(TransactionTestCase):
+    def test_serves_every_request_under_wsgi_and_asgi(self):
+        seed_fair(5, seed=1)
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "benchmarkservers",
+                "--clients",
+                "3",
+                "--requests",
+                "2",
+                "--client-delay",
+                "0",
+                "--host",
+                "testserver",
+                "--output",
+                output.name,
+                stdout=StringIO(),
+            )
+            results = json.load(output)
+
+        self.assertEqual(results.keys(), set(DEFAULT_PAGES))
+        for page, result in results.items():
+            for server in ("wsgi", "asgi"):
+                with self.subTest(page=page, server=server):
+                    self.assertEqual(result["3"][server]["requests"], 6)
+                    self.assertEqual(result["3"][server]["errors"], 0)
+
+    def test_requires_a_judge(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmarkservers", stdout=StringIO())
+
+
 class TestQuestionFeedbackDict(TestCase):
     fixtures = [
         "divisions_categories.json",
@@ -827,6 +2483,15 @@ class FeedbackFormViewTests(TestCase):
         )
         self.assertInHTML("<h1>Test Title</h1>", page_html)
 
+    def test_teacher_feedback_matches_student_feedback(self):
+        self.client.force_login(self.teacher.user)
+        response = self.client.get(self.teacher_feedback_url)
+
+        (feedback,) = response.context["feedback_list"]
+        expected = StudentFeedbackForm.get_project_context(self.student)
+        self.assertEqual(feedback["project"], expected["project"])
+        self.assertEqual(feedback["forms"], expected["forms"])
+
     def test_teacher_feedback_form_redirects_unauthenticated_user(self):
         response = self.client.get(self.student_feedback_url)
         self.assertEqual(response.status_code, 302)
@@ -5,6 +5,8 @@ from . import views
 app_name = "fair_projects"
 urlpatterns = [
     re_path(r"^$", views.ProjectIndex.as_view(), name="index"),
+    re_path(r"^sw\.js$", views.service_worker, name="service_worker"),
+    re_path(r"^search/?$", views.ProjectSearch.as_view(), name="project_search"),
     re_path(r"^create/?$", views.ProjectCreate.as_view(), name="project_create"),
     re_path(
         r"^(?P<project_number>[0-9]+)/?$", views.ProjectDetail.as_view(), name="detail"
@@ -30,6 +32,21 @@ urlpatterns = [
         views.JudgeDetail.as_view(),
         name="judge_detail",
     ),
+    re_path(
+        r"^judge/(?P<judge_username>[-+@._A-Za-z0-9]+)/progress/?$",
+        views.JudgeProgress.as_view(),
+        name="judge_progress",
+    ),
+    re_path(
+        r"^judge/(?P<judge_username>[-+@._A-Za-z0-9]+)/offline/?$",
+        views.JudgeOfflineData.as_view(),
+        name="judge_offline_data",
+    ),
+    re_path(
+        r"^judgingresponse/save/?$",
+        views.JudgingResponsesSave.as_view(),
+        name="judging_responses_save",
+    ),
     re_path(
         r"^judgingresponse/(?P<judginginstance_key>[0-9]+)/?$",
         views.JudgingInstanceDetail.as_view(),
@@ -51,4 +68,10 @@ urlpatterns = [
         name="teacher_feedback",
     ),
     re_path(r"^results/?$", views.ResultsIndex.as_view(), name="project_results"),
+    re_path(r"^results/live/?$", views.LiveResults.as_view(), name="live_results"),
+    re_path(
+        r"^results/events/?$",
+        views.ProgressEventStream.as_view(),
+        name="progress_events",
+    ),
 ]
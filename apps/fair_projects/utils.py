@@ -1,7 +1,94 @@
 import secrets
 import string
+from typing import Callable, Iterable, Optional
+
+from django.db import connection, models, transaction
+
+# Rows inserted by each query of bulk_create
+BATCH_SIZE = 500
 
 
 def make_random_password(length: int = 8) -> str:
     alphabet = string.ascii_letters + string.digits
     return "".join(secrets.choice(alphabet) for i in range(length))
+
+
+def bulk_create_with_ids(
+    model: type[models.Model], objs: list, key: Optional[str] = None
+) -> list:
+    """bulk_create objs, making sure their primary keys are set.
+
+    Databases that can't return rows from a bulk insert, like MySQL, leave the
+    primary keys unset. If key names a field whose values are unique among
+    the objects, the new rows are looked up by it, the newest row winning.
+    Otherwise the objects are saved one at a time, which sends their save
+    signals. Reading the ids back in insertion order instead would assume
+    nothing else inserted rows in between.
+
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+
+    if key is None:
+        with transaction.atomic():
+            for obj in objs:
+                obj.save(force_insert=True)
+        return objs
+
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    values = [getattr(obj, key) for obj in objs]
+    pks = {}
+    for start in range(0, len(values), BATCH_SIZE):
+        pks.update(
+            model.objects.filter(**{f"{key}__in": values[start : start + BATCH_SIZE]})
+            .order_by("pk")
+            .values_list(key, "pk")
+        )
+    for obj in objs:
+        obj.pk = pks[getattr(obj, key)]
+    return objs
+
+
+def schedule_on_commit(name: str, func: Callable[[set], None], ids: Iterable) -> None:
+    """Call func with the ids when the transaction commits, or now outside one.
+
+    Every call with the same name in a transaction adds to one pending set, so
+    func runs once with all of the ids. Each call schedules its own callback,
+    because a savepoint that rolls back drops the callbacks scheduled in it;
+    the first one to run calls func and the rest find nothing left. Ids added
+    in a savepoint that rolled back are still passed on, so func must cope
+    with ids whose rows are unchanged or gone.
+
+    """
+    ids = {pk for pk in ids if pk}
+    if not ids:
+        return
+    attr = f"_pending_{name}"
+    if not connection.in_atomic_block:
+        # Anything still pending is left over from a transaction that rolled back
+        if hasattr(connection, attr):
+            delattr(connection, attr)
+        func(ids)
+        return
+
+    pending = getattr(connection, attr, None)
+    if pending is None:
+        pending = _PendingIds(attr, func)
+        setattr(connection, attr, pending)
+    pending.ids.update(ids)
+    transaction.on_commit(pending.flush)
+
+
+class _PendingIds:
+    __slots__ = ("attr", "func", "ids")
+
+    def __init__(self, attr: str, func: Callable[[set], None]):
+        self.attr = attr
+        self.func = func
+        self.ids = set()
+
+    def flush(self) -> None:
+        if getattr(connection, self.attr, None) is not self:
+            return
+        delattr(connection, self.attr)
+        self.func(self.ids)
@@ -1,43 +1,74 @@
+import asyncio
 import functools
+import hashlib
+import json
 import logging
+import time
 from collections import defaultdict, namedtuple
+from datetime import datetime
+from datetime import timezone as dt_timezone
 from typing import Any
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.contrib.admin import site as admin_site
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import (
     AccessMixin,
+    LoginRequiredMixin,
     PermissionRequiredMixin,
     UserPassesTestMixin,
 )
 from django.contrib.auth.models import User
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
-from django.http import Http404, HttpResponseRedirect
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Prefetch
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_protect
-from django.views.generic import DetailView, ListView, TemplateView
+from django.views.decorators.http import condition
+from django.views.generic import DetailView, ListView, TemplateView, View
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 
-from apps.awards.models import Award
 from apps.fair_projects.logic import get_rubric_name
 from apps.judges.models import Judge
 from apps.rubrics.forms import rubric_form_factory
 from apps.rubrics.models.feedback_form import FeedbackForm
-from apps.rubrics.models.rubric import Question
+from apps.rubrics.models.rubric import Question, QuestionResponse
+from fair_scoring_site.roles import aget_user_roles, get_user_roles
 
-from .forms import StudentFormset, UploadFileForm
+from .events import get_progress_totals, get_project_scores, get_stream_progress_totals
+from .forms import ProjectFilterForm, StudentFormset, UploadFileForm
 from .logic import (
+    aget_judge_progress,
+    aget_result_rows,
     assign_judges,
     email_teachers,
-    get_projects_sorted_by_score,
+    get_offline_data,
+    get_progress_summary,
     handle_project_import,
+    save_judging_responses,
 )
-from .models import JudgingInstance, Project, Student, Teacher
+from .models import (
+    JudgingInstance,
+    ProgressEvent,
+    Project,
+    SavedRequest,
+    Student,
+    Teacher,
+)
+from .search import DEFAULT_LIMIT, search_project_ids
 
 logger = logging.getLogger(__name__)
 
+# Sent by the service worker when it caches pages ahead of time
+OFFLINE_PRECACHE_HEADER = "X-Offline-Precache"
+
 
 class ProjectIndex(ListView):
     template_name = "fair_projects/index.html"
@@ -46,19 +77,77 @@ class ProjectIndex(ListView):
         "category", "subcategory", "division"
     ).order_by("number", "title")
     context_object_name = "project_list"
+    paginate_by = 50
+
+    async def get(self, request, *args, **kwargs):
+        # Validating the filters and searching run queries outside the ORM
+        self.object_list = await sync_to_async(self.get_queryset)()
+        self.project_count = await self.object_list.acount()
+        await aget_user_roles(request)
+
+        context = self.get_context_data()
+        page = context["page_obj"]
+        page.object_list = [project async for project in page.object_list]
+        context["object_list"] = context[self.context_object_name] = page.object_list
+        return self.render_to_response(context)
+
+    def get_queryset(self):
+        self.filter_form = ProjectFilterForm(self.request.GET or None)
+        return self.filter_form.filter(super(ProjectIndex, self).get_queryset())
+
+    def get_paginator(self, *args, **kwargs):
+        paginator = super(ProjectIndex, self).get_paginator(*args, **kwargs)
+        paginator.count = self.project_count
+        return paginator
 
     def get_context_data(self, **kwargs):
         context = super(ProjectIndex, self).get_context_data(**kwargs)
+        context["filter_form"] = self.filter_form
+        query = self.request.GET.copy()
+        query.pop("page", None)
+        context["filter_query"] = query.urlencode()
 
-        request_user = self.request.user
-        context["allow_create"] = False
-        if request_user.is_authenticated:
-            if request_user.has_perm("fair_projects.add_project"):
-                context["allow_create"] = True
+        context["allow_create"] = get_user_roles(self.request).has_perm(
+            "fair_projects.add_project"
+        )
 
         return context
 
 
+class ProjectSearch(UserPassesTestMixin, View):
+    """Typeahead suggestions for the project search box, as JSON."""
+
+    def user_is_staff_or_judge(self):
+        # Not the cached roles, which can lag behind a revoked role
+        user = self.request.user
+        return user.is_active and (
+            user.is_staff
+            or (
+                user.has_perm("judges.is_judge")
+                and Judge.objects.filter(pk=user.pk).exists()
+            )
+        )
+
+    test_func = user_is_staff_or_judge
+
+    def get(self, request, *args, **kwargs):
+        project_ids = search_project_ids(request.GET.get("q", ""), DEFAULT_LIMIT)
+        projects = Project.objects.only("number", "title").in_bulk(project_ids)
+        return JsonResponse(
+            {
+                "results": [
+                    {
+                        "number": projects[pk].number,
+                        "title": projects[pk].title,
+                        "url": projects[pk].get_absolute_url(),
+                    }
+                    for pk in project_ids
+                    if pk in projects
+                ]
+            }
+        )
+
+
 class ProjectModifyMixin(PermissionRequiredMixin):
     model = Project
     fields = (
@@ -85,14 +174,7 @@ class ProjectModifyMixin(PermissionRequiredMixin):
         raise NotImplementedError("Implement get_student_formset().")
 
     def get_formset_form_kwargs(self, request):
-        try:
-            Teacher.objects.get(user=request.user)
-        except ObjectDoesNotExist:
-            user_is_teacher = False
-        else:
-            user_is_teacher = True
-        finally:
-            return {"user_is_teacher": user_is_teacher}
+        return {"user_is_teacher": get_user_roles(request).teacher_id is not None}
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
@@ -113,8 +195,9 @@ class ProjectModifyMixin(PermissionRequiredMixin):
                 student.project = project
 
             if not student.teacher_id:
-                teacher = Teacher.objects.get(user=self.request.user)
-                student.teacher = teacher
+                if not Teacher.objects.filter(pk=self.request.user.pk).exists():
+                    raise Teacher.DoesNotExist("The user is not a teacher")
+                student.teacher_id = self.request.user.pk
 
             student.save()
 
@@ -193,42 +276,146 @@ class ProjectDetail(DetailView):
     def get_context_data(self, **kwargs):
         context = super(ProjectDetail, self).get_context_data(**kwargs)
 
-        context["student_list"] = Student.objects.filter(project=self.object)
-        judge_instances = JudgingInstance.objects.filter(project=self.object)
+        context["student_list"] = Student.objects.filter(
+            project=self.object
+        ).select_related("teacher__school")
+        judge_instances = JudgingInstance.objects.for_project(
+            self.object
+        ).select_related("judge__user")
         context["judge_list"] = [ji.judge for ji in judge_instances]
 
-        request_user = self.request.user
+        roles = get_user_roles(self.request)
         context["is_submitting_teacher"] = False
-        if request_user.is_authenticated:
-            if request_user.is_superuser:
-                context["is_submitting_teacher"] = True
-            elif request_user.has_perm("fair_projects.is_teacher"):
-                teacher = Teacher.objects.get(user=request_user)
-                if [
-                    student
-                    for student in context["student_list"]
-                    if student.teacher == teacher
-                ]:
-                    context["is_submitting_teacher"] = True
+        if roles.is_superuser:
+            context["is_submitting_teacher"] = True
+        elif roles.is_teacher:
+            context["is_submitting_teacher"] = Student.objects.filter(
+                project=self.object, teacher=roles.teacher_id
+            ).exists()
 
         return context
 
 
-class ResultsIndex(PermissionRequiredMixin, AccessMixin, TemplateView):
+class AsyncPermissionRequiredMixin(PermissionRequiredMixin):
+    """PermissionRequiredMixin for views with async handlers."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await sync_to_async(self.has_permission)():
+            return self.handle_no_permission()
+
+        return await super(PermissionRequiredMixin, self).dispatch(
+            request, *args, **kwargs
+        )
+
+
+class ResultsIndex(AsyncPermissionRequiredMixin, TemplateView):
     template_name = "fair_projects/results.html"
     permission_required = "fair_projects.can_view_results"
     permission_denied_message = "This user has no access to the Results page."
 
-    def get_context_data(self, **kwargs):
-        context = super(ResultsIndex, self).get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        context["project_list"] = await aget_result_rows()
+        return self.render_to_response(context)
 
-        context["project_list"] = get_projects_sorted_by_score()
-        for project in context["project_list"]:
-            project.awards = Award.get_awards_for_object(project)
 
+class LiveResults(PermissionRequiredMixin, TemplateView):
+    """The project scores and judging progress, updated as answers are saved."""
+
+    template_name = "fair_projects/live_results.html"
+    permission_required = "fair_projects.can_view_results"
+
+    def get_context_data(self, **kwargs):
+        context = super(LiveResults, self).get_context_data(**kwargs)
+        # Read first, so no event is missed. Events read again are harmless,
+        # since they have the new values rather than the changes.
+        context["last_event_id"] = (
+            ProgressEvent.objects.aggregate(last=Max("pk"))["last"] or 0
+        )
+        context["project_list"] = get_project_scores()
+        context["progress"] = get_progress_totals()
         return context
 
 
+class ProgressEventStream(AsyncPermissionRequiredMixin, View):
+    """The ProgressEvents after the client's last one, as server-sent events.
+
+    The client's last event is the Last-Event-ID header that EventSource sends
+    when it reconnects, or the last_event_id parameter on the first request.
+    Instance events are followed by the judging totals, which have no id.
+    Each response ends after its events, and the browser reconnects after the
+    retry delay. Under ASGI it waits up to wait_timeout seconds for an event
+    first, so events arrive as they're added. Under WSGI waiting would hold a
+    worker, so it responds right away and the browser polls instead.
+
+    The ids come from the database in the order rows are inserted, not the
+    order they're committed. On MySQL, events added by two saves at the same
+    moment can commit in the other order, and a client that reads between the
+    two commits skips the lower id. Events are added in their own short
+    transaction after the answers commit, which keeps that window small, and
+    the next change to the same instance or project corrects it.
+
+    """
+
+    permission_required = "fair_projects.can_view_results"
+    raise_exception = True
+    wait_timeout = 25
+    poll_interval = 1
+    retry = 1000
+    wsgi_retry = 5000
+    max_events = 500
+
+    async def get(self, request, *args, **kwargs):
+        wait = isinstance(request, ASGIRequest)
+        last_event_id = self.get_last_event_id(request)
+        if last_event_id is None:
+            # Without an id, the client only wants the events from now on
+            last = await ProgressEvent.objects.aaggregate(last=Max("pk"))
+            last_event_id = last["last"] or 0
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            events = [
+                event
+                async for event in ProgressEvent.objects.filter(
+                    pk__gt=last_event_id
+                ).order_by("pk")[: self.max_events]
+            ]
+            if events or not wait or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        body = ["retry: {0}\n\n".format(self.retry if wait else self.wsgi_retry)]
+        for event in events:
+            body.append(
+                "id: {0}\nevent: {1}\ndata: {2}\n\n".format(
+                    event.pk,
+                    event.kind,
+                    json.dumps(event.data, separators=(",", ":")),
+                )
+            )
+        if any(event.kind == ProgressEvent.INSTANCE for event in events):
+            totals = await sync_to_async(get_stream_progress_totals)(events[-1])
+            body.append(
+                "event: {0}\ndata: {1}\n\n".format(
+                    ProgressEvent.PROGRESS, json.dumps(totals, separators=(",", ":"))
+                )
+            )
+        return HttpResponse(
+            "".join(body),
+            content_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    @staticmethod
+    def get_last_event_id(request):
+        value = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+
 def delete_judge_assignments(request):
     _, deletion_dict = JudgingInstance.objects.all().delete()
     msg = "\n".join(
@@ -275,6 +462,44 @@ def notify_teachers(request):
     return HttpResponseRedirect(reverse("admin:auth_user_changelist"))
 
 
+# Judges and projects listed on the judging progress page. Its JSON has them all.
+PROGRESS_ROWS = 100
+# The longest ?minutes= the judging progress page accepts, a week
+MAX_STALE_MINUTES = 7 * 24 * 60
+
+
+def needing_attention(rows: list[dict]) -> list[dict]:
+    """The rows with the most stale, then unfinished, judging instances."""
+    return sorted(
+        rows, key=lambda row: (-row["stale"], row["complete"] - row["total"])
+    )[:PROGRESS_ROWS]
+
+
+@staff_member_required
+def judging_progress(request):
+    try:
+        stale_minutes = min(
+            max(int(request.GET.get("minutes", 30)), 1), MAX_STALE_MINUTES
+        )
+    except ValueError:
+        stale_minutes = 30
+    summary = get_progress_summary(stale_minutes)
+    if request.GET.get("format") == "json":
+        return JsonResponse(summary._asdict())
+
+    context = admin_site.each_context(request)
+    context.update(
+        {
+            "title": "Judging progress",
+            "stale_minutes": stale_minutes,
+            "summary": summary,
+            "judges": needing_attention(summary.judges),
+            "projects": needing_attention(summary.projects),
+        }
+    )
+    return render(request, "admin/judging_progress.html", context)
+
+
 class SpecificUserRequiredMixin(AccessMixin):
     allow_superuser = False
     allow_staff = False
@@ -286,29 +511,40 @@ class SpecificUserRequiredMixin(AccessMixin):
             )
         )
 
-    def dispatch(self, request, *args, **kwargs):
+    def user_is_allowed(self, *args, **kwargs) -> bool:
         current_user = self.request.user
         required_user = self.get_required_user(*args, **kwargs)
 
         if not current_user.is_authenticated:
-            return self.handle_no_permission()
+            return False
 
         if self.allow_superuser and current_user.is_superuser:
-            return super(SpecificUserRequiredMixin, self).dispatch(
-                request, *args, **kwargs
-            )
+            return True
 
         if self.allow_staff and current_user.is_staff:
-            return super(SpecificUserRequiredMixin, self).dispatch(
-                request, *args, **kwargs
-            )
+            return True
+
+        return current_user == required_user
 
-        if current_user != required_user:
+    def dispatch(self, request, *args, **kwargs):
+        if not self.user_is_allowed(*args, **kwargs):
             return self.handle_no_permission()
 
         return super(SpecificUserRequiredMixin, self).dispatch(request, *args, **kwargs)
 
 
+class AsyncSpecificUserRequiredMixin(SpecificUserRequiredMixin):
+    """SpecificUserRequiredMixin for views with async handlers."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await sync_to_async(self.user_is_allowed)(*args, **kwargs):
+            return self.handle_no_permission()
+
+        return await super(SpecificUserRequiredMixin, self).dispatch(
+            request, *args, **kwargs
+        )
+
+
 class JudgeIndex(UserPassesTestMixin, ListView):
     template_name = "fair_projects/judge_index.html"
     model = Judge
@@ -323,7 +559,7 @@ class JudgeIndex(UserPassesTestMixin, ListView):
     test_func = user_is_staff
 
 
-class JudgeDetail(SpecificUserRequiredMixin, ListView):
+class JudgeDetail(AsyncSpecificUserRequiredMixin, ListView):
     allow_superuser = True
     allow_staff = True
     template_name = "fair_projects/judge_detail.html"
@@ -332,16 +568,72 @@ class JudgeDetail(SpecificUserRequiredMixin, ListView):
     def get_required_user(self, *args, **kwargs):
         return get_object_or_404(User, username=kwargs["judge_username"])
 
-    def get_queryset(self):
-        self.judge = get_object_or_404(
-            Judge, user__username=self.kwargs["judge_username"]
+    async def get(self, request, *args, **kwargs):
+        # Everything below runs in the event loop, so it only uses the loaded
+        # instances, and the user and session loaded by dispatch()
+        await self.load_judging_instances()
+
+        # A 304 would leave any pending messages undisplayed until the next page
+        if messages.get_messages(request):
+            return super(JudgeDetail, self).get(request, *args, **kwargs)
+
+        conditional_get = condition(
+            etag_func=self.get_etag, last_modified_func=self.get_last_modified
         )
-        return (
-            JudgingInstance.objects.filter(
-                judge=self.judge, response__rubric__name=get_rubric_name()
+        return conditional_get(super(JudgeDetail, self).get)(request, *args, **kwargs)
+
+    async def load_judging_instances(self) -> None:
+        rubric_name = await sync_to_async(get_rubric_name)()
+        try:
+            self.judge = await Judge.objects.select_related("user").aget(
+                user__username=self.kwargs["judge_username"]
             )
+        except Judge.DoesNotExist:
+            raise Http404("No judge matches the given query.")
+
+        self._judging_instances = [
+            judging_instance
+            async for judging_instance in JudgingInstance.objects.with_progress()
+            .filter(judge=self.judge, rubric__name=rubric_name)
             .order_by("project__number")
-            .select_related("project", "project__category", "project__division")
+            .select_related(
+                "project",
+                "project__category",
+                "project__subcategory",
+                "project__division",
+            )
+        ]
+
+    def get_queryset(self):
+        return self._judging_instances
+
+    def get_etag(self, request, *args, **kwargs) -> str:
+        """Hash everything the dashboard displays for the current user."""
+        judging_instances = self.get_queryset()
+        state = [request.user.pk, self.judge.user.get_full_name()] + [
+            (
+                ji.pk,
+                ji.response_started,
+                ji.response_complete,
+                ji.project.number,
+                ji.project.title,
+                ji.project.requires_attention,
+                ji.project.category.short_description,
+                ji.project.subcategory.short_description,
+                ji.project.division.short_description,
+            )
+            for ji in judging_instances
+        ]
+        return hashlib.md5(repr(state).encode()).hexdigest()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return max(
+            (
+                ji.response_last_submitted
+                for ji in self.get_queryset()
+                if ji.response_last_submitted
+            ),
+            default=None,
         )
 
     def get_context_data(self, **kwargs):
@@ -351,6 +643,109 @@ class JudgeDetail(SpecificUserRequiredMixin, ListView):
         return context
 
 
+class JudgeProgress(AsyncSpecificUserRequiredMixin, View):
+    """The completion and score of a judge's assigned projects, as JSON.
+
+    Passing the last_submitted of an earlier response as since makes this a
+    long poll: under ASGI it waits up to wait_timeout seconds for an answer to
+    be saved before responding. Under WSGI waiting would hold a worker, so it
+    responds right away.
+
+    """
+
+    allow_superuser = True
+    allow_staff = True
+    wait_timeout = 25
+    poll_interval = 2
+
+    def get_required_user(self, *args, **kwargs):
+        self.judge = get_object_or_404(
+            Judge.objects.select_related("user"),
+            user__username=kwargs["judge_username"],
+        )
+        return self.judge.user
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            since = parse_client_time(request.GET["since"])
+        except (KeyError, ValueError):
+            since = None
+        wait = since is not None and isinstance(request, ASGIRequest)
+
+        rubric_name = await sync_to_async(get_rubric_name)()
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            progress = await aget_judge_progress(self.judge, rubric_name)
+            last_submitted = max(
+                (p["last_submitted"] for p in progress.values() if p["last_submitted"]),
+                default=None,
+            )
+            changed = last_submitted is not None and (
+                since is None or last_submitted > since
+            )
+            if changed or not wait or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        return JsonResponse(
+            {
+                "instances": progress,
+                # In full, since the encoder drops the microseconds
+                "last_submitted": last_submitted and last_submitted.isoformat(),
+            }
+        )
+
+
+class JudgeOfflineData(SpecificUserRequiredMixin, View):
+    """The data and pages a judge's device caches for scoring offline, as JSON."""
+
+    allow_superuser = True
+    allow_staff = True
+
+    def get_required_user(self, *args, **kwargs):
+        self.judge = get_object_or_404(
+            Judge.objects.select_related("user"),
+            user__username=kwargs["judge_username"],
+        )
+        return self.judge.user
+
+    def get(self, request, *args, **kwargs):
+        data = get_offline_data(self.judge, get_rubric_name())
+        pages = [
+            reverse(
+                "fair_projects:judge_detail", args=(self.judge.user.get_username(),)
+            )
+        ]
+        for instance in data["instances"]:
+            pages.append(
+                reverse("fair_projects:judging_instance_detail", args=(instance["id"],))
+            )
+            pages.append(
+                reverse("fair_projects:judging_instance_edit", args=(instance["id"],))
+            )
+        return JsonResponse(
+            {
+                "judge": self.judge.user.get_username(),
+                "save_url": reverse("fair_projects:judging_responses_save"),
+                "pages": pages,
+                **data,
+            }
+        )
+
+
+def service_worker(request):
+    """Serve the service worker from /projects/, so it can control every page there."""
+    response = render(
+        request,
+        "fair_projects/sw.js",
+        {"precache_header": OFFLINE_PRECACHE_HEADER},
+        content_type="application/javascript",
+    )
+    # The browser checks for a new service worker on every navigation anyway
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
 class JudgingInstanceMixin(SpecificUserRequiredMixin):
     allow_superuser = True
     allow_staff = True
@@ -358,16 +753,35 @@ class JudgingInstanceMixin(SpecificUserRequiredMixin):
     pk_url_kwarg = "judginginstance_key"
     model = JudgingInstance
     queryset = JudgingInstance.objects.select_related(
-        "judge", "project", "response", "judge__user"
+        "judge__user",
+        "project__category",
+        "project__subcategory",
+        "project__division",
+        "response__rubric",
+    ).prefetch_related(
+        Prefetch(
+            "project__student_set",
+            queryset=Student.objects.select_related("teacher__school"),
+        ),
+        Prefetch(
+            "response__questionresponse_set",
+            queryset=QuestionResponse.objects.select_related(
+                "question"
+            ).prefetch_related("question__choice_set"),
+        ),
     )
     context_object_name = "judging_instance"
 
     def get_required_user(self, *args, **kwargs):
-        self.judging_instance = self.queryset.get(pk=kwargs[self.pk_url_kwarg])
+        # Everything the views need is loaded here, once per request, and
+        # reused by get_object and the templates.
+        self.judging_instance = self.get_queryset().get(pk=kwargs[self.pk_url_kwarg])
 
         self.judge = self.judging_instance.judge
-        user_name = self.judge.user.username
-        return get_object_or_404(User, username=user_name)
+        return self.judge.user
+
+    def get_object(self, queryset=None):
+        return self.judging_instance
 
     def get_context_data(self, **kwargs):
         context = super(JudgingInstanceMixin, self).get_context_data(**kwargs)
@@ -458,8 +872,11 @@ class JudgingInstanceUpdate(JudgingInstanceMixin, UpdateView):
                 required = None
         except AttributeError:
             pass
+        rubric_response = self.object.response
         return rubric_form_factory(
-            self.object.response.rubric, override_required=required
+            rubric_response.rubric,
+            override_required=required,
+            questions=[resp.question for resp in rubric_response.question_responses()],
         )
 
     def get_form_kwargs(self):
@@ -476,7 +893,9 @@ class JudgingInstanceUpdate(JudgingInstanceMixin, UpdateView):
 
     def get(self, request, *args, **kwargs):
         response = super().get(request, *args, **kwargs)
-        self.judging_instance.set_locked()
+        # Devices caching the page for offline use haven't started judging yet
+        if OFFLINE_PRECACHE_HEADER not in request.headers:
+            self.judging_instance.set_locked()
         return response
 
     def post(self, request, *args, **kwargs):
@@ -487,6 +906,115 @@ class JudgingInstanceUpdate(JudgingInstanceMixin, UpdateView):
         return super(JudgingInstanceUpdate, self).post(request, *args, **kwargs)
 
 
+def parse_client_time(value: str) -> datetime:
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError("Invalid time: %s" % value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+class JudgingResponsesSave(LoginRequiredMixin, View):
+    """Save partial answers to one or more judging instances, as JSON.
+
+    The body maps judging instance ids to the new answers, keyed by question
+    id, e.g. {"responses": {"12": {"34": "5", "35": null}}}. The response has
+    the completion and score of each instance answered.
+
+    Devices that queue answers while offline send each answer as
+    {"value": ..., "submitted": time answered}, and the time they sent the
+    request as "sent", so the times can be corrected for the device's clock.
+    Answers older than the saved ones aren't saved. They're returned as
+    conflicts with the saved answer instead.
+
+    Requests with an Idempotency-Key header are saved once. Retrying with the
+    same key returns the first response again.
+
+    """
+
+    raise_exception = True
+    http_method_names = ["post"]
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key", "")[
+            : SavedRequest._meta.get_field("key").max_length
+        ]
+        try:
+            data = json.loads(request.body)
+            answers, submitted = self.parse_answers(data)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return JsonResponse(
+                {
+                    "error": 'Expected {"responses": {instance id: {question id: answer}}}'
+                },
+                status=400,
+            )
+
+        # Retries may be sent at a different time, but must have the same answers
+        request_hash = hashlib.sha256(
+            json.dumps(data["responses"], sort_keys=True).encode()
+        ).hexdigest()
+        if key:
+            saved = SavedRequest.objects.filter(user=request.user, key=key).first()
+            if saved:
+                return self.replay(saved, request_hash)
+
+        try:
+            with transaction.atomic():
+                result = save_judging_responses(request.user, answers, submitted)
+                body = {"instances": result.progress, "conflicts": result.conflicts}
+                if key:
+                    SavedRequest.objects.create(
+                        user=request.user,
+                        key=key,
+                        request_hash=request_hash,
+                        status_code=200,
+                        response=body,
+                    )
+        except ValidationError as error:
+            return JsonResponse({"errors": error.message_dict}, status=400)
+        except IntegrityError:
+            # A retry of the same request saved it first
+            saved = SavedRequest.objects.filter(user=request.user, key=key).first()
+            if not saved:
+                raise
+            return self.replay(saved, request_hash)
+        return JsonResponse(body)
+
+    @staticmethod
+    def parse_answers(data: dict) -> tuple[dict, dict]:
+        """The answers and submitted times for save_judging_responses."""
+        now = timezone.now()
+        offset = now - parse_client_time(data["sent"]) if "sent" in data else None
+        answers = {}
+        submitted = {}
+        for instance_id, instance_answers in data["responses"].items():
+            instance_id = int(instance_id)
+            answers[instance_id] = {}
+            for question_id, answer in instance_answers.items():
+                question_id = int(question_id)
+                if isinstance(answer, dict):
+                    answered = parse_client_time(answer["submitted"])
+                    if offset is not None:
+                        answered += offset
+                    submitted[instance_id, question_id] = min(answered, now)
+                    answer = answer["value"]
+                answers[instance_id][question_id] = answer
+        return answers, submitted
+
+    @staticmethod
+    def replay(saved: SavedRequest, request_hash: str) -> JsonResponse:
+        if saved.request_hash != request_hash:
+            return JsonResponse(
+                {"error": "The Idempotency-Key was already used for another request"},
+                status=422,
+            )
+        response = JsonResponse(saved.response, status=saved.status_code)
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+
 class TeacherDetail(SpecificUserRequiredMixin, ListView):
     allow_superuser = True
     allow_staff = True
@@ -509,12 +1037,9 @@ class TeacherDetail(SpecificUserRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super(TeacherDetail, self).get_context_data(**kwargs)
         context["teacher"] = self.teacher
-
-        request_user = self.request.user
-        context["allow_create"] = False
-        if request_user.is_authenticated:
-            if request_user.has_perm("fair_projects.add_project"):
-                context["allow_create"] = True
+        context["allow_create"] = get_user_roles(self.request).has_perm(
+            "fair_projects.add_project"
+        )
         return context
 
 
@@ -579,7 +1104,7 @@ class TeacherStudentsFeedbackForm(SpecificUserRequiredMixin, ListView):
         )
         return (
             Student.objects.filter(teacher=self.teacher, project__isnull=False)
-            .select_related("project")
+            .select_related("project", "teacher__user")
             .order_by("last_name", "first_name")
         )
 
@@ -587,9 +1112,36 @@ class TeacherStudentsFeedbackForm(SpecificUserRequiredMixin, ListView):
         context = super(TeacherStudentsFeedbackForm, self).get_context_data(**kwargs)
         context["teacher"] = self.teacher
 
+        # Students on the same project share its feedback, which is rendered
+        # once with the feedback forms loaded for the whole page
+        students = context["student_list"]
+        project_rubrics = defaultdict(set)
+        for project_id, rubric_id in JudgingInstance.objects.filter(
+            project__in={student.project_id for student in students}
+        ).values_list("project_id", "response__rubric_id"):
+            project_rubrics[project_id].add(rubric_id)
+        feedback_forms = list(FeedbackForm.objects.all())
+
+        project_forms = {}
+        for project_id, rubric_ids in project_rubrics.items():
+            rubric_responses = JudgingInstance.objects.to_rubric_responses(
+                JudgingInstance.objects.for_project(project_id)
+            )
+            project_forms[project_id] = [
+                FeedbackForm.FeedbackFormContext(
+                    feedback_form, feedback_form.render_html(rubric_responses)
+                )
+                for feedback_form in feedback_forms
+                if feedback_form.rubric_id in rubric_ids
+            ]
+
         context["feedback_list"] = [
-            StudentFeedbackForm.get_project_context(student)
-            for student in context["student_list"]
+            {
+                "student": student,
+                "project": student.project,
+                "forms": project_forms.get(student.project_id, []),
+            }
+            for student in students
         ]
 
         return context
@@ -0,0 +1,184 @@
+"""ORM expressions for scoring question responses in the database."""
+from django.db import NotSupportedError, models
+from django.db.models import (
+    Case,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from apps.rubrics.models.rubric import Question, QuestionResponse
+
+SINGLE_CHOICE_TYPES = (Question.SCALE_TYPE, Question.SINGLE_SELECT_TYPE)
+
+
+class JSONArraySum(models.Func):
+    """Sum the numeric elements of a JSON array column.
+
+    Elements that cannot be read as a number are skipped, the same as
+    MultiSelectQuestionType.unweighted_score. An empty or NULL array sums to
+    0. Only SQLite and MySQL 8 are supported.
+
+    Note:
+        SQLite reads a leading number from a string, so an element like "1a"
+        counts as 1. Weighted questions only allow numeric choice keys, so
+        this doesn't affect scores.
+
+    """
+
+    arity = 1
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f"{self.__class__.__name__} is not supported on {connection.vendor}"
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        template = (
+            "(SELECT COALESCE(SUM(CAST(json_each.value AS REAL)), 0.0) "
+            "FROM json_each(%(expressions)s))"
+        )
+        return models.Func.as_sql(
+            self, compiler, connection, template=template, **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        template = (
+            "(SELECT COALESCE(SUM(jt.value), 0.0) FROM JSON_TABLE("
+            "%(expressions)s, '$[*]' COLUMNS (value DOUBLE PATH '$' NULL ON ERROR)"
+            ") AS jt)"
+        )
+        return models.Func.as_sql(
+            self, compiler, connection, template=template, **extra_context
+        )
+
+
+def multi_select_unweighted_score(prefix: str = "") -> models.Expression:
+    """Unweighted score of a multi-select QuestionResponse.
+
+    Args:
+        prefix (str): the lookup path from the queried model to the
+            QuestionResponse, including the trailing "__". Empty when
+            querying QuestionResponse directly.
+
+    """
+    return JSONArraySum(F(f"{prefix}choice_responses"))
+
+
+def multi_select_score(prefix: str = "") -> models.Expression:
+    """Weighted score of a multi-select QuestionResponse."""
+    return ExpressionWrapper(
+        multi_select_unweighted_score(prefix)
+        * Cast(F(f"{prefix}question__weight"), FloatField()),
+        output_field=FloatField(),
+    )
+
+
+def question_response_unweighted_score(prefix: str = "") -> models.Expression:
+    """Unweighted score of a QuestionResponse, matching unweighted_score.
+
+    Single choice answers are cast to a number and multi-select answers are
+    summed. Unanswered questions, long text questions and unknown question
+    types score 0, the same as RubricResponse.score skipping them.
+
+    Args:
+        prefix (str): the lookup path from the queried model to the
+            QuestionResponse, including the trailing "__". Empty when
+            querying QuestionResponse directly.
+
+    """
+    question_type = f"{prefix}question__question_type"
+    return Coalesce(
+        Case(
+            When(
+                Q(**{f"{question_type}__in": SINGLE_CHOICE_TYPES}),
+                then=Cast(F(f"{prefix}choice_response"), FloatField()),
+            ),
+            When(
+                Q(**{question_type: Question.MULTI_SELECT_TYPE}),
+                then=multi_select_unweighted_score(prefix),
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def question_response_score(prefix: str = "") -> models.Expression:
+    """Weighted score of a QuestionResponse, matching QuestionResponse.score."""
+    return ExpressionWrapper(
+        question_response_unweighted_score(prefix)
+        * Coalesce(
+            Cast(F(f"{prefix}question__weight"), FloatField()),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+        output_field=FloatField(),
+    )
+
+
+def rubric_response_score(outer_ref: str = "pk") -> models.Expression:
+    """Total score of a RubricResponse, matching RubricResponse.score.
+
+    Args:
+        outer_ref (str): the field on the outer query holding the id of the
+            RubricResponse, e.g. "pk" for RubricResponse or "response" for
+            JudgingInstance.
+
+    """
+    totals = (
+        QuestionResponse.objects.filter(rubric_response=OuterRef(outer_ref))
+        .order_by()
+        .values("rubric_response")
+        .annotate(total=Sum(question_response_score()))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(totals, output_field=FloatField()),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def rubric_response_has_response(outer_ref: str = "pk") -> models.Expression:
+    """True if a RubricResponse has any answer, matching has_response."""
+    return Exists(
+        QuestionResponse.objects.filter(rubric_response=OuterRef(outer_ref)).exclude(
+            QuestionResponse.EMPTY_Q
+        )
+    )
+
+
+def rubric_response_complete(outer_ref: str = "pk") -> models.Expression:
+    """True if all required questions are answered, matching complete."""
+    return ~Exists(
+        QuestionResponse.objects.filter(
+            QuestionResponse.UNANSWERED_Q,
+            rubric_response=OuterRef(outer_ref),
+            question__required=True,
+        )
+    )
+
+
+def rubric_response_last_submitted(outer_ref: str = "pk") -> models.Expression:
+    """Latest submission time of a RubricResponse, matching last_submitted."""
+    latest = (
+        QuestionResponse.objects.filter(rubric_response=OuterRef(outer_ref))
+        .order_by()
+        .values("rubric_response")
+        .annotate(latest=Max("last_submitted"))
+        .values("latest")
+    )
+    return Subquery(latest, output_field=models.DateTimeField())
@@ -106,12 +106,22 @@ def rubric_form_factory(
     override_required=None,
     field_dict=RubricForm.DEFAULT_FIELD_DICT,
     template_dict=RubricForm.DEFAULT_TEMPLATE_DICT,
+    questions=None,
 ):
+    """Build a form class for the rubric.
+
+    questions may be given to reuse already loaded questions, e.g. with their
+    choice_set prefetched. Otherwise they are queried from the rubric.
+
+    """
+    if questions is None:
+        questions = rubric.ordered_question_set.prefetch_related("choice_set")
+
     form_name = "RubricForm%s" % rubric.pk
     form_bases = (RubricForm,)
     field_order = []
     form_dict = {"title": rubric.name, "rubric": rubric, "field_order": field_order}
-    for question in rubric.ordered_question_set.all():
+    for question in questions:
         name = "question_%s" % question.pk
         field_order.append(name)
         field = field_dict.get(question.question_type, default_field)(
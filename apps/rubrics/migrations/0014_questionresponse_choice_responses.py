@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rubrics", "0013_alter_feedbackmodule_module_type_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="questionresponse",
+            name="choice_responses",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+import json
+
+from django.db import migrations
+
+MULTI_SELECT_TYPE = "MULTI SELECT"
+
+
+def text_to_choice_responses(apps, schema_editor):
+    QuestionResponse = apps.get_model("rubrics", "QuestionResponse")
+    queryset = QuestionResponse.objects.filter(
+        question__question_type=MULTI_SELECT_TYPE, text_response__isnull=False
+    )
+    updated = []
+    for response in queryset.iterator():
+        if response.text_response:
+            response.choice_responses = json.loads(response.text_response)
+        else:
+            response.choice_responses = []
+        response.text_response = None
+        updated.append(response)
+
+    QuestionResponse.objects.bulk_update(
+        updated, ["choice_responses", "text_response"], batch_size=500
+    )
+
+
+def choice_responses_to_text(apps, schema_editor):
+    QuestionResponse = apps.get_model("rubrics", "QuestionResponse")
+    queryset = QuestionResponse.objects.filter(
+        question__question_type=MULTI_SELECT_TYPE, choice_responses__isnull=False
+    )
+    updated = []
+    for response in queryset.iterator():
+        if response.choice_responses:
+            response.text_response = json.dumps(response.choice_responses)
+        else:
+            response.text_response = ""
+        response.choice_responses = None
+        updated.append(response)
+
+    QuestionResponse.objects.bulk_update(
+        updated, ["choice_responses", "text_response"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rubrics", "0014_questionresponse_choice_responses"),
+    ]
+
+    operations = [
+        migrations.RunPython(text_to_choice_responses, choice_responses_to_text),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.1.13 on 2026-10-19 07:11
+
+from django.db import migrations, models
+
+
+def delete_duplicate_responses(apps, schema_editor):
+    """Keep one response to each question of a rubric response.
+
+    The one answered last is kept, or the first one if none were answered.
+
+    """
+    QuestionResponse = apps.get_model("rubrics", "QuestionResponse")
+    duplicated = (
+        QuestionResponse.objects.values("rubric_response", "question")
+        .annotate(count=models.Count("pk"))
+        .filter(count__gt=1)
+    )
+    for pair in duplicated:
+        responses = QuestionResponse.objects.filter(
+            rubric_response=pair["rubric_response"], question=pair["question"]
+        ).order_by(models.F("last_submitted").desc(nulls_last=True), "pk")
+        keep = responses.values_list("pk", flat=True)[0]
+        responses.exclude(pk=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rubrics", "0015_move_multi_select_responses"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="questionresponse",
+            constraint=models.UniqueConstraint(
+                fields=("rubric_response", "question"), name="unique_question_response"
+            ),
+        ),
+    ]
@@ -10,7 +10,12 @@ from django.utils.safestring import SafeString, mark_safe
 
 from apps.rubrics.constants import FeedbackFormModuleType
 from apps.rubrics.models.base import ValidatedModel
-from apps.rubrics.models.rubric import Question, QuestionResponse, RubricResponse
+from apps.rubrics.models.rubric import (
+    Question,
+    QuestionResponse,
+    QuestionType,
+    RubricResponse,
+)
 
 
 class MarkdownField(models.TextField):
@@ -77,7 +82,14 @@ class FeedbackForm(models.Model):
                 super()
                 .get_queryset()
                 .select_related("rubric")
-                .prefetch_related("modules")
+                .prefetch_related(
+                    "modules",
+                    # Loads the typed module returned by get_typed_module
+                    *(
+                        f"modules__{module_type.child_attribute}"
+                        for module_type in FeedbackFormModuleType
+                    ),
+                )
             )
 
         def for_rubric_responses(
@@ -206,12 +218,11 @@ class MarkdownFeedbackModule(FeedbackModule):
     def _get_average_score(
         self, rubric_responses: models.QuerySet[RubricResponse]
     ) -> float | None:
-        responses = [
-            response.score() for response in rubric_responses if response.has_response
-        ]
-        if not responses:
-            return None
-        return sum(responses) / len(responses)
+        return (
+            rubric_responses.with_scores()
+            .filter(has_answers=True)
+            .aggregate(average_score=models.Avg("total_score"))["average_score"]
+        )
 
 
 class ScoreTableFeedbackModule(FeedbackModule):
@@ -269,17 +280,15 @@ class ScoreTableFeedbackModule(FeedbackModule):
     ) -> Generator[QuestionRow, None, None]:
         question_qs = (
             QuestionResponse.objects.filter(
-                rubric_response__in=rubric_responses, question__in=self.questions.all()
+                rubric_response__in=rubric_responses.with_answers(),
+                question__in=self.questions.all(),
             )
-            .select_related("question", "rubric_response")
+            .select_related("question")
             .order_by("question__order", "question")
         )
-        question_responses = filter(
-            lambda q: q.rubric_response.has_response, question_qs
-        )
         question_groups = (
             list(responses)
-            for _, responses in groupby(question_responses, lambda q: q.question_id)
+            for _, responses in groupby(question_qs, lambda q: q.question_id)
         )
         for group in question_groups:
             yield self.build_row(group)
@@ -289,11 +298,11 @@ class ScoreTableFeedbackModule(FeedbackModule):
         short_description = question.short_description
         long_description = question.long_description
 
+        question_type = QuestionType.get_instance(question)
         if self.use_weighted_scores:
-            get_score = lambda resp: resp.score()
+            scores = question_type.scores(question, question_responses)
         else:
-            get_score = lambda resp: resp.unweighted_score()
-        scores = map(get_score, question_responses)
+            scores = question_type.unweighted_scores(question, question_responses)
 
         if self.remove_empty_scores:
             scores = filter(None, scores)
@@ -305,7 +314,7 @@ class ScoreTableFeedbackModule(FeedbackModule):
     def _average(self, scores: list[float]) -> float | None:
         try:
             return sum(scores) / len(scores)
-        except TypeError:
+        except (TypeError, ZeroDivisionError):
             return None
 
 
@@ -355,12 +364,10 @@ class ChoiceResponseListFeedbackModule(FeedbackModule):
         if not self.question:
             return []
 
-        question_qs = QuestionResponse.objects.filter(
-            rubric_response__in=rubric_responses, question=self.question_id
-        ).select_related("question", "rubric_response")
-        question_responses = filter(
-            lambda q: q.rubric_response.has_response, question_qs
-        )
+        question_responses = QuestionResponse.objects.filter(
+            rubric_response__in=rubric_responses.with_answers(),
+            question=self.question_id,
+        ).select_related("question")
 
         responses = list(self._expand_responses(question_responses))
 
@@ -375,15 +382,20 @@ class ChoiceResponseListFeedbackModule(FeedbackModule):
     def _expand_responses(
         self, question_responses: Iterable[QuestionResponse]
     ) -> Generator[tuple[str, str], None, None]:
-        for resp in question_responses:
-            if not resp:
-                continue
-            elif isinstance(resp.response, list) and isinstance(
-                resp.response_external(), list
-            ):
-                yield from zip(resp.response, resp.response_external())
+        question_responses = [resp for resp in question_responses if resp]
+        if not question_responses:
+            return
+
+        question = question_responses[0].question
+        external_responses = QuestionType.get_instance(question).responses_external(
+            question, question_responses
+        )
+        for resp, external in zip(question_responses, external_responses):
+            response = resp.response
+            if isinstance(response, list) and isinstance(external, list):
+                yield from zip(response, external)
             else:
-                yield (resp.response, resp.response_external())
+                yield (response, external)
 
 
 class FreeTextListFeedbackModule(FeedbackModule):
@@ -417,13 +429,21 @@ class FreeTextListFeedbackModule(FeedbackModule):
         if not self.question:
             return []
 
-        question_qs = QuestionResponse.objects.filter(
-            rubric_response__in=rubric_responses, question=self.question_id
-        ).select_related("question", "rubric_response")
-        question_responses = filter(
-            lambda q: q.rubric_response.has_response, question_qs
+        question_responses = list(
+            QuestionResponse.objects.filter(
+                rubric_response__in=rubric_responses.with_answers(),
+                question=self.question_id,
+            ).select_related("question")
         )
+        if not question_responses:
+            return []
 
+        question = question_responses[0].question
         return list(
-            filter(None, (resp.response_external() for resp in question_responses))
+            filter(
+                None,
+                QuestionType.get_instance(question).responses_external(
+                    question, question_responses
+                ),
+            )
         )
@@ -1,12 +1,17 @@
-import json
+from typing import Iterable
 
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
+from django.db import models
 from django.db.models import Max, Q
+from django.dispatch import Signal
 from django.utils import timezone
 
 from .base import ValidatedModel
 
+# Sent with the QuestionResponses whose answers were just saved. Saving them in
+# bulk doesn't send post_save.
+responses_updated = Signal()
+
 
 def value_is_numeric(value) -> bool:
     try:
@@ -287,11 +292,42 @@ class Choice(ValidatedModel):
 class RubricResponse(models.Model):
     rubric = models.ForeignKey("Rubric", on_delete=models.CASCADE)
 
+    class RubricResponseQuerySet(models.QuerySet):
+        def with_scores(self) -> "models.QuerySet[RubricResponse]":
+            """Annotate total_score and has_answers, computed in the database.
+
+            total_score matches RubricResponse.score and has_answers matches
+            RubricResponse.has_response.
+
+            """
+            from apps.rubrics.expressions import (
+                rubric_response_has_response,
+                rubric_response_score,
+            )
+
+            return self.annotate(
+                total_score=rubric_response_score(),
+                has_answers=rubric_response_has_response(),
+            )
+
+        def with_answers(self) -> "models.QuerySet[RubricResponse]":
+            """Only the responses with any answer, matching has_response."""
+            from apps.rubrics.expressions import rubric_response_has_response
+
+            return self.filter(rubric_response_has_response())
+
+    objects = RubricResponseQuerySet.as_manager()
+
     def save(self, **kwargs):
         super(RubricResponse, self).save(**kwargs)
-        if not self.questionresponse_set.exists():
-            for ques in self.rubric.question_set.all():
-                QuestionResponse.objects.create(rubric_response=self, question=ques)
+        # Responses that already exist are skipped by the unique constraint
+        QuestionResponse.objects.bulk_create(
+            [
+                QuestionResponse(rubric_response=self, question=question)
+                for question in self.rubric.question_set.all()
+            ],
+            ignore_conflicts=True,
+        )
 
     @property
     def ordered_questionresponse_set(self):
@@ -299,26 +335,32 @@ class RubricResponse(models.Model):
 
     @property
     def has_response(self):
-        text_response_empty = Q(text_response__isnull=True) | Q(text_response="")
-        return self.questionresponse_set.exclude(
-            text_response_empty, choice_response__isnull=True
-        ).exists()
+        return self.questionresponse_set.exclude(QuestionResponse.EMPTY_Q).exists()
 
     @property
     def complete(self) -> bool:
         """bool: True if all required questions are answered. False otherwise."""
         return not self.questionresponse_set.filter(
-            question__required=True,
-            choice_response__isnull=True,
-            text_response__isnull=True,
+            QuestionResponse.UNANSWERED_Q, question__required=True
         ).exists()
 
     @property
     def question_response_dict(self):
-        return {
-            resp.question.pk: resp
-            for resp in self.questionresponse_set.select_related("question").all()
-        }
+        return {resp.question.pk: resp for resp in self.question_responses()}
+
+    def question_responses(self) -> list["QuestionResponse"]:
+        """Return the question responses ordered by question, with questions loaded.
+
+        Uses questionresponse_set from prefetch_related when it has been
+        prefetched, so views can load a whole rubric response in one go.
+
+        """
+        if "questionresponse_set" in getattr(self, "_prefetched_objects_cache", {}):
+            return sorted(
+                self.questionresponse_set.all(),
+                key=lambda resp: (resp.question.order or 0, resp.question.pk),
+            )
+        return list(self.ordered_questionresponse_set.select_related("question"))
 
     @property
     def last_submitted(self):
@@ -335,7 +377,7 @@ class RubricResponse(models.Model):
         return score
 
     def question_answer_iter(self):
-        for resp in self.ordered_questionresponse_set.select_related("question").all():
+        for resp in self.question_responses():
             yield resp.question.question_type, resp.question.description(), resp.response_external()
 
     def get_form_data(self):
@@ -344,41 +386,111 @@ class RubricResponse(models.Model):
             for response in self.question_response_dict.values()
         }
 
-    @transaction.atomic
     def update_responses(self, updated_data):
+        """Update the responses to the questions in updated_data, in one query.
+
+        Args:
+            updated_data: the new value of each question's response, keyed by
+                question id.
+
+        """
         qr_dict = self.question_response_dict
-        for key, value in updated_data.items():
-            resp = qr_dict[key]
-            resp.update_response(value)
+        QuestionResponse.objects.update_responses(
+            (qr_dict[key], value, None) for key, value in updated_data.items()
+        )
 
 
 class QuestionResponse(models.Model):
+    # Matches responses with no value in any of the response columns
+    UNANSWERED_Q = Q(
+        choice_response__isnull=True,
+        choice_responses__isnull=True,
+        text_response__isnull=True,
+    )
+    # Matches responses with no value, or only an empty value, in all of the
+    # response columns
+    EMPTY_Q = (
+        (Q(text_response__isnull=True) | Q(text_response=""))
+        & Q(choice_response__isnull=True)
+        & (Q(choice_responses__isnull=True) | Q(choice_responses=[]))
+    )
+
     rubric_response = models.ForeignKey("RubricResponse", on_delete=models.CASCADE)
     question = models.ForeignKey("Question", on_delete=models.CASCADE)
     choice_response = models.CharField(max_length=20, null=True, blank=True)
+    choice_responses = models.JSONField(null=True, blank=True)
     text_response = models.TextField(null=True, blank=True)
     last_submitted = models.DateTimeField(null=True, blank=True)
 
+    RESPONSE_FIELDS = (
+        "choice_response",
+        "choice_responses",
+        "text_response",
+        "last_submitted",
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("rubric_response", "question"),
+                name="unique_question_response",
+            ),
+        )
+
+    class QuestionResponseManager(models.Manager):
+        def update_responses(self, updates) -> list["QuestionResponse"]:
+            """Set the value of each response and save them with one query.
+
+            Args:
+                updates: (QuestionResponse, value, submitted) tuples. The
+                    responses need their question loaded. submitted is when
+                    the answer was given, or None for now.
+
+            Returns:
+                list[QuestionResponse]: the updated responses.
+
+            """
+            now = timezone.now()
+            responses = []
+            for response, value, submitted in updates:
+                response.set_response(value, submitted or now)
+                responses.append(response)
+            if responses:
+                self.bulk_update(responses, QuestionResponse.RESPONSE_FIELDS)
+                responses_updated.send(sender=self.model, responses=responses)
+            return responses
+
+    objects = QuestionResponseManager()
+
     def __str__(self):
         return "{question}: {answer}".format(
             question=self.question.short_description, answer=self.response
         )
 
+    @property
+    def type_handler(self) -> "QuestionType":
+        return QuestionType.get_instance(self.question)
+
     @property
     def response(self):
-        return QuestionType.get_instance(self.question).response(self)
+        return self.type_handler.response(self.question, self)
 
     @property
     def question_answered(self):
-        return QuestionType.get_instance(self.question).question_answered(self)
+        return self.type_handler.question_answered(self.question, self)
 
     def response_external(self):
-        return QuestionType.get_instance(self.question).response_external(self)
+        return self.type_handler.response_external(self.question, self)
+
+    def set_response(self, value, submitted=None):
+        """Set the response without saving it."""
+        self.type_handler.update_response(self.question, self, value)
+        self.last_submitted = submitted or timezone.now()
 
     def update_response(self, value):
-        QuestionType.get_instance(self.question).update_response(self, value)
-        self.last_submitted = timezone.now()
+        self.set_response(value)
         self.save()
+        responses_updated.send(sender=QuestionResponse, responses=[self])
 
     def score(self) -> float:
         """Return the weighted score of the question response.
@@ -387,50 +499,78 @@ class QuestionResponse(models.Model):
         question.
 
         """
-        return QuestionType.get_instance(self.question).score(self)
+        return self.type_handler.score(self.question, self)
 
     def unweighted_score(self) -> float:
         """Return the unweighted score for the question response."""
-        return QuestionType.get_instance(self.question).unweighted_score(self)
+        return self.type_handler.unweighted_score(self.question, self)
 
     def clear_response(self):
+        self.choice_response = None
+        self.choice_responses = None
+        self.text_response = None
         self.update_response(None)
 
 
 class QuestionType(object):
-    question = None
+    """Stateless handler for the behavior of a question type.
+
+    A single instance of each subclass is shared by all questions of that type,
+    so the question is always passed in explicitly. Use get_instance or
+    for_type to look up the handler rather than instantiating one.
+
+    """
+
+    internal_name = None
+    external_name = None
 
     @classmethod
-    def get_instance(cls, question: Question):
-        return QUESTION_TYPE_DICT.get(question.question_type, GenericQuestionType)(
-            question
-        )
+    def get_instance(cls, question: Question) -> "QuestionType":
+        return cls.for_type(question.question_type)
 
-    def __init__(self, question: Question):
-        super(QuestionType, self).__init__()
-        self.question = question
+    @classmethod
+    def for_type(cls, question_type: str) -> "QuestionType":
+        return QUESTION_TYPE_DICT.get(question_type, GENERIC_QUESTION_TYPE)
 
     def show_choices(self):
         return False
 
-    def question_answered(self, response: QuestionResponse):
-        return self.response(response)
+    def question_answered(self, question: Question, response: QuestionResponse):
+        return self.response(question, response)
 
-    def response(self, response: QuestionResponse):
+    def response(self, question: Question, response: QuestionResponse):
         raise NotImplementedError
 
-    def response_external(self, response: QuestionResponse):
+    def response_external(self, question: Question, response: QuestionResponse):
         raise NotImplementedError
 
-    def update_response(self, response: QuestionResponse, value):
+    def update_response(self, question: Question, response: QuestionResponse, value):
         raise NotImplementedError
 
-    def score(self, response: QuestionResponse) -> float:
+    def score(self, question: Question, response: QuestionResponse) -> float:
         raise NotImplementedError
 
-    def unweighted_score(self, response: QuestionResponse) -> float:
+    def unweighted_score(self, question: Question, response: QuestionResponse) -> float:
         raise NotImplementedError
 
+    def responses_external(
+        self, question: Question, responses: Iterable[QuestionResponse]
+    ) -> list:
+        """Return the external response for each response to the question."""
+        return [self.response_external(question, response) for response in responses]
+
+    def scores(
+        self, question: Question, responses: Iterable[QuestionResponse]
+    ) -> list[float]:
+        """Return the weighted score for each response to the question."""
+        return [self.score(question, response) for response in responses]
+
+    def unweighted_scores(
+        self, question: Question, responses: Iterable[QuestionResponse]
+    ) -> list[float]:
+        """Return the unweighted score for each response to the question."""
+        return [self.unweighted_score(question, response) for response in responses]
+
 
 class GenericQuestionType(QuestionType):
     pass
@@ -440,30 +580,54 @@ class ChoiceSelectionMixin(object):
     def show_choices(self):
         return True
 
+    @staticmethod
+    def choice_dict(question: Question) -> dict[str, str]:
+        return {key: value for key, value in question.choices()}
+
+    def response_external(self, question: Question, response: QuestionResponse):
+        return self.external_value(self.choice_dict(question), response)
+
+    def responses_external(
+        self, question: Question, responses: Iterable[QuestionResponse]
+    ) -> list:
+        choices = self.choice_dict(question)
+        return [self.external_value(choices, response) for response in responses]
+
+    def external_value(self, choices: dict[str, str], response: QuestionResponse):
+        raise NotImplementedError
+
+    def score(self, question: Question, response: QuestionResponse) -> float:
+        weight = float(question.weight)
+        if weight == 0:
+            return 0.0
+        else:
+            return self.unweighted_score(question, response) * weight
+
+    def scores(
+        self, question: Question, responses: Iterable[QuestionResponse]
+    ) -> list[float]:
+        weight = float(question.weight)
+        if weight == 0:
+            return [0.0 for _ in responses]
+        return [
+            self.unweighted_score(question, response) * weight for response in responses
+        ]
+
 
 class SingleSelectionMixin(ChoiceSelectionMixin):
-    def response(self, response: QuestionResponse):
+    def response(self, question: Question, response: QuestionResponse):
         return response.choice_response
 
-    def response_external(self, response: QuestionResponse):
+    def external_value(self, choices: dict[str, str], response: QuestionResponse):
         resp = response.choice_response
         if resp is None:
             return None
-        choices = {key: value for key, value in self.question.choices()}
-
         return choices[resp]
 
-    def update_response(self, response: QuestionResponse, value):
+    def update_response(self, question: Question, response: QuestionResponse, value):
         response.choice_response = value
 
-    def score(self, response: QuestionResponse) -> float:
-        weight = float(self.question.weight)
-        if weight == 0:
-            return 0.0
-        else:
-            return self.unweighted_score(response) * weight
-
-    def unweighted_score(self, response: QuestionResponse) -> float:
+    def unweighted_score(self, question: Question, response: QuestionResponse) -> float:
         try:
             value = float(response.choice_response)
         except (ValueError, TypeError):
@@ -486,39 +650,20 @@ class MultiSelectQuestionType(ChoiceSelectionMixin, QuestionType):
     internal_name = "MULTI SELECT"
     external_name = "Multiple Select"
 
-    def question_answered(self, response: QuestionResponse):
-        return response.text_response
-
-    def response(self, response: QuestionResponse):
-        resp = response.text_response
-        if not resp:
-            return []
-        return json.loads(resp)
+    def question_answered(self, question: Question, response: QuestionResponse):
+        return response.choice_responses
 
-    def response_external(self, response: QuestionResponse):
-        resp = response.text_response
-        if not resp:
-            return []
-        resp = json.loads(resp)
-        choices = {key: value for key, value in self.question.choices()}
+    def response(self, question: Question, response: QuestionResponse):
+        return response.choice_responses or []
 
-        return [choices[indv] for indv in resp]
-
-    def update_response(self, response: QuestionResponse, value):
-        if not value:
-            response.text_response = ""
-        else:
-            response.text_response = json.dumps(value)
+    def external_value(self, choices: dict[str, str], response: QuestionResponse):
+        return [choices[indv] for indv in response.choice_responses or []]
 
-    def score(self, response: QuestionResponse) -> float:
-        weight = float(self.question.weight)
-        if weight == 0:
-            return 0.0
-        else:
-            return self.unweighted_score(response) * weight
+    def update_response(self, question: Question, response: QuestionResponse, value):
+        response.choice_responses = list(value) if value else []
 
-    def unweighted_score(self, response: QuestionResponse) -> float:
-        responses = json.loads(response.text_response)
+    def unweighted_score(self, question: Question, response: QuestionResponse) -> float:
+        responses = response.choice_responses or []
         value = 0.0
         for x in responses:
             try:
@@ -532,28 +677,30 @@ class LongTextQuestionType(QuestionType):
     internal_name = "LONG TEXT"
     external_name = "Long Text"
 
-    def response(self, response: QuestionResponse):
+    def response(self, question: Question, response: QuestionResponse):
         return response.text_response
 
-    def response_external(self, response: QuestionResponse):
-        return self.response(response)
+    def response_external(self, question: Question, response: QuestionResponse):
+        return self.response(question, response)
 
-    def update_response(self, response: QuestionResponse, value):
+    def update_response(self, question: Question, response: QuestionResponse, value):
         response.text_response = value
 
-    def score(self, response: QuestionResponse) -> float:
+    def score(self, question: Question, response: QuestionResponse) -> float:
         raise TypeError(
             "Questions of type {0} cannot be scored".format(self.__class__.__name__)
         )
 
-    def unweighted_score(self, response: QuestionResponse) -> float:
+    def unweighted_score(self, question: Question, response: QuestionResponse) -> float:
         raise TypeError(
             "Questions of type {0} cannot be scored".format(self.__class__.__name__)
         )
 
 
+GENERIC_QUESTION_TYPE = GenericQuestionType()
+
 QUESTION_TYPE_DICT = {
-    c.internal_name: c
+    c.internal_name: c()
     for c in (
         ScaleQuestionType,
         SingleSelectQuestionType,
@@ -23,22 +23,15 @@ def createRelatedQuestionResponses(
         **kwargs: Additional, unused keyword arguments.
 
     """
-    question_id = instance
-    rubric_id = instance.rubric_id
-
-    all_rubric_responses = get_rubric_response_set(rubric_id)
-    rubric_responses_for_specified_question = (
-        get_rubric_response_set_related_to_question(question_id)
+    # ignore_conflicts skips rubric responses that already have this question
+    QuestionResponse.objects.bulk_create(
+        [
+            QuestionResponse(rubric_response_id=rr, question=instance)
+            for rr in get_rubric_response_set(instance.rubric_id)
+        ],
+        ignore_conflicts=True,
     )
 
-    new_responses = []
-    for rr in all_rubric_responses - rubric_responses_for_specified_question:
-        new_responses.append(
-            QuestionResponse(rubric_response_id=rr, question=question_id)
-        )
-
-    QuestionResponse.objects.bulk_create(new_responses)
-
 
 def get_rubric_response_set(rubric_id) -> set:
     queryset = RubricResponse.objects.filter(rubric_id=rubric_id).values_list(
@@ -47,13 +40,6 @@ def get_rubric_response_set(rubric_id) -> set:
     return set(queryset)
 
 
-def get_rubric_response_set_related_to_question(question_id) -> set:
-    queryset = QuestionResponse.objects.filter(question_id=question_id).values_list(
-        "rubric_response_id", flat=True
-    )
-    return set(queryset)
-
-
 @receiver(post_save, sender=Question)
 def clearResponsesForQuestion(
     sender: type, instance: Question, created: bool, **kwargs
@@ -466,6 +466,19 @@ class ScoreTableFeedbackModuleTests(FeedbackModuleTestBase):
         expected_html = self.FIXTURES.test_no_remove_empty_scores_html
         self.assertHTMLEqual(actual_html, expected_html)
 
+    def test_question_with_only_empty_scores(self):
+        module = self._create_module()
+        module.questions.add(self.scale_question, self.single_select_question)
+
+        response = make_rubric_response(self.rubric)
+        question_response = response.questionresponse_set.get(
+            question=self.scale_question
+        )
+        question_response.update_response("2")
+
+        rows = list(module.get_rows(RubricResponse.objects.all()))
+        self.assertEqual([row.score for row in rows], [2.0, None])
+
 
 class ChoiceResponseListFeedbackModuleTests(FeedbackModuleTestBase):
     MODULE = ChoiceResponseListFeedbackModule
@@ -22,12 +22,15 @@ from hypothesis.strategies import (
 )
 from model_bakery import baker
 
+from apps.rubrics.expressions import multi_select_score
 from apps.rubrics.fixtures import make_test_rubric
 from apps.rubrics.forms import ChoiceForm, QuestionForm
 from apps.rubrics.models.rubric import (
     Choice,
+    GenericQuestionType,
     Question,
     QuestionResponse,
+    QuestionType,
     Rubric,
     RubricResponse,
     value_is_numeric,
@@ -646,6 +649,16 @@ class RubricResponseTests(HypTestCase):
             rub_response.score(), 1.665, 3, "Score incorrect after answering the Rubric"
         )
 
+    def test_with_scores_matches_python_score(self):
+        unanswered = make_rubric_response()
+        answered = make_rubric_response(unanswered.rubric)
+        answer_rubric_response(answered)
+
+        for rub_response in RubricResponse.objects.with_scores():
+            with self.subTest(rub_response.pk):
+                self.assertAlmostEqual(rub_response.total_score, rub_response.score())
+                self.assertEqual(rub_response.has_answers, rub_response.has_response)
+
 
 def make_rubric_response(rubric=None):
     rubric = rubric or make_test_rubric()
@@ -891,6 +904,85 @@ class QuestionResponseTests(HypTestCase):
         )
 
 
+class QuestionTypeTests(HypTestCase):
+    def test_get_instance_returns_shared_handler(self):
+        rubric = make_test_rubric()
+        for question in rubric.question_set.all():
+            with self.subTest(question.question_type):
+                handler = QuestionType.get_instance(question)
+                self.assertIs(handler, QuestionType.get_instance(question))
+                self.assertIs(handler, QuestionType.for_type(question.question_type))
+                self.assertEqual(handler.internal_name, question.question_type)
+
+    def test_unknown_type_returns_generic_handler(self):
+        self.assertIsInstance(QuestionType.for_type("UNKNOWN"), GenericQuestionType)
+
+    def test_batch_methods_match_individual_responses(self):
+        rubric = make_test_rubric()
+        rub_responses = [make_rubric_response(rubric) for _ in range(3)]
+        for rub_response in rub_responses[:2]:
+            answer_rubric_response(rub_response)
+
+        for question in rubric.question_set.all():
+            responses = list(
+                QuestionResponse.objects.filter(question=question).select_related(
+                    "question"
+                )
+            )
+            handler = QuestionType.get_instance(question)
+            with self.subTest(question.question_type):
+                self.assertEqual(
+                    handler.responses_external(question, responses),
+                    [resp.response_external() for resp in responses],
+                )
+                if question.question_type == Question.LONG_TEXT:
+                    continue
+
+                answered = [resp for resp in responses if resp.question_answered]
+                self.assertEqual(
+                    handler.scores(question, answered),
+                    [resp.score() for resp in answered],
+                )
+                self.assertEqual(
+                    handler.unweighted_scores(question, answered),
+                    [resp.unweighted_score() for resp in answered],
+                )
+
+
+class MultiSelectResponseTests(HypTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rubric = make_test_rubric()
+        self.question = self.rubric.question_set.get(
+            question_type=Question.MULTI_SELECT_TYPE
+        )
+        self.rub_response = make_rubric_response(self.rubric)
+        self.q_resp = self.rub_response.questionresponse_set.get(question=self.question)
+
+    def test_response_stored_in_json_column(self):
+        keys = [choice.key for choice in self.question.choice_set.all()][:2]
+        self.q_resp.update_response(keys)
+
+        q_resp = QuestionResponse.objects.get(pk=self.q_resp.pk)
+        self.assertEqual(q_resp.choice_responses, keys)
+        self.assertIsNone(q_resp.text_response)
+        self.assertEqual(q_resp.response, keys)
+
+    def test_empty_selection_is_not_a_response(self):
+        self.q_resp.update_response([])
+        self.assertFalse(self.rub_response.has_response)
+
+    def test_score_expression_matches_python_score(self):
+        keys = [choice.key for choice in self.question.choice_set.all()]
+        for selected in ([], keys[:1], keys):
+            with self.subTest(selected=selected):
+                self.q_resp.update_response(selected)
+                annotated = QuestionResponse.objects.annotate(
+                    db_score=multi_select_score()
+                ).get(pk=self.q_resp.pk)
+                self.assertAlmostEqual(annotated.db_score, annotated.score())
+
+
 class QuestionResponseClearingTests(HypTestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,271 @@
+// Offline scoring for judges. Registers the service worker that caches the
+// judge's pages, and queues answers in localStorage so they are sent in one
+// batch every few seconds, or when the device is back online.
+//
+// Each queued answer keeps the time it was given. The server keeps whichever
+// answer to a question was given last, and returns the saved answer for any
+// queued one that was older.
+(function () {
+    "use strict";
+
+    var root = document.getElementById("offline-judging");
+    if (!root || !window.fetch || !window.localStorage) {
+        return;
+    }
+    var QUEUE_KEY = "judging-queue:" + root.dataset.judge;
+    var BATCH_KEY = "judging-batch:" + root.dataset.judge;
+    var CACHED_KEY = "judging-cached:" + root.dataset.judge;
+    var SYNC_DELAY = 5000;
+    var CACHE_INTERVAL = 10 * 60 * 1000;
+    var status = root.querySelector(".offline-status");
+    var syncing = false;
+    var timer = null;
+
+    function load(key) {
+        try {
+            return JSON.parse(localStorage.getItem(key));
+        } catch (error) {
+            return null;
+        }
+    }
+
+    function store(key, value) {
+        if (value === null) {
+            localStorage.removeItem(key);
+        } else {
+            localStorage.setItem(key, JSON.stringify(value));
+        }
+    }
+
+    function countAnswers(queue) {
+        var count = 0;
+        Object.keys(queue || {}).forEach(function (instanceId) {
+            count += Object.keys(queue[instanceId]).length;
+        });
+        return count;
+    }
+
+    function showStatus(message) {
+        if (status) {
+            status.textContent = message;
+        }
+    }
+
+    function showPending() {
+        var count = countAnswers(load(QUEUE_KEY)) + countAnswers((load(BATCH_KEY) || {}).queue);
+        if (count) {
+            showStatus(count + (count === 1 ? " answer is" : " answers are") +
+                " saved on this device and will be sent when you're online.");
+        }
+    }
+
+    function queueAnswer(instanceId, questionId, value) {
+        var queue = load(QUEUE_KEY) || {};
+        queue[instanceId] = queue[instanceId] || {};
+        queue[instanceId][questionId] = {value: value, submitted: new Date().toISOString()};
+        store(QUEUE_KEY, queue);
+    }
+
+    // Remove the sent answers from the queue, unless they were changed since
+    function removeSent(sent) {
+        var queue = load(QUEUE_KEY) || {};
+        Object.keys(sent).forEach(function (instanceId) {
+            Object.keys(sent[instanceId]).forEach(function (questionId) {
+                var queued = queue[instanceId] && queue[instanceId][questionId];
+                if (queued && queued.submitted === sent[instanceId][questionId].submitted) {
+                    delete queue[instanceId][questionId];
+                }
+            });
+            if (queue[instanceId] && !Object.keys(queue[instanceId]).length) {
+                delete queue[instanceId];
+            }
+        });
+        store(QUEUE_KEY, Object.keys(queue).length ? queue : null);
+    }
+
+    function csrfToken() {
+        var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return match ? decodeURIComponent(match[1]) : "";
+    }
+
+    function newKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now() + "-" + Math.random().toString(36).slice(2);
+    }
+
+    function schedule() {
+        clearTimeout(timer);
+        timer = setTimeout(sync, SYNC_DELAY);
+    }
+
+    // Send the queued answers in one request. A batch keeps its key until the
+    // server answers, so resending it after a lost response isn't saved twice.
+    function sync() {
+        clearTimeout(timer);
+        if (syncing || !navigator.onLine) {
+            showPending();
+            return;
+        }
+        var batch = load(BATCH_KEY);
+        if (!batch) {
+            var queue = load(QUEUE_KEY);
+            if (!countAnswers(queue)) {
+                return;
+            }
+            batch = {key: newKey(), queue: queue};
+            store(BATCH_KEY, batch);
+        }
+
+        syncing = true;
+        fetch(root.dataset.saveUrl, {
+            method: "POST",
+            credentials: "same-origin",
+            keepalive: true,
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": csrfToken(),
+                "Idempotency-Key": batch.key
+            },
+            body: JSON.stringify({responses: batch.queue, sent: new Date().toISOString()})
+        }).then(function (response) {
+            if (response.status >= 500) {
+                throw new Error("Server error " + response.status);
+            }
+            // Other errors won't go away by sending the batch again
+            store(BATCH_KEY, null);
+            removeSent(batch.queue);
+            return response.json().then(function (data) {
+                if (response.ok) {
+                    showConflicts(data.conflicts || {});
+                } else {
+                    showStatus("Some answers couldn't be saved. Reload the page and try again.");
+                }
+            });
+        }).catch(function () {
+            showPending();
+        }).then(function () {
+            syncing = false;
+            if (countAnswers(load(QUEUE_KEY))) {
+                schedule();
+            }
+        });
+    }
+
+    function showConflicts(conflicts) {
+        var keys = Object.keys(conflicts);
+        keys.forEach(function (key) {
+            var ids = key.split(".");
+            if (form && ids[0] === root.dataset.instance) {
+                setField(ids[1], conflicts[key].value);
+            }
+        });
+        showStatus(keys.length ?
+            "Saved. Answers changed later on another device were kept." : "Saved.");
+    }
+
+    // The rubric form, when editing a judging instance
+    var firstField = document.querySelector("[name^='question_']");
+    var form = root.dataset.instance && firstField ? firstField.form : null;
+
+    function fields(questionId) {
+        return form.querySelectorAll("[name='question_" + questionId + "']");
+    }
+
+    function fieldValue(questionId) {
+        var inputs = fields(questionId);
+        var type = inputs[0].type;
+        if (type === "checkbox") {
+            return Array.prototype.filter.call(inputs, function (input) {
+                return input.checked;
+            }).map(function (input) {
+                return input.value;
+            });
+        }
+        if (type === "radio") {
+            var checked = Array.prototype.filter.call(inputs, function (input) {
+                return input.checked;
+            });
+            return checked.length ? checked[0].value : null;
+        }
+        return inputs[0].value;
+    }
+
+    function setField(questionId, value) {
+        Array.prototype.forEach.call(fields(questionId), function (input) {
+            if (input.type === "checkbox") {
+                input.checked = (value || []).indexOf(input.value) !== -1;
+            } else if (input.type === "radio") {
+                input.checked = input.value === value;
+            } else {
+                input.value = value || "";
+            }
+        });
+    }
+
+    function questionId(field) {
+        var match = /^question_(\d+)$/.exec(field.name || "");
+        return match ? match[1] : null;
+    }
+
+    if (form) {
+        // Show answers that haven't been sent yet instead of the saved ones
+        var queued = (load(QUEUE_KEY) || {})[root.dataset.instance] || {};
+        Object.keys(queued).forEach(function (id) {
+            setField(id, queued[id].value);
+        });
+
+        form.addEventListener("change", function (event) {
+            var id = questionId(event.target);
+            if (id) {
+                queueAnswer(root.dataset.instance, id, fieldValue(id));
+                schedule();
+            }
+        });
+        form.addEventListener("submit", function (event) {
+            // Saving sends the answers in the background. Submitting checks
+            // every required question is answered, so it needs the server.
+            var saving = event.submitter && event.submitter.name === "save";
+            if (!saving && navigator.onLine) {
+                var queue = load(QUEUE_KEY) || {};
+                delete queue[root.dataset.instance];
+                store(QUEUE_KEY, queue);
+                return;
+            }
+            event.preventDefault();
+            // Text being typed hasn't fired a change event yet
+            var id = questionId(document.activeElement);
+            if (id && document.activeElement.form === form) {
+                queueAnswer(root.dataset.instance, id, fieldValue(id));
+            }
+            sync();
+        });
+    }
+
+    window.addEventListener("online", sync);
+    document.addEventListener("visibilitychange", function () {
+        if (document.visibilityState === "hidden") {
+            sync();
+        }
+    });
+    sync();
+
+    if ("serviceWorker" in navigator) {
+        navigator.serviceWorker.register(root.dataset.serviceWorker).then(function () {
+            return navigator.serviceWorker.ready;
+        }).then(function (registration) {
+            // Refreshing the cached pages is a request per page, so it's
+            // only done from the dashboard, and not every time it's opened
+            var cachedAt = load(CACHED_KEY) || 0;
+            if (navigator.onLine && root.dataset.offlineData &&
+                    Date.now() - cachedAt > CACHE_INTERVAL) {
+                store(CACHED_KEY, Date.now());
+                registration.active.postMessage({
+                    type: "cache-offline-data",
+                    url: root.dataset.offlineData
+                });
+            }
+        }).catch(function () {});
+    }
+})();
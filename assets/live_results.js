@@ -0,0 +1,92 @@
+// Keeps the live results page up to date from the progress event stream.
+// Each event has the new values, so an event received twice changes nothing.
+(function () {
+    "use strict";
+
+    var root = document.getElementById("live-results");
+    if (!root || !window.EventSource) {
+        return;
+    }
+    var FEED_LENGTH = 10;
+    var HIGHLIGHT_TIME = 2000;
+    var table = root.querySelector("tbody");
+    var feed = root.querySelector(".live-feed");
+    var sortPending = false;
+
+    function setText(selector, value) {
+        root.querySelector(selector).textContent = value;
+    }
+
+    // The score the page shows, like the floatformat filter
+    function formatScore(score) {
+        var rounded = Math.round(score * 10) / 10;
+        return rounded % 1 ? rounded.toFixed(1) : String(rounded);
+    }
+
+    function compareRows(a, b) {
+        return (Number(b.dataset.score) - Number(a.dataset.score)) ||
+            (Number(b.dataset.count) - Number(a.dataset.count)) ||
+            (a.dataset.number < b.dataset.number ? -1 : a.dataset.number > b.dataset.number ? 1 : 0);
+    }
+
+    // A batch of events re-sorts the table once
+    function sortRows() {
+        sortPending = false;
+        var rows = Array.prototype.slice.call(table.querySelectorAll("tr[data-number]"));
+        rows.sort(compareRows).forEach(function (row, index) {
+            row.querySelector(".rank").textContent = index + 1;
+            table.appendChild(row);
+        });
+    }
+
+    function highlight(row) {
+        row.classList.add("info");
+        setTimeout(function () {
+            row.classList.remove("info");
+        }, HIGHLIGHT_TIME);
+    }
+
+    function onProject(event) {
+        var project = JSON.parse(event.data);
+        var row = table.querySelector("tr[data-number='" + project.number + "']");
+        if (!row) {
+            // Added since the page loaded
+            return;
+        }
+        row.dataset.score = project.avg_score;
+        row.dataset.count = project.score_count;
+        row.querySelector(".score").textContent = formatScore(project.avg_score);
+        row.querySelector(".count").textContent = project.score_count;
+        highlight(row);
+        if (!sortPending) {
+            sortPending = true;
+            window.requestAnimationFrame(sortRows);
+        }
+    }
+
+    function onInstance(event) {
+        var instance = JSON.parse(event.data);
+        var item = document.createElement("li");
+        item.textContent = instance.judge + (instance.complete ? " completed #" : " is scoring #") +
+            instance.project;
+        feed.insertBefore(item, feed.firstChild);
+        while (feed.children.length > FEED_LENGTH) {
+            feed.removeChild(feed.lastChild);
+        }
+    }
+
+    function onProgress(event) {
+        var progress = JSON.parse(event.data);
+        setText(".live-progress .complete", progress.complete);
+        setText(".live-progress .total", progress.total);
+        setText(".live-progress .started", progress.started);
+        root.querySelector(".progress-bar").style.width =
+            (progress.total ? 100 * progress.complete / progress.total : 0) + "%";
+    }
+
+    var source = new EventSource(root.dataset.stream + "?last_event_id=" +
+        encodeURIComponent(root.dataset.lastEventId));
+    source.addEventListener("project", onProject);
+    source.addEventListener("instance", onInstance);
+    source.addEventListener("progress", onProgress);
+})();
@@ -0,0 +1,63 @@
+// Typeahead for the project search box in the navbar. Without JavaScript the
+// box still submits to the project index as a filter.
+(function () {
+    "use strict";
+
+    var form = document.getElementById("project-search");
+    if (!form) {
+        return;
+    }
+    var input = form.querySelector("input[name=q]");
+    var list = document.getElementById(input.getAttribute("list"));
+    var urls = {};
+    var pending = null;
+    var timer = null;
+
+    function label(project) {
+        return project.number + " " + project.title;
+    }
+
+    function suggest() {
+        var query = input.value.trim();
+        if (!query || urls[query]) {
+            return;
+        }
+        if (pending) {
+            pending.abort();
+        }
+        pending = new AbortController();
+        fetch(form.dataset.suggestUrl + "?q=" + encodeURIComponent(query), {
+            credentials: "same-origin",
+            signal: pending.signal
+        })
+            .then(function (response) {
+                return response.ok ? response.json() : {results: []};
+            })
+            .then(function (data) {
+                list.innerHTML = "";
+                data.results.forEach(function (project) {
+                    var option = document.createElement("option");
+                    option.value = label(project);
+                    urls[option.value] = project.url;
+                    list.appendChild(option);
+                });
+            })
+            .catch(function () {});
+    }
+
+    input.addEventListener("input", function () {
+        // Choosing a suggestion jumps straight to the project
+        if (urls[input.value]) {
+            window.location = urls[input.value];
+            return;
+        }
+        clearTimeout(timer);
+        timer = setTimeout(suggest, 100);
+    });
+    form.addEventListener("submit", function (event) {
+        if (urls[input.value]) {
+            event.preventDefault();
+            window.location = urls[input.value];
+        }
+    });
+})();
@@ -2,6 +2,7 @@ from django.contrib import admin, messages
 from django.contrib.contenttypes.admin import GenericTabularInline
 from django.contrib.contenttypes.forms import BaseGenericInlineFormSet
 from django.core.exceptions import ValidationError
+from django.db.models import prefetch_related_objects
 from django.db.models.base import Model
 from django.urls.base import reverse
 from django.utils.html import format_html
@@ -18,7 +19,8 @@ from apps.fair_projects.logic import get_projects_sorted_by_score
 from apps.fair_projects.models import Project, Student
 
 # This seems like a safe place to register signals
-from . import signals
+from . import roles, signals
+from .exports import StreamingExportMixin
 
 admin.site.unregister(Project)
 admin.site.unregister(Award)
@@ -26,7 +28,7 @@ admin.site.unregister(AwardInstance)
 
 
 def assign_awards_to_projects(modeladmin, request, queryset):
-    instances = [ProjectInstance(project) for project in get_projects_sorted_by_score()]
+    instances = get_project_instances()
     assign_awards(queryset, instances)
     for instance in instances:
         if instance.awards:
@@ -44,7 +46,7 @@ assign_awards_to_projects.short_description = "Assign selected awards to project
 class ProjectInstance(InstanceBase):
     model_attr = "project"
 
-    def __init__(self, project):
+    def __init__(self, project, awards=None):
         super().__init__()
         self.project = project
         self.category = self.project.category
@@ -53,7 +55,9 @@ class ProjectInstance(InstanceBase):
         self.number = self.project.number
         self.grade_level = self.calculate_grade_level()
 
-        self.awards.extend(Award.get_awards_for_object(self.project))
+        if awards is None:
+            awards = Award.get_awards_for_object(self.project)
+        self.awards.extend(awards)
 
     def __str__(self):
         return self.project.__str__()
@@ -65,6 +69,20 @@ class ProjectInstance(InstanceBase):
         )
 
 
+def get_project_instances() -> list[ProjectInstance]:
+    """A ProjectInstance for each project, sorted by score.
+
+    The projects' categories, students and awards are loaded up front, in a
+    fixed number of queries.
+    """
+    projects = get_projects_sorted_by_score()
+    prefetch_related_objects(
+        projects, "category", "subcategory", "division", "student_set"
+    )
+    awards = AwardInstance.get_awards_for_model(Project)
+    return [ProjectInstance(project, awards[str(project.pk)]) for project in projects]
+
+
 class AwardInstanceResource(resources.ModelResource):
     award = fields.Field()
     project = fields.Field()
@@ -184,7 +202,9 @@ class AwardAdmin(apps.awards.admin.AwardAdmin):
 
 
 @admin.register(AwardInstance)
-class AwardInstanceAdmin(ExportMixin, apps.awards.admin.AwardInstanceAdmin):
+class AwardInstanceAdmin(
+    StreamingExportMixin, ExportMixin, apps.awards.admin.AwardInstanceAdmin
+):
     list_filter = ("award", TraitListFilter)
     list_display = ("award", "project", "students", "category", "division")
     fields = ("award", "project", "students", "category", "division")
@@ -192,6 +212,13 @@ class AwardInstanceAdmin(ExportMixin, apps.awards.admin.AwardInstanceAdmin):
 
     resource_class = AwardInstanceResource
 
+    def get_export_queryset(self, queryset):
+        return queryset.select_related("award").prefetch_related(
+            "content_object__category",
+            "content_object__division",
+            "content_object__student_set",
+        )
+
     def project(self, instance):
         return instance.content_object
 
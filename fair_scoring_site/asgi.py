@@ -0,0 +1,18 @@
+"""
+ASGI config for fair_scoring_site project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server such as uvicorn or daphne, e.g.
+``uvicorn fair_scoring_site.asgi:application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fair_scoring_site.settings")
+
+application = get_asgi_application()
@@ -0,0 +1,220 @@
+"""Per-view request instrumentation.
+
+RequestMetricsMiddleware records the query count, database time, template
+render time and wall time of every request. It keeps a rolling window of
+samples for each view in memory, logs one line per request, and logs a warning
+when a request runs more queries than its budget.
+
+Settings:
+    REQUEST_METRICS_WINDOW: the number of samples kept for each view.
+    REQUEST_QUERY_BUDGET: the default query budget for a view, or None.
+    REQUEST_QUERY_BUDGETS: query budgets for specific views, by view name.
+
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 1000
+PERCENTILES = (50, 95, 99)
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "db_time", "template_time", "wall_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.wall_time = 0.0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 1),
+            "template_ms": round(self.template_time * 1000, 1),
+            "wall_ms": round(self.wall_time * 1000, 1),
+        }
+
+
+def percentile(sorted_values: list, percent: int):
+    """Return the nearest-rank percentile of a sorted, non-empty list."""
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[index]
+
+
+class ViewStats:
+    FIELDS = ("queries", "db_ms", "template_ms", "wall_ms")
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.over_budget = 0
+
+    def add(self, metrics: RequestMetrics, over_budget: bool) -> None:
+        self.samples.append(metrics.as_dict())
+        self.count += 1
+        self.over_budget += over_budget
+
+    def summary(self) -> dict:
+        summary = {"count": self.count, "over_budget": self.over_budget}
+        for field in self.FIELDS:
+            values = sorted(sample[field] for sample in self.samples)
+            summary[field] = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+        return summary
+
+
+class MetricsRegistry:
+    """Rolling request metrics for each view, shared by all threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name: str, metrics: RequestMetrics, over_budget: bool):
+        with self._lock:
+            if view_name not in self._views:
+                window = getattr(settings, "REQUEST_METRICS_WINDOW", DEFAULT_WINDOW)
+                self._views[view_name] = ViewStats(window)
+            self._views[view_name].add(metrics, over_budget)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                view_name: stats.summary()
+                for view_name, stats in sorted(self._views.items())
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+def get_query_budget(view_name: str) -> Optional[int]:
+    budgets = getattr(settings, "REQUEST_QUERY_BUDGETS", {})
+    if view_name in budgets:
+        return budgets[view_name]
+    return getattr(settings, "REQUEST_QUERY_BUDGET", None)
+
+
+class RequestMetricsMiddleware:
+    """Record metrics for each request.
+
+    Put this first in MIDDLEWARE so the wall time covers the other middleware.
+    Template time is only measured for TemplateResponses and includes queries
+    run while rendering. The body of a streaming response is produced after
+    the middleware returns, so it isn't measured.
+
+    Under ASGI, queries run in the thread that sync_to_async() uses for the
+    request, so the query wrappers are added to that thread's connections.
+
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        request.request_metrics = metrics
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+            response = self.get_response(request)
+        metrics.wall_time = time.perf_counter() - start
+
+        if request.resolver_match is not None:
+            self.record(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        request.request_metrics = metrics
+
+        start = time.perf_counter()
+        await sync_to_async(self.add_wrappers)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self.remove_wrappers)(metrics)
+        metrics.wall_time = time.perf_counter() - start
+
+        if request.resolver_match is not None:
+            self.record(request, response, metrics)
+        return response
+
+    # Requests can share the thread, so each removes its own wrapper rather
+    # than the last one added, as connection.execute_wrapper() would
+    @staticmethod
+    def add_wrappers(metrics: RequestMetrics) -> None:
+        for connection in connections.all():
+            connection.execute_wrappers.append(metrics.execute_wrapper)
+
+    @staticmethod
+    def remove_wrappers(metrics: RequestMetrics) -> None:
+        for connection in connections.all():
+            connection.execute_wrappers.remove(metrics.execute_wrapper)
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.request_metrics.template_time = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, metrics: RequestMetrics) -> None:
+        view_name = request.resolver_match.view_name
+        budget = get_query_budget(view_name)
+        over_budget = budget is not None and metrics.queries > budget
+        registry.record(view_name, metrics, over_budget)
+
+        values = metrics.as_dict()
+        logger.info(
+            "request view=%s method=%s status=%s queries=%d db_ms=%.1f "
+            "template_ms=%.1f wall_ms=%.1f",
+            view_name,
+            request.method,
+            response.status_code,
+            *values.values(),
+            extra={"view": view_name, "status": response.status_code, **values},
+        )
+        if over_budget:
+            logger.warning(
+                "Query budget exceeded: view=%s path=%s queries=%d budget=%d",
+                view_name,
+                request.path,
+                metrics.queries,
+                budget,
+                extra={"view": view_name, "budget": budget, **values},
+            )
@@ -0,0 +1,112 @@
+"""A snapshot of the judging settings, loaded once per request or operation.
+
+The judging settings live in constance's database backend, so every read is a
+query, and the judging rubric is looked up by name. JudgingConfig reads them all
+once. Inside judging_config_scope(), which JudgingConfigMiddleware opens for
+every request, get_judging_config() returns the same snapshot until a setting
+or a rubric changes. Outside a scope it loads a new snapshot on every call.
+
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from constance import config
+from constance.signals import config_updated
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.rubrics.models.rubric import Rubric
+
+
+class JudgingConfig(NamedTuple):
+    rubric_name: str
+    rubric: Optional[Rubric]
+    judges_per_project: int
+    projects_per_judge: int
+
+    @classmethod
+    def load(cls) -> "JudgingConfig":
+        rubric_name = config.RUBRIC_NAME
+        return cls(
+            rubric_name=rubric_name,
+            rubric=Rubric.objects.filter(name=rubric_name).first(),
+            judges_per_project=config.JUDGES_PER_PROJECT,
+            projects_per_judge=config.PROJECTS_PER_JUDGE,
+        )
+
+
+class _Scope:
+    __slots__ = ("snapshot",)
+
+    def __init__(self):
+        self.snapshot = None
+
+
+_scope: ContextVar[Optional[_Scope]] = ContextVar("judging_config_scope", default=None)
+
+
+def get_judging_config() -> JudgingConfig:
+    scope = _scope.get()
+    if scope is None:
+        return JudgingConfig.load()
+    if scope.snapshot is None:
+        scope.snapshot = JudgingConfig.load()
+    return scope.snapshot
+
+
+def invalidate_judging_config() -> None:
+    """Reload the snapshot of the current scope the next time it's used."""
+    scope = _scope.get()
+    if scope is not None:
+        scope.snapshot = None
+
+
+@contextmanager
+def judging_config_scope():
+    """Share one JudgingConfig in the block. Nested scopes share the outer one."""
+    if _scope.get() is not None:
+        yield
+        return
+
+    token = _scope.set(_Scope())
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+class JudgingConfigMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with judging_config_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so sync code in the view shares
+        # the scope too
+        with judging_config_scope():
+            return await self.get_response(request)
+
+
+@receiver(config_updated, dispatch_uid="invalidate_judging_config_for_constance")
+def invalidate_for_config_update(sender, key, **kwargs) -> None:
+    invalidate_judging_config()
+
+
+@receiver(post_save, sender=Rubric, dispatch_uid="invalidate_judging_config_on_save")
+@receiver(
+    post_delete, sender=Rubric, dispatch_uid="invalidate_judging_config_on_delete"
+)
+def invalidate_for_rubric_change(sender, **kwargs) -> None:
+    invalidate_judging_config()
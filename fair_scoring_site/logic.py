@@ -1,23 +1,19 @@
-from constance import config
-from django.core.exceptions import ObjectDoesNotExist
-
 from apps.rubrics.models.rubric import Rubric
 
+from .judging_config import get_judging_config
+
 
 def get_judging_rubric_name() -> str:
-    return config.RUBRIC_NAME
+    return get_judging_config().rubric_name
 
 
 def get_num_judges_per_project() -> int:
-    return config.JUDGES_PER_PROJECT
+    return get_judging_config().judges_per_project
 
 
 def get_num_projects_per_judge() -> int:
-    return config.PROJECTS_PER_JUDGE
+    return get_judging_config().projects_per_judge
 
 
 def get_judging_rubric() -> Rubric:
-    try:
-        return Rubric.objects.get(name=get_judging_rubric_name())
-    except ObjectDoesNotExist:
-        return None
+    return get_judging_config().rubric
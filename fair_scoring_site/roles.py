@@ -0,0 +1,196 @@
+"""The roles of the logged in user, resolved once and cached in the session.
+
+The navbar and several views ask whether the user is a judge or a teacher and
+which permissions they have, which costs a query per question. get_user_roles()
+loads a UserRoles with the judge and teacher rows and the permission set once,
+keeps it on the request and caches it in the session.
+
+A cached UserRoles is checked against version tokens in Django's cache: one
+for every user and one per user. Changing a user, their groups or permissions,
+a group's permissions, or a judge or teacher replaces the tokens, so the next
+request loads the roles again. Deployments with several processes need a
+shared cache backend for that to reach every process; otherwise cached roles
+expire after USER_ROLES_MAX_AGE seconds.
+
+Because cached roles can lag behind like that, they only decide what a page
+shows, such as links and buttons. Views decide access with request.user and
+the database, as Django's permission mixins and decorators do.
+
+"""
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+from apps.fair_projects.models import Teacher
+from apps.judges.models import Judge
+
+SESSION_KEY = "user_roles"
+GLOBAL_VERSION_KEY = "user_roles:version"
+DEFAULT_MAX_AGE = 300
+
+
+class UserRoles(NamedTuple):
+    user_id: Optional[int]
+    judge_id: Optional[int]
+    teacher_id: Optional[int]
+    permissions: frozenset
+    is_superuser: bool
+    is_staff: bool
+
+    @classmethod
+    def load(cls, user: User) -> "UserRoles":
+        if not user.is_authenticated:
+            return cls(None, None, None, frozenset(), False, False)
+        judge_id, teacher_id = (
+            User.objects.filter(pk=user.pk).values_list("judge", "teacher").get()
+        )
+        return cls(
+            user_id=user.pk,
+            judge_id=judge_id,
+            teacher_id=teacher_id,
+            # Superusers have every permission, so there's no need to load them
+            permissions=frozenset()
+            if user.is_superuser
+            else frozenset(user.get_all_permissions()),
+            is_superuser=user.is_active and user.is_superuser,
+            is_staff=user.is_active and user.is_staff,
+        )
+
+    def has_perm(self, perm: str) -> bool:
+        return self.is_superuser or perm in self.permissions
+
+    @property
+    def is_judge(self) -> bool:
+        return self.judge_id is not None and self.has_perm("judges.is_judge")
+
+    @property
+    def is_teacher(self) -> bool:
+        return self.teacher_id is not None and self.has_perm("fair_projects.is_teacher")
+
+    @property
+    def can_view_results(self) -> bool:
+        return self.has_perm("fair_projects.can_view_results")
+
+    def to_session(self, versions: list) -> dict:
+        return {
+            **self._asdict(),
+            "permissions": sorted(self.permissions),
+            "versions": versions,
+            "loaded_at": time.time(),
+        }
+
+    @classmethod
+    def from_session(cls, data: dict) -> "UserRoles":
+        fields = {field: data[field] for field in cls._fields}
+        fields["permissions"] = frozenset(fields["permissions"])
+        return cls(**fields)
+
+
+def get_versions(user_id: int) -> list:
+    """The current version tokens for user_id, creating any that are missing."""
+    keys = [GLOBAL_VERSION_KEY, f"{GLOBAL_VERSION_KEY}:{user_id}"]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def get_user_roles(request) -> UserRoles:
+    """The roles of request.user, loaded at most once per request."""
+    if hasattr(request, "_user_roles"):
+        return request._user_roles
+
+    user = request.user
+    session = getattr(request, "session", None)
+    if not user.is_authenticated or session is None:
+        roles = UserRoles.load(user)
+    else:
+        versions = get_versions(user.pk)
+        max_age = getattr(settings, "USER_ROLES_MAX_AGE", DEFAULT_MAX_AGE)
+        cached = session.get(SESSION_KEY)
+        if (
+            cached
+            and cached["user_id"] == user.pk
+            and cached["versions"] == versions
+            and time.time() - cached["loaded_at"] < max_age
+        ):
+            roles = UserRoles.from_session(cached)
+        else:
+            roles = UserRoles.load(user)
+            session[SESSION_KEY] = roles.to_session(versions)
+
+    request._user_roles = roles
+    return roles
+
+
+async def aget_user_roles(request) -> UserRoles:
+    """get_user_roles() for async views. It loads request.user and the session."""
+    return await sync_to_async(get_user_roles)(request)
+
+
+def user_roles(request) -> dict:
+    """Context processor adding the roles of the user as roles."""
+    return {"roles": SimpleLazyObject(lambda: get_user_roles(request))}
+
+
+def invalidate_user_roles(user_id: Optional[int] = None) -> None:
+    """Reload the cached roles of user_id, or of every user if it's None."""
+    if user_id is None:
+        cache.delete(GLOBAL_VERSION_KEY)
+    else:
+        cache.delete(f"{GLOBAL_VERSION_KEY}:{user_id}")
+
+
+@receiver(post_save, sender=User, dispatch_uid="invalidate_user_roles_for_user")
+@receiver(post_save, sender=Judge, dispatch_uid="invalidate_user_roles_for_judge")
+@receiver(post_save, sender=Teacher, dispatch_uid="invalidate_user_roles_for_teacher")
+@receiver(
+    post_delete, sender=Judge, dispatch_uid="invalidate_user_roles_for_deleted_judge"
+)
+@receiver(
+    post_delete,
+    sender=Teacher,
+    dispatch_uid="invalidate_user_roles_for_deleted_teacher",
+)
+def invalidate_for_user_change(sender, instance, **kwargs) -> None:
+    # Judge and Teacher use the user's id as their primary key
+    invalidate_user_roles(instance.pk)
+
+
+@receiver(
+    m2m_changed,
+    sender=User.groups.through,
+    dispatch_uid="invalidate_user_roles_for_groups",
+)
+@receiver(
+    m2m_changed,
+    sender=User.user_permissions.through,
+    dispatch_uid="invalidate_user_roles_for_permissions",
+)
+def invalidate_for_user_m2m_change(sender, instance, reverse, **kwargs) -> None:
+    # A reverse change starts from the group or permission, which can affect
+    # many users
+    invalidate_user_roles(None if reverse else instance.pk)
+
+
+@receiver(
+    m2m_changed,
+    sender=Group.permissions.through,
+    dispatch_uid="invalidate_user_roles_for_group_permissions",
+)
+@receiver(post_delete, sender=Group, dispatch_uid="invalidate_user_roles_for_group")
+@receiver(
+    post_delete, sender=Permission, dispatch_uid="invalidate_user_roles_for_permission"
+)
+def invalidate_for_group_change(sender, **kwargs) -> None:
+    invalidate_user_roles()
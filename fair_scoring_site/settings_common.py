@@ -35,15 +35,32 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "fair_scoring_site.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "fair_scoring_site.judging_config.JudgingConfigMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Seconds a user's roles are cached in their session, see fair_scoring_site/roles.py
+USER_ROLES_MAX_AGE = 300
+
+# Request instrumentation, see fair_scoring_site/instrumentation.py
+REQUEST_METRICS_WINDOW = 1000
+REQUEST_QUERY_BUDGET = 50
+REQUEST_QUERY_BUDGETS = {
+    "fair_projects:detail": 20,
+    "fair_projects:project_results": 10,
+    "fair_projects:judge_detail": 15,
+    "fair_projects:judging_instance_edit": 20,
+    "fair_projects:student_feedback_form": 40,
+    "fair_projects:teacher_feedback": 40,
+}
+
 ROOT_URLCONF = "fair_scoring_site.urls"
 
 TEMPLATES = [
@@ -58,6 +75,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "fair_scoring_site.roles.user_roles",
             ],
         },
     },
@@ -66,6 +84,7 @@ TEMPLATES = [
 STATICFILES_DIRS = [BASE_DIR / "assets"]
 
 WSGI_APPLICATION = "fair_scoring_site.wsgi.application"
+ASGI_APPLICATION = "fair_scoring_site.asgi.application"
 
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
@@ -2,63 +2,66 @@ from typing import Iterator
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
 from django.db.models import Count, QuerySet
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from apps.fair_projects.logic import EligibilityIndex
 from apps.fair_projects.models import JudgingInstance, Project
 from apps.judges.models import Judge
 from apps.rubrics.models.rubric import Rubric
 
-from .logic import (
-    get_judging_rubric,
-    get_num_judges_per_project,
-    get_num_projects_per_judge,
-)
+from .judging_config import JudgingConfig, get_judging_config
 
 
 def add_instances(
-    queryset: QuerySet, minimum_instances: int, other_min: int, **kwargs
+    queryset: QuerySet, rubric: Rubric, minimum_instances: int, other_min: int, **kwargs
 ) -> None:
-    rubric = get_judging_rubric()
+    if rubric is None:
+        # Nothing can be judged until the judging rubric exists
+        return
+    assigned = AssignmentHelper.assigned(rubric, **kwargs)
     for instance in AssignmentHelper.get_instances_for(queryset, **kwargs):
-        if not instance.exists(rubric):
-            instance.assign(rubric)
+        if instance.pair() in assigned or instance.assign(rubric) is None:
+            continue
 
-            if AssignmentHelper.instance_count(rubric, **kwargs) < minimum_instances:
-                continue
+        if AssignmentHelper.instance_count(rubric, **kwargs) < minimum_instances:
+            continue
 
-            other_count = AssignmentHelper.instance_count(
-                rubric, **instance.other_kwarg(**kwargs)
-            )
-            if other_count > other_min:
-                break
+        other_count = AssignmentHelper.instance_count(
+            rubric, **instance.other_kwarg(**kwargs)
+        )
+        if other_count > other_min:
+            break
 
 
-def remove_nonmatching_instances(**kwargs) -> Iterator["ExistingInstanceHelper"]:
+def remove_nonmatching_instances(
+    judging_config: JudgingConfig, **kwargs
+) -> Iterator["ExistingInstanceHelper"]:
     """Remove Judging Instances that no longer match and aren't locked."""
-    rubric = get_judging_rubric()
     for instance in ExistingInstanceHelper.get_instances_for(
-        rubric=rubric, locked=False, **kwargs
+        rubric=judging_config.rubric, locked=False, **kwargs
     ):
         if not instance.attributes_match():
             instance.remove()
             yield instance
 
 
-def add_judges_to_project(project: Project) -> None:
+def add_judges_to_project(project: Project, judging_config: JudgingConfig) -> None:
     available_judges = Judge.objects.filter(
         user__is_active=True, categories=project.category, divisions=project.division
     )
     add_instances(
         available_judges,
-        get_num_judges_per_project(),
-        get_num_projects_per_judge(),
+        judging_config.rubric,
+        judging_config.judges_per_project,
+        judging_config.projects_per_judge,
         project=project,
     )
 
 
-def add_projects_to_judge(judge: Judge) -> None:
+def add_projects_to_judge(judge: Judge, judging_config: JudgingConfig) -> None:
     if judge.user.is_active:
         categories = list(judge.categories.values_list("pk", flat=True))
         divisions = list(judge.divisions.values_list("pk", flat=True))
@@ -67,13 +70,14 @@ def add_projects_to_judge(judge: Judge) -> None:
         )
         add_instances(
             available_projects,
-            get_num_projects_per_judge(),
-            get_num_judges_per_project(),
+            judging_config.rubric,
+            judging_config.projects_per_judge,
+            judging_config.judges_per_project,
             judge=judge,
         )
 
 
-def remove_excess_instances() -> None:
+def remove_excess_instances(judging_config: JudgingConfig) -> None:
     """Remove unlocked Judging Instances until below the limits.
 
     Get the JudgingInstance objects where the number of projects for the
@@ -81,16 +85,15 @@ def remove_excess_instances() -> None:
     are any, remove the first and then requery.
 
     """
-    rubric = get_judging_rubric()
     queryset = (
-        JudgingInstance.objects.filter(response__rubric=rubric, locked=False)
+        JudgingInstance.objects.filter(rubric=judging_config.rubric, locked=False)
         .annotate(
             num_projects=Count("judge__judginginstance", distinct=True),
             num_judges=Count("project__judginginstance", distinct=True),
         )
         .filter(
-            num_projects__gt=get_num_projects_per_judge(),
-            num_judges__gt=get_num_judges_per_project(),
+            num_projects__gt=judging_config.projects_per_judge,
+            num_judges__gt=judging_config.judges_per_project,
         )
         .order_by("num_judges", "num_projects")
         .reverse()
@@ -116,28 +119,34 @@ def remove_excess_instances() -> None:
 def update_judging_instances_for_project(
     sender: type, instance: Project, **kwargs
 ) -> None:
+    judging_config = get_judging_config()
     # Remove non-matching judges and any judges that are no longer active
-    deleted_instances = list(remove_nonmatching_instances(project=instance))
+    deleted_instances = list(
+        remove_nonmatching_instances(judging_config, project=instance)
+    )
     judges_to_update = {i.judge for i in deleted_instances}
 
-    add_judges_to_project(instance)
+    add_judges_to_project(instance, judging_config)
     for judge in judges_to_update:
-        add_projects_to_judge(judge)
-    remove_excess_instances()
+        add_projects_to_judge(judge, judging_config)
+    remove_excess_instances(judging_config)
 
 
 @receiver(
     Judge.post_commit, sender=Judge, dispatch_uid="update_judging_instances_for_judge"
 )
 def update_judging_instances_for_judge(sender: type, instance: Judge, **kwargs) -> None:
+    judging_config = get_judging_config()
     # Remove nonmatching projects
-    deleted_instances = list(remove_nonmatching_instances(judge=instance))
+    deleted_instances = list(
+        remove_nonmatching_instances(judging_config, judge=instance)
+    )
     projects_to_update = {i.project for i in deleted_instances}
 
-    add_projects_to_judge(instance)
+    add_projects_to_judge(instance, judging_config)
     for project in projects_to_update:
-        add_judges_to_project(project)
-    remove_excess_instances()
+        add_judges_to_project(project, judging_config)
+    remove_excess_instances(judging_config)
 
 
 @receiver(
@@ -152,11 +161,14 @@ def update_judging_instances_for_inactive_judges(
         except ObjectDoesNotExist:
             pass
         else:
-            deleted_instances = list(remove_nonmatching_instances(judge=judge))
+            judging_config = get_judging_config()
+            deleted_instances = list(
+                remove_nonmatching_instances(judging_config, judge=judge)
+            )
             projects_to_update = {i.project for i in deleted_instances}
             for project in projects_to_update:
-                add_judges_to_project(project)
-            remove_excess_instances()
+                add_judges_to_project(project, judging_config)
+            remove_excess_instances(judging_config)
 
 
 class AssignmentHelper:
@@ -174,15 +186,33 @@ class AssignmentHelper:
         self.project = project
         self.judge = judge
 
-    def assign(self, rubric: Rubric) -> JudgingInstance:
-        return JudgingInstance.objects.create(
-            judge=self.judge, project=self.project, rubric=rubric
+    @staticmethod
+    def assigned(rubric: Rubric, **kwargs) -> set[tuple[int, int]]:
+        """The (judge id, project id) of each instance matching kwargs."""
+        return set(
+            JudgingInstance.objects.filter(rubric=rubric.pk, **kwargs).values_list(
+                "judge", "project"
+            )
         )
 
-    def exists(self, rubric: Rubric) -> bool:
-        return JudgingInstance.objects.filter(
-            judge=self.judge, project=self.project, response__rubric=rubric.pk
-        ).exists()
+    def pair(self) -> tuple[int, int]:
+        return self.judge.pk, self.project.pk
+
+    def assign(self, rubric: Rubric) -> JudgingInstance | None:
+        """Assign the project to the judge.
+
+        Returns None if the judge is already assigned the project. Callers
+        check assigned() first; the unique constraint on JudgingInstance only
+        catches an assignment made at the same time by another request.
+
+        """
+        try:
+            with transaction.atomic():
+                return JudgingInstance.objects.create(
+                    judge=self.judge, project=self.project, rubric=rubric
+                )
+        except IntegrityError:
+            return None
 
     def kwargs(self) -> dict:
         return {"project": self.project, "judge": self.judge}
@@ -195,9 +225,7 @@ class AssignmentHelper:
 
     @staticmethod
     def instance_count(rubric: Rubric, **kwargs):
-        return JudgingInstance.objects.filter(
-            response__rubric=rubric.pk, **kwargs
-        ).count()
+        return JudgingInstance.objects.filter(rubric=rubric.pk, **kwargs).count()
 
 
 class ExistingInstanceHelper:
@@ -205,23 +233,21 @@ class ExistingInstanceHelper:
     def get_instances_for(cls, **kwargs) -> Iterator["ExistingInstanceHelper"]:
         rubric = kwargs.pop("rubric", None)
         if rubric:
-            kwargs["response__rubric"] = rubric
-        queryset = (
-            JudgingInstance.objects.filter(**kwargs)
-            .select_related(
-                "judge",
-                "project",
-                "project__category",
-                "project__division",
-                "judge__user",
-            )
-            .prefetch_related("judge__categories", "judge__divisions")
+            kwargs["rubric"] = rubric
+        judging_instances = list(
+            JudgingInstance.objects.filter(**kwargs).select_related("judge", "project")
+        )
+        index = EligibilityIndex(
+            rubric,
+            judge_ids={instance.judge_id for instance in judging_instances},
+            assignments=False,
         )
-        for judging_instance in queryset.all():
-            yield cls(judging_instance)
+        for judging_instance in judging_instances:
+            yield cls(judging_instance, index)
 
-    def __init__(self, judging_instance: JudgingInstance):
+    def __init__(self, judging_instance: JudgingInstance, index: EligibilityIndex):
         self.judging_instance = judging_instance
+        self.index = index
 
     @property
     def judge(self) -> Judge:
@@ -239,8 +265,7 @@ class ExistingInstanceHelper:
         self.judging_instance.delete()
 
     def attributes_match(self) -> bool:
-        return (
-            self.judge.user.is_active
-            and (self.project.category in self.judge.categories.all())
-            and (self.project.division in self.judge.divisions.all())
+        # The index only has active judges
+        return self.index.can_judge(
+            self.judge.pk, self.project.category_id, self.project.division_id
         )
@@ -0,0 +1,160 @@
+"""Test helpers for catching queries that grow with the size of the fair.
+
+QueryScalingMixin seeds a small and a large fair with the same code used by
+the seedfair command, runs the code under test against each, and fails if the
+large fair needs more queries. The failure message lists the queries of the
+large run grouped by the line of project code that ran them, which usually
+points straight at the loop doing one query per row.
+
+"""
+import sys
+from collections import defaultdict
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from apps.fair_projects.seeding import clear_fair, seed_fair
+
+SMALL_FAIR = 10
+LARGE_FAIR = 30
+
+
+def get_call_site() -> str:
+    """Return the innermost template node or line of project code that ran a query.
+
+    Queries run by lazy querysets while a template renders are attributed to
+    the template line that used them.
+
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        node = frame.f_locals.get("self")
+        if frame.f_code.co_name == "render_annotated" and getattr(node, "token", None):
+            return f"{node.origin.template_name}:{node.token.lineno}"
+        if (
+            filename.startswith(base_dir)
+            and filename != __file__
+            and "site-packages" not in filename
+        ):
+            return f"{filename[len(base_dir) + 1:]}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class QueryRecorder:
+    """Record the SQL and call site of each query run in the block."""
+
+    def __init__(self):
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((get_call_site(), sql))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def report(self, max_sql: int = 3, max_length: int = 300) -> str:
+        """Queries grouped by call site, most frequent first."""
+        by_call_site = defaultdict(list)
+        for call_site, sql in self.queries:
+            by_call_site[call_site].append(sql)
+
+        lines = []
+        for call_site, queries in sorted(
+            by_call_site.items(), key=lambda item: -len(item[1])
+        ):
+            lines.append(f"{len(queries)} queries from {call_site}")
+            lines.extend(f"    {sql[:max_length]}" for sql in queries[:max_sql])
+            if len(queries) > max_sql:
+                lines.append(f"    ... and {len(queries) - max_sql} more")
+        return "\n".join(lines)
+
+
+class QueryScalingMixin:
+    """Assertions for use with django.test.TestCase."""
+
+    small_fair = SMALL_FAIR
+    large_fair = LARGE_FAIR
+
+    def seed(self, projects: int) -> None:
+        clear_fair()
+        seed_fair(projects, seed=projects)
+
+    def assertQueryCountDoesNotGrow(
+        self,
+        run: Callable,
+        setup: Optional[Callable] = None,
+        warm_up: bool = True,
+    ) -> None:
+        """Fail if run needs more queries on the large fair than the small one.
+
+        Args:
+            run: the code to measure. It is passed the value returned by setup.
+            setup: finds the objects run needs, after each fair is seeded.
+                Its queries aren't counted.
+            warm_up: run once before measuring, so queries that fill caches
+                or are only made the first time aren't counted. Turn this off
+                for code that changes the data it reads.
+
+        """
+        small, large = self.record_queries(run, setup, warm_up)
+        if len(large) > len(small):
+            self.fail(
+                f"{len(small)} queries with {self.small_fair} projects but "
+                f"{len(large)} with {self.large_fair} projects.\n"
+                f"Queries with {self.large_fair} projects:\n{large.report()}"
+            )
+
+    def assertQueryCounts(
+        self,
+        expected: tuple[int, int],
+        run: Callable,
+        setup: Optional[Callable] = None,
+        warm_up: bool = True,
+    ) -> None:
+        """Fail unless run needs exactly the expected queries on each fair.
+
+        For code whose queries grow with the fair in a known way, such as a
+        query per batch of rows inserted. The arguments are as for
+        assertQueryCountDoesNotGrow.
+
+        Args:
+            expected: the number of queries on the small and the large fair.
+        """
+        small, large = self.record_queries(run, setup, warm_up)
+        if (len(small), len(large)) != tuple(expected):
+            self.fail(
+                f"Expected {expected[0]} queries with {self.small_fair} projects "
+                f"and {expected[1]} with {self.large_fair} projects, but got "
+                f"{len(small)} and {len(large)}.\n"
+                f"Queries with {self.large_fair} projects:\n{large.report()}"
+            )
+
+    def record_queries(
+        self, run: Callable, setup: Optional[Callable], warm_up: bool
+    ) -> tuple[QueryRecorder, QueryRecorder]:
+        """Run run on the small and the large fair, recording its queries."""
+        recorders = []
+        for projects in (self.small_fair, self.large_fair):
+            self.seed(projects)
+            argument = setup() if setup else None
+            call = (lambda: run(argument)) if setup else run
+            if warm_up:
+                call()
+            with QueryRecorder() as recorder:
+                call()
+            recorders.append(recorder)
+        return recorders[0], recorders[1]
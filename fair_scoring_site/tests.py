@@ -1,6 +1,17 @@
-from django.contrib.auth.models import User
-from django.db import transaction
-from django.test import TestCase
+import csv
+import io
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from constance import config
+from django.contrib.auth.models import AnonymousUser, Group, Permission, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from hypothesis import given, settings
 from hypothesis.extra.django import TestCase as HypTestCase
 from hypothesis.extra.django import TransactionTestCase as HypTransTestCase
@@ -8,16 +19,29 @@ from hypothesis.strategies import integers
 from model_bakery import baker
 
 import apps.rubrics.fixtures
-from apps.awards.models import In, Is
+from apps.awards.logic import assign_awards
+from apps.awards.models import Award, AwardInstance, In, Is
 from apps.fair_categories.models import Category, Division, Subcategory
-from apps.fair_projects.models import JudgingInstance, Project
+from apps.fair_projects.logic import assign_judges, assign_judges_incrementally
+from apps.fair_projects.models import JudgingInstance, Project, Student, Teacher
 from apps.judges.models import Judge
-from fair_scoring_site.admin import AwardRuleForm
+from apps.rubrics.models import FeedbackForm, RubricResponse
+from fair_scoring_site.admin import AwardRuleForm, get_project_instances
+from fair_scoring_site.instrumentation import percentile, registry
+from fair_scoring_site.judging_config import (
+    JudgingConfig,
+    JudgingConfigMiddleware,
+    get_judging_config,
+    judging_config_scope,
+)
 from fair_scoring_site.logic import (
+    get_judging_rubric,
     get_judging_rubric_name,
     get_num_judges_per_project,
     get_num_projects_per_judge,
 )
+from fair_scoring_site.roles import get_user_roles
+from fair_scoring_site.testing import QueryScalingMixin
 
 project_number_counter = 1000
 
@@ -458,3 +482,389 @@ class SequentialAssignmentTests(AssignmentTests, HypTransTestCase):
         self.assertNumInstances(
             self.compute_expected_instances(num_projects, num_judges - 1)
         )
+
+
+class StreamingExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser("admin", "a@example.com", "pw")
+        category = make_test_category("Physical Sciences")
+        cls.subcategory = make_test_subcategory(category, "Chemistry")
+        cls.division = make_test_division("High School")
+        cls.award = baker.make(Award, name="First Place")
+        cls.url = reverse("admin:awards_awardinstance_changelist")
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def add_award_instances(self, count: int) -> None:
+        for _ in range(count):
+            project = make_test_project(self.subcategory, self.division)
+            baker.make(
+                "fair_projects.Student",
+                project=project,
+                _quantity=2,
+                _fill_optional=False,
+            )
+            AwardInstance.objects.create(award=self.award, content_object=project)
+
+    def export(self, action: str):
+        return self.client.post(
+            self.url,
+            {
+                "action": action,
+                "_selected_action": AwardInstance.objects.values_list("pk", flat=True),
+            },
+        )
+
+    def export_csv(self) -> list[list[str]]:
+        response = self.export("export_csv_stream")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_csv_export_rows(self):
+        self.add_award_instances(2)
+        rows = self.export_csv()
+        self.assertEqual(
+            rows[0], ["award", "project", "students", "category", "division"]
+        )
+        self.assertEqual(len(rows), 3)
+        for row in rows[1:]:
+            with self.subTest(row):
+                project = Project.objects.get(title=row[1])
+                self.assertEqual(row[0], "First Place")
+                self.assertEqual(row[2], project.student_str())
+                self.assertEqual(row[3], "Physical Sciences")
+                self.assertEqual(row[4], "High School")
+
+    def test_csv_export_query_count_does_not_grow_with_rows(self):
+        self.add_award_instances(2)
+        with CaptureQueriesContext(connection) as context:
+            self.export_csv()
+        expected = len(context.captured_queries)
+
+        self.add_award_instances(5)
+        with CaptureQueriesContext(connection) as context:
+            self.export_csv()
+        self.assertEqual(len(context.captured_queries), expected)
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        self.add_award_instances(3)
+        response = self.export("export_xlsx_stream")
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0][0], "award")
+        self.assertEqual(len(rows), 4)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(self.admin)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_records_metrics_for_each_view(self):
+        with self.assertLogs("fair_scoring_site.instrumentation", "INFO") as logs:
+            self.client.get(reverse("fair_projects:index"))
+            self.client.get(reverse("fair_projects:index"))
+
+        stats = registry.summary()["fair_projects:index"]
+        self.assertEqual(stats["count"], 2)
+        self.assertGreater(stats["queries"]["p50"], 0)
+        self.assertGreater(stats["template_ms"]["p50"], 0)
+        self.assertGreaterEqual(stats["wall_ms"]["p99"], stats["template_ms"]["p99"])
+        self.assertIn("view=fair_projects:index method=GET status=200", logs.output[0])
+
+    async def test_records_metrics_under_asgi(self):
+        await self.async_client.get(reverse("fair_projects:index"))
+
+        stats = registry.summary()["fair_projects:index"]
+        self.assertEqual(stats["count"], 1)
+        self.assertGreater(stats["queries"]["p50"], 0)
+
+    def test_warns_when_over_query_budget(self):
+        with self.settings(REQUEST_QUERY_BUDGETS={"fair_projects:index": 0}):
+            with self.assertLogs("fair_scoring_site.instrumentation") as logs:
+                self.client.get(reverse("fair_projects:index"))
+
+        self.assertTrue(
+            any(
+                "Query budget exceeded: view=fair_projects:index" in line
+                for line in logs.output
+            )
+        )
+        self.assertEqual(registry.summary()["fair_projects:index"]["over_budget"], 1)
+
+    def test_stats_page(self):
+        self.client.get(reverse("fair_projects:index"))
+
+        response = self.client.get(reverse("request_stats"))
+        self.assertContains(response, "fair_projects:index")
+
+        response = self.client.get(reverse("request_stats"), {"format": "json"})
+        self.assertEqual(response.json()["fair_projects:index"]["count"], 1)
+
+    def test_stats_page_is_admin_only(self):
+        user = User.objects.create_user("user", "user@example.com", "pw")
+        self.client.force_login(user)
+        response = self.client.get(reverse("request_stats"))
+        self.assertEqual(response.status_code, 302)
+
+
+class QueryScalingTests(QueryScalingMixin, TestCase):
+    """Hot paths should run the same number of queries for any size of fair.
+
+    Cases using assertQueryCounts have queries that grow with the fair in a
+    known, bounded way, and pin them.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+
+    def get_view(self, user: User, url: str) -> None:
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def assertViewQueryCountDoesNotGrow(self, setup) -> None:
+        """setup returns the user to log in as and the url to get."""
+        self.assertQueryCountDoesNotGrow(lambda args: self.get_view(*args), setup)
+
+    def busiest_judge(self) -> Judge:
+        return (
+            Judge.objects.annotate(num_instances=Count("judginginstance"))
+            .order_by("-num_instances")
+            .first()
+        )
+
+    def test_project_index(self):
+        self.assertViewQueryCountDoesNotGrow(
+            lambda: (self.admin, reverse("fair_projects:index"))
+        )
+
+    def test_project_detail(self):
+        def setup():
+            project = Project.objects.order_by("number").first()
+            return self.admin, project.get_absolute_url()
+
+        self.assertViewQueryCountDoesNotGrow(setup)
+
+    def test_judge_detail(self):
+        def setup():
+            user = self.busiest_judge().user
+            return user, reverse("fair_projects:judge_detail", args=(user.username,))
+
+        self.assertViewQueryCountDoesNotGrow(setup)
+
+    def test_judging_instance_update(self):
+        def setup():
+            instance = JudgingInstance.objects.select_related("judge__user").first()
+            return instance.judge.user, reverse(
+                "fair_projects:judging_instance_edit", args=(instance.pk,)
+            )
+
+        self.assertViewQueryCountDoesNotGrow(setup)
+
+    def test_results_index(self):
+        self.assertViewQueryCountDoesNotGrow(
+            lambda: (self.admin, reverse("fair_projects:project_results"))
+        )
+
+    def test_judging_progress(self):
+        self.assertViewQueryCountDoesNotGrow(
+            lambda: (self.admin, reverse("judging_progress"))
+        )
+
+    def test_teacher_students_feedback_form(self):
+        def setup():
+            teacher = (
+                Teacher.objects.annotate(num_students=Count("student"))
+                .order_by("-num_students")
+                .first()
+            )
+            return teacher.user, reverse(
+                "fair_projects:teacher_feedback", args=(teacher.user.username,)
+            )
+
+        # Each of the teacher's projects runs a query for each feedback module
+        # that reads its responses: the markdown average score and the score
+        # table
+        self.assertQueryCounts((39, 85), lambda args: self.get_view(*args), setup)
+
+    def test_admin_changelists(self):
+        for model in (Project, Student, JudgingInstance, Award, AwardInstance):
+            url = reverse(
+                f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"
+            )
+            with self.subTest(model=model.__name__):
+                self.assertViewQueryCountDoesNotGrow(lambda: (self.admin, url))
+
+    def test_assign_judges(self):
+        def setup():
+            JudgingInstance.objects.all().delete()
+
+        # The judging instances are inserted in bulk, so only the number of
+        # insert batches grows. The large fair also has judges with too many
+        # projects, whose instances are read in one more query.
+        self.assertQueryCounts(
+            (23, 27), lambda _: assign_judges(), setup, warm_up=False
+        )
+
+    def test_assign_judges_incrementally(self):
+        def setup():
+            category, division = baker.make(Category), baker.make(Division)
+            for _ in range(3):
+                baker.make(
+                    Judge, phone="867-5309", categories=[category], divisions=[division]
+                )
+            project = baker.make(Project, category=category, division=division)
+            project.judginginstance_set.all().delete()
+            return project
+
+        self.assertQueryCountDoesNotGrow(
+            lambda project: assign_judges_incrementally(projects=[project]),
+            setup,
+            warm_up=False,
+        )
+
+    def test_assign_awards(self):
+        self.assertQueryCountDoesNotGrow(
+            lambda: assign_awards(Award.objects.all(), get_project_instances())
+        )
+
+    def test_feedback_form_render_html(self):
+        def setup():
+            project = (
+                Project.objects.annotate(num_instances=Count("judginginstance"))
+                .order_by("-num_instances")
+                .first()
+            )
+            responses = RubricResponse.objects.filter(judginginstance__project=project)
+            return FeedbackForm.objects.get(), responses
+
+        self.assertQueryCountDoesNotGrow(
+            lambda args: args[0].render_html(args[1]), setup
+        )
+
+
+class JudgingConfigTests(TestCase):
+    def test_scope_loads_config_once(self):
+        rubric = make_test_rubric()
+        with judging_config_scope():
+            self.assertEqual(get_judging_rubric(), rubric)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_judging_rubric(), rubric)
+                self.assertEqual(get_num_judges_per_project(), 3)
+                self.assertEqual(get_num_projects_per_judge(), 5)
+                with judging_config_scope():
+                    self.assertEqual(get_judging_rubric_name(), rubric.name)
+
+    def test_config_is_loaded_on_each_call_outside_a_scope(self):
+        get_judging_config()
+        with self.assertNumQueries(4):
+            get_judging_config()
+
+    def test_constance_update_invalidates_snapshot(self):
+        with judging_config_scope():
+            self.assertEqual(get_num_judges_per_project(), 3)
+            config.JUDGES_PER_PROJECT = 4
+            self.assertEqual(get_num_judges_per_project(), 4)
+
+    def test_rubric_save_invalidates_snapshot(self):
+        with judging_config_scope():
+            self.assertIsNone(get_judging_rubric())
+            rubric = make_test_rubric()
+            self.assertEqual(get_judging_rubric(), rubric)
+
+    def test_middleware_shares_config_in_a_request(self):
+        def view(request):
+            get_judging_rubric()
+            get_num_judges_per_project()
+            return HttpResponse()
+
+        with patch.object(JudgingConfig, "load", wraps=JudgingConfig.load) as load:
+            JudgingConfigMiddleware(view)(RequestFactory().get("/"))
+        load.assert_called_once()
+
+    async def test_async_middleware_shares_config_in_a_request(self):
+        async def view(request):
+            await sync_to_async(get_judging_rubric)()
+            await sync_to_async(get_num_judges_per_project)()
+            return HttpResponse()
+
+        with patch.object(JudgingConfig, "load", wraps=JudgingConfig.load) as load:
+            await JudgingConfigMiddleware(view)(RequestFactory().get("/"))
+        load.assert_called_once()
+
+
+class UserRolesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name="Teachers")
+        cls.group.permissions.add(Permission.objects.get(codename="is_teacher"))
+        cls.teacher = baker.make(Teacher, user__username="teacher")
+        cls.teacher.user.groups.add(cls.group)
+
+    def setUp(self):
+        self.session = SessionStore()
+
+    def get_roles(self, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or User.objects.get(pk=self.teacher.pk)
+        request.session = self.session
+        return get_user_roles(request)
+
+    def test_teacher_roles(self):
+        roles = self.get_roles()
+        self.assertTrue(roles.is_teacher)
+        self.assertFalse(roles.is_judge)
+        self.assertFalse(roles.can_view_results)
+        self.assertEqual(roles.teacher_id, self.teacher.pk)
+
+    def test_roles_are_cached_in_the_session(self):
+        user = User.objects.get(pk=self.teacher.pk)
+        self.get_roles(user)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.get_roles(user).is_teacher)
+
+    def test_anonymous_user_has_no_roles(self):
+        with self.assertNumQueries(0):
+            roles = self.get_roles(AnonymousUser())
+        self.assertFalse(roles.is_teacher)
+        self.assertFalse(roles.has_perm("fair_projects.is_teacher"))
+
+    def test_group_permission_change_reloads_roles(self):
+        self.get_roles()
+        self.group.permissions.add(Permission.objects.get(codename="can_view_results"))
+        self.assertTrue(self.get_roles().can_view_results)
+
+    def test_group_membership_change_reloads_roles(self):
+        self.get_roles()
+        self.teacher.user.groups.remove(self.group)
+        self.assertFalse(self.get_roles().is_teacher)
+
+    def test_expired_roles_are_reloaded(self):
+        self.get_roles()
+        with self.settings(USER_ROLES_MAX_AGE=0), CaptureQueriesContext(
+            connection
+        ) as queries:
+            self.get_roles()
+        self.assertGreater(len(queries), 0)
+
+    def test_navbar_uses_roles(self):
+        self.client.force_login(self.teacher.user)
+        response = self.client.get(reverse("fair_projects:index"))
+        self.assertContains(
+            response,
+            reverse("fair_projects:teacher_detail", args=("teacher",)),
+        )
+        self.assertNotContains(response, reverse("fair_projects:project_results"))
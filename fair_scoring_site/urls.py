@@ -21,6 +21,7 @@ from apps.fair_projects.views import (
     delete_judge_assignments,
     import_projects,
     judge_assignment,
+    judging_progress,
     notify_teachers,
 )
 
@@ -38,6 +39,8 @@ urlpatterns = [
         name="delete_instances",
     ),
     re_path(r"^admin/auth/user/teacher-notify", notify_teachers, name="teacher_notify"),
+    re_path(r"^admin/request-stats/?$", request_stats, name="request_stats"),
+    re_path(r"^admin/judging-progress/?$", judging_progress, name="judging_progress"),
     re_path(r"^admin/", django.contrib.admin.site.urls),
     re_path(r"^accounts/profile/", profile, name="profile"),
     re_path(r"^accounts/", include("django.contrib.auth.urls")),
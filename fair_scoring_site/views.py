@@ -1,18 +1,25 @@
+from django.contrib.admin import site as admin_site
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
+from django.shortcuts import render
 from django.urls import reverse
 
+from .instrumentation import ViewStats, get_query_budget, registry
+from .roles import get_user_roles
+
 
 @login_required
 def profile(request):
+    roles = get_user_roles(request)
     if request.user.is_authenticated:
-        if request.user.is_superuser:
+        if roles.is_superuser:
             return HttpResponseRedirect(reverse("admin:index"))
-        elif request.user.has_perm("judges.is_judge"):
+        elif roles.has_perm("judges.is_judge"):
             return HttpResponseRedirect(
                 reverse("fair_projects:judge_detail", args=[request.user.username])
             )
-        elif request.user.has_perm("fair_projects.is_teacher"):
+        elif roles.has_perm("fair_projects.is_teacher"):
             return HttpResponseRedirect(
                 reverse("fair_projects:teacher_detail", args=(request.user.username,))
             )
@@ -24,3 +31,27 @@ def profile(request):
 
 def home(request):
     return HttpResponseRedirect(reverse("fair_projects:index"))
+
+
+@staff_member_required
+def request_stats(request):
+    stats = registry.summary()
+    if request.GET.get("format") == "json":
+        return JsonResponse(stats)
+
+    context = admin_site.each_context(request)
+    context.update(
+        {
+            "title": "Request statistics",
+            "view_stats": [
+                (
+                    view_name,
+                    get_query_budget(view_name),
+                    view_stats,
+                    [view_stats[field] for field in ViewStats.FIELDS],
+                )
+                for view_name, view_stats in stats.items()
+            ],
+        }
+    )
+    return render(request, "admin/request_stats.html", context)